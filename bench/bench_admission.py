@@ -0,0 +1,135 @@
+"""
+Admission Control Benchmark
+Computer Networks Semester Project
+
+Measures how much a few abusive clients hurt everybody else, with and
+without admission control (see src/admission.py).
+
+Well-behaved load generator clients send private and group messages at a
+moderate rate while flooding bots send broadcasts as fast as their
+sockets allow. Each round reports the delivery latency of the
+well-behaved clients and how many bot requests the server throttled.
+
+Usage:
+    python bench/bench_admission.py --bots 4 --clients 30 --duration 10
+    python bench/bench_admission.py --limits "--rate-limits default --max-queued-mb 16"
+"""
+
+import argparse
+import os
+import socket
+import threading
+import time
+
+from loadgen import (LoadGenerator, environment_info, free_port, start_server_process,
+                     write_results)
+from protocol import FrameReader, RECV_SIZE, encode_message
+
+
+class FloodBot:
+    """A client that sends broadcasts back to back and counts throttled replies"""
+
+    def __init__(self, port, username, content):
+        self.socket = socket.create_connection(('127.0.0.1', port))
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.frame = encode_message({'type': 'message', 'recipient': 'all', 'content': content})
+        self.sent = 0
+        self.throttled = 0
+        self.socket.sendall(encode_message({'type': 'login', 'username': username}))
+        threading.Thread(target=self.receive_loop, daemon=True).start()
+
+    def receive_loop(self):
+        reader = FrameReader()
+        try:
+            while True:
+                data = self.socket.recv(RECV_SIZE)
+                if not data:
+                    break
+                for message in reader.feed(data):
+                    if message.get('type') == 'throttled':
+                        self.throttled += 1
+        except OSError:
+            pass
+
+    def flood(self, stop_at):
+        try:
+            while time.perf_counter() < stop_at:
+                self.socket.sendall(self.frame)
+                self.sent += 1
+        except OSError:
+            pass
+
+    def close(self):
+        self.socket.close()
+
+
+def run_round(name, server_args, args):
+    """One server configuration: well-behaved clients plus flooding bots"""
+    port = free_port()
+    server = start_server_process(port, server_args)
+    try:
+        generator = LoadGenerator('127.0.0.1', port, clients=args.clients, mix='message=80,group=20',
+                                  rate=args.rate, duration=args.duration, user_prefix='user')
+        bots = [FloodBot(port, f"bot{i}", 'x' * args.message_size) for i in range(args.bots)]
+        stop_at = time.perf_counter() + args.duration + 1.0
+        flooders = [threading.Thread(target=bot.flood, args=(stop_at,), daemon=True) for bot in bots]
+        for thread in flooders:
+            thread.start()
+        results = generator.run()
+        for bot in bots:
+            bot.close()
+    finally:
+        server.terminate()
+        server.wait()
+
+    throughput = results['throughput']
+    latency = results['latency_ms']['all']
+    return {
+        'name': name,
+        'server_args': server_args,
+        'p50_ms': latency.get('p50'),
+        'p99_ms': latency.get('p99'),
+        'p999_ms': latency.get('p999'),
+        'delivered': throughput['delivered']['message'] + throughput['delivered']['group'],
+        'expected': throughput['expected']['message'] + throughput['expected']['group'],
+        'bot_sent': sum(bot.sent for bot in bots),
+        'bot_throttled': sum(bot.throttled for bot in bots),
+        'errors': results['errors'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Admission control benchmark")
+    parser.add_argument('--clients', type=int, default=30, help="Well-behaved clients")
+    parser.add_argument('--rate', type=float, default=5.0, help="Operations per second per client")
+    parser.add_argument('--bots', type=int, default=4, help="Flooding clients")
+    parser.add_argument('--message-size', type=int, default=256, help="Bytes per bot broadcast")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds of traffic")
+    parser.add_argument('--server-args', default='--engine selector',
+                        help="Server options used in both rounds")
+    parser.add_argument('--limits', default='--rate-limits default --max-queued-mb 16',
+                        help="Extra server options of the admission control round")
+    parser.add_argument('--output', default=None, help="Result JSON path")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("ADMISSION CONTROL BENCHMARK")
+    print(f"{args.clients} clients at {args.rate} ops/s, {args.bots} flooding bots, "
+          f"{args.duration}s, {os.cpu_count()} CPUs")
+    print("=" * 60)
+
+    base = args.server_args.split()
+    rounds = []
+    for name, server_args in (('unlimited', base), ('admission', base + args.limits.split())):
+        result = run_round(name, server_args, args)
+        rounds.append(result)
+        print(f"{name:>10}: p50 {result['p50_ms']} ms  p99 {result['p99_ms']} ms  "
+              f"({result['delivered']}/{result['expected']} delivered)  "
+              f"bots sent {result['bot_sent']}, throttled {result['bot_throttled']}")
+
+    results = dict(environment_info(), tool='bench_admission', config=vars(args), rounds=rounds)
+    print(f"Results written to {write_results(results, args.output, 'admission')}")
+
+
+if __name__ == "__main__":
+    main()
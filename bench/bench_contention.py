@@ -0,0 +1,156 @@
+"""
+Lock Contention Benchmark
+Computer Networks Semester Project
+
+Measures how server throughput scales with the number of client handler
+threads, comparing the current state design (sharded session registry,
+copy-on-write roster and groups, see src/sessions.py) with the previous
+one, where a single server lock was held across lookups and sends.
+
+No network is involved: every simulated client is a thread calling
+ChatServer.process_message directly with a fake socket whose sendall()
+sleeps for --send-delay to model the time a real send spends in the
+kernel (during which Python releases the GIL).
+
+Usage:
+    python bench/bench_contention.py --threads 1,2,4,8,16 --users 200
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+from loadgen import SRC_DIR, environment_info, write_results
+
+sys.path.insert(0, SRC_DIR)
+
+from server import ChatServer
+
+
+class FakeSocket:
+    """Stands in for a client socket; sendall() takes send_delay seconds"""
+
+    send_delay = 0.0
+
+    def sendall(self, data):
+        if self.send_delay:
+            time.sleep(self.send_delay)
+
+    def close(self):
+        pass
+
+
+class GlobalLockServer(ChatServer):
+    """The previous design: one lock around every lookup, fan-out and login"""
+
+    def send_to_local_user(self, username, message):
+        with self.lock:
+            for client_socket, user in self.sessions.roster.items():
+                if user == username:
+                    self.send_message(client_socket, message)
+                    return True
+        return False
+
+    def broadcast_local(self, message, exclude=None):
+        with self.lock:
+            for client_socket in self.sessions.roster:
+                if client_socket != exclude:
+                    self.send_message(client_socket, message)
+
+    def online_users(self):
+        with self.lock:
+            return self.sessions.usernames()
+
+
+def build_server(server_class, users, group_size):
+    """A server with logged in fake clients and groups of group_size"""
+    FakeSocket.send_delay = 0.0
+    server = server_class(host='127.0.0.1', port=0)
+    sockets = []
+    for i in range(users):
+        sock = FakeSocket()
+        server.process_message(sock, ('127.0.0.1', i), None, {'type': 'login', 'username': f'user{i}'})
+        sockets.append(sock)
+    for first in range(0, users - group_size + 1, group_size):
+        server.add_group(f'group{first}', [f'user{i}' for i in range(first, first + group_size)])
+    server.server_socket.close()
+    return server, sockets
+
+
+def run_threads(server, sockets, threads, duration, group_size, seed):
+    """Run client threads against the server, return operations per second"""
+    counts = [0] * threads
+    users = len(sockets)
+    stop = threading.Event()
+
+    def client(index):
+        rng = random.Random(seed + index)
+        username = f'user{index}'
+        sock = sockets[index]
+        group = f'group{index - index % group_size}'
+        done = 0
+        while not stop.is_set():
+            roll = rng.random()
+            if roll < 0.90:
+                message = {'type': 'message', 'recipient': f'user{rng.randrange(users)}', 'content': 'hi'}
+            elif roll < 0.99:
+                message = {'type': 'group_message', 'group_name': group, 'content': 'hi'}
+            else:
+                message = {'type': 'get_users'}
+            server.process_message(sock, ('127.0.0.1', index), username, message)
+            done += 1
+        counts[index] = done
+
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in workers:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Server lock contention benchmark")
+    parser.add_argument('--threads', default='1,2,4,8,16', help="Comma separated client thread counts")
+    parser.add_argument('--users', type=int, default=200, help="Logged in users")
+    parser.add_argument('--group-size', type=int, default=5, help="Members per group")
+    parser.add_argument('--send-delay', type=float, default=50e-6, help="Seconds per simulated send")
+    parser.add_argument('--duration', type=float, default=2.0, help="Seconds per measurement")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed")
+    parser.add_argument('--output', default=None, help="Result JSON path")
+    args = parser.parse_args()
+
+    thread_counts = [int(n) for n in args.threads.split(',')]
+    if max(thread_counts) > args.users:
+        parser.error("--users must be at least the largest thread count")
+
+    print("=" * 60)
+    print("LOCK CONTENTION BENCHMARK")
+    print(f"{args.users} users, send delay {args.send_delay * 1e6:g} us, {os.cpu_count()} CPUs")
+    print("=" * 60)
+    print(f"{'threads':>8} {'global lock ops/s':>18} {'sharded ops/s':>14} {'speedup':>8}")
+
+    rounds = []
+    for threads in thread_counts:
+        row = {'threads': threads}
+        for name, server_class in (('global', GlobalLockServer), ('sharded', ChatServer)):
+            server, sockets = build_server(server_class, args.users, args.group_size)
+            FakeSocket.send_delay = args.send_delay
+            row[name] = round(run_threads(server, sockets, threads, args.duration,
+                                          args.group_size, args.seed), 1)
+        row['speedup'] = round(row['sharded'] / row['global'], 2) if row['global'] else None
+        rounds.append(row)
+        print(f"{threads:>8} {row['global']:>18} {row['sharded']:>14} {row['speedup']:>8}")
+
+    results = dict(environment_info(), tool='bench_contention', config=vars(args), rounds=rounds)
+    print(f"Results written to {write_results(results, args.output, 'contention')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Chat Latency During File Transfers Benchmark
+Computer Networks Semester Project
+
+Measures how much large file transfers delay chat messages that go to
+the same users (see src/lanes.py). A local server runs the load
+generator's chat traffic (private messages between --clients users)
+twice:
+
+    idle   - chat only
+    bulk   - the same chat while a separate client keeps --inflight
+             files of --file-mb each on their way to the chat users
+
+and reports the chat latency of both runs and the file throughput of the
+second. Only the public protocol is used (large files are received
+whole or in chunks), so the same script runs against older versions of
+the server for before/after comparisons.
+
+Usage:
+    python bench/bench_lanes.py --engine selector --file-mb 8
+"""
+
+import argparse
+import base64
+import os
+import socket
+import threading
+import time
+
+from loadgen import (FrameReader, LoadGenerator, RECV_SIZE, encode_message, environment_info,
+                     free_port, start_server_process, write_results)
+
+
+class BulkSender:
+    """A client that keeps files on their way to the chat users"""
+
+    def __init__(self, port, recipients, file_mb, inflight):
+        self.recipients = recipients
+        self.filedata = base64.b64encode(os.urandom(int(file_mb * 1024 * 1024))).decode('ascii')
+        self.raw_size = file_mb * 1024 * 1024
+        self.slots = threading.Semaphore(inflight)
+        self.delivered = 0
+        self.stop = threading.Event()
+        self.socket = socket.create_connection(('127.0.0.1', port))
+        self.socket.sendall(encode_message({'type': 'login', 'username': 'bulk-sender'}))
+        threading.Thread(target=self.receive_loop, daemon=True).start()
+
+    def receive_loop(self):
+        """A file is done when the server has handed it to the recipient"""
+        reader = FrameReader()
+        try:
+            while True:
+                data = self.socket.recv(RECV_SIZE)
+                if not data:
+                    return
+                for message in reader.feed(data):
+                    if message.get('type') == 'file_progress' and message.get('done') == message.get('total'):
+                        self.delivered += 1
+                        self.slots.release()
+        except OSError:
+            pass
+
+    def run(self):
+        index = 0
+        while not self.stop.is_set():
+            if not self.slots.acquire(timeout=0.1):
+                continue
+            try:
+                self.socket.sendall(encode_message({
+                    'type': 'file_transfer', 'filename': 'bulk.bin', 'filedata': self.filedata,
+                    'recipient': self.recipients[index % len(self.recipients)]}))
+            except OSError:
+                return  # Closed at the end of the run
+            index += 1
+
+    def close(self):
+        self.stop.set()
+        self.socket.close()
+
+
+def chat_run(port, args, bulk):
+    """One load generator run, with or without files in flight"""
+    generator = LoadGenerator('127.0.0.1', port, clients=args.clients, mix='message=100', rate=args.rate,
+                              duration=args.duration, message_size=64, user_prefix='lanes-')
+    sender = None
+    if bulk:
+        sender = BulkSender(port, [client.username for client in generator.clients],
+                            args.file_mb, args.inflight)
+    generator.connect_all()
+    if sender:
+        threading.Thread(target=sender.run, daemon=True).start()
+        time.sleep(1.0)  # Let the first files get going
+    results = generator.run()
+    outcome = {'chat_ms': results['latency_ms'].get('message', {'count': 0}),
+               'delivered': results['throughput']['delivered']['message'],
+               'expected': results['throughput']['expected']['message']}
+    if sender:
+        sender.close()
+        outcome['files'] = sender.delivered
+        outcome['file_mb_per_s'] = round(sender.delivered * args.file_mb / args.duration, 1)
+    return outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat latency while large files are in flight")
+    parser.add_argument('--engine', default='threads', choices=['threads', 'selector', 'pool'])
+    parser.add_argument('--clients', type=int, default=10)
+    parser.add_argument('--rate', type=float, default=20.0, help="Chat messages per client per second")
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--file-mb', type=float, default=8.0, help="Size of each file")
+    parser.add_argument('--inflight', type=int, default=4, help="Files on their way at any time")
+    parser.add_argument('--output', default=None, help="Result JSON path")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"CHAT LATENCY DURING FILE TRANSFERS ({args.engine} engine)")
+    print("=" * 60)
+    results = {}
+    for name, bulk in (('idle', False), ('bulk', True)):
+        port = free_port()
+        process = start_server_process(port, ['--engine', args.engine, '--file-store-mb', '0'])
+        try:
+            results[name] = chat_run(port, args, bulk)
+        finally:
+            process.kill()
+            process.wait()
+        chat = results[name]['chat_ms']
+        line = (f"{name:>5}: chat p50 {chat.get('p50')} ms, p99 {chat.get('p99')} ms, "
+                f"max {chat.get('max')} ms ({results[name]['delivered']}/{results[name]['expected']} delivered)")
+        if bulk:
+            line += f", files {results[name]['file_mb_per_s']} MB/s"
+        print(line)
+
+    output = dict(environment_info(), tool='bench_lanes', config=vars(args), results=results)
+    print(f"Results written to {write_results(output, args.output, 'lanes')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Logging Overhead Benchmark
+Computer Networks Semester Project
+
+Measures server throughput (messages/sec) with per-message logging
+switched off, logged asynchronously through the queue handler, and
+logged synchronously from the client handler threads (the old behaviour).
+
+Usage:
+    python bench/bench_logging.py --senders 8 --messages 2000
+"""
+
+import argparse
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+
+# Add src directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import server_logging
+from protocol import encode_message
+from server import ChatServer
+
+
+def configure(mode, log_file):
+    """Configure server logging for one benchmark mode"""
+    if mode == 'sync':
+        # Old behaviour: handler threads write to the output themselves
+        handler = logging.FileHandler(log_file)
+        handler.setFormatter(server_logging.StructuredFormatter(server_logging.LOG_FORMAT))
+        server_log = server_logging.get_logger()
+        for old in list(server_log.handlers):
+            server_log.removeHandler(old)
+        server_log.addHandler(handler)
+        server_log.setLevel('INFO')
+        server_log.propagate = False
+        server_logging.get_message_logger().setLevel('INFO')
+        return handler
+    message_level = 'WARNING' if mode == 'off' else 'INFO'
+    return server_logging.setup_logging(level='INFO', message_level=message_level, log_file=log_file)
+
+
+def recv_until(sock, marker, count):
+    """Read from sock until marker has been seen count times"""
+    data = b''
+    while data.count(marker) < count:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def login(port, username):
+    """Open a connection and log in"""
+    sock = socket.create_connection(('127.0.0.1', port))
+    sock.sendall(encode_message({'type': 'login', 'username': username}))
+    recv_until(sock, b'login_response', 1)
+    return sock
+
+
+def run_mode(mode, senders, messages, log_file):
+    """Run one benchmark round and return messages/sec"""
+    sink = configure(mode, log_file)
+    server = ChatServer(host='127.0.0.1', port=0)
+    threading.Thread(target=server.start, daemon=True).start()
+    server.ready.wait()
+    
+    # The receiver only drains its socket
+    receiver = login(server.port, 'receiver')
+    def drain():
+        try:
+            while receiver.recv(65536):
+                pass
+        except OSError:
+            pass
+    threading.Thread(target=drain, daemon=True).start()
+    
+    sockets = [login(server.port, f"sender{i}") for i in range(senders)]
+    time.sleep(0.2)
+    
+    barrier = threading.Barrier(senders + 1)
+    payload = encode_message({'type': 'message', 'recipient': 'receiver', 'content': 'x' * 64})
+    
+    def send_loop(sock):
+        # Drop any user_joined notifications queued before the run
+        sock.settimeout(0.05)
+        try:
+            while sock.recv(65536):
+                pass
+        except socket.timeout:
+            pass
+        sock.settimeout(None)
+        barrier.wait()
+        for _ in range(messages):
+            # Stop-and-wait: one message in flight per sender
+            sock.sendall(payload)
+            recv_until(sock, b'message_sent', 1)
+    
+    threads = [threading.Thread(target=send_loop, args=(sock,)) for sock in sockets]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    
+    for sock in sockets + [receiver]:
+        sock.close()
+    server.server_socket.close()
+    if mode == 'sync':
+        sink.close()
+    else:
+        sink.stop()
+    
+    return senders * messages / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-message logging overhead benchmark")
+    parser.add_argument('--senders', type=int, default=8, help="Concurrent sending clients")
+    parser.add_argument('--messages', type=int, default=2000, help="Messages per sender")
+    parser.add_argument('--log-file', default=os.devnull, help="Log destination (default: discard)")
+    parser.add_argument('--modes', default='off,async,sync', help="Comma separated modes to run")
+    args = parser.parse_args()
+    
+    print("=" * 60)
+    print("LOGGING OVERHEAD BENCHMARK")
+    print(f"{args.senders} senders x {args.messages} messages")
+    print("=" * 60)
+    
+    for mode in args.modes.split(','):
+        rate = run_mode(mode, args.senders, args.messages, args.log_file)
+        print(f"{mode:>6}: {rate:10.0f} messages/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Message Handling Benchmark
+Computer Networks Semester Project
+
+Measures what the server spends on each chat message, without the
+network: messages are fed straight into ChatServer.process_message()
+and the connected clients are stand-in sockets that only count bytes.
+
+    memory    - bytes the history holds per stored message (tracemalloc),
+                with --content-size characters of content each
+    message   - CPU time to process one 'message' to everybody (fanned
+                out to --clients clients), to one user, and one
+                'group_message' to a group of --group-size users
+    ping      - CPU time for a 'ping', i.e. the dispatch overhead
+
+Only public server APIs are used, so the same script runs against older
+versions of the server for before/after comparisons (check out the old
+commit and run it there).
+
+Usage:
+    python bench/bench_messages.py --messages 200000
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+from loadgen import SRC_DIR, environment_info, write_results
+
+sys.path.insert(0, SRC_DIR)
+
+from server import ChatServer
+from sessions import MessageHistory
+
+
+class CountingSocket:
+    """Stands in for a client connection, counting what is sent to it"""
+
+    def __init__(self):
+        self.sent = 0
+
+    def sendall(self, data):
+        self.sent += len(data)
+
+
+def build_server(args):
+    """A server with --clients logged-in users and one group"""
+    server = ChatServer(host='127.0.0.1', port=0)
+    server.server_socket.close()
+    server.search_index = None  # Measure the history alone
+    server.chat_history = MessageHistory(args.messages)
+    sockets = []
+    for i in range(args.clients):
+        sock = CountingSocket()
+        server.process_message(sock, ('127.0.0.1', 10000 + i), None, {'type': 'login', 'username': f'user{i}'})
+        sockets.append(sock)
+    server.process_message(sockets[0], None, 'user0', {
+        'type': 'group_create', 'group_name': 'team', 'members': [f'user{i}' for i in range(args.group_size)]})
+    return server, sockets
+
+
+def cpu_per_call(server, sock, message, count):
+    """Microseconds of CPU per process_message call"""
+    gc.collect()
+    started = time.process_time()
+    for _ in range(count):
+        server.process_message(sock, None, 'user0', dict(message))
+    return round((time.process_time() - started) / count * 1e6, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-message memory and CPU benchmark")
+    parser.add_argument('--messages', type=int, default=200000, help="Messages stored for the memory figure")
+    parser.add_argument('--calls', type=int, default=20000, help="Messages per CPU measurement")
+    parser.add_argument('--clients', type=int, default=100, help="Logged-in clients")
+    parser.add_argument('--group-size', type=int, default=10, help="Members of the group")
+    parser.add_argument('--content-size', type=int, default=40, help="Characters per message")
+    parser.add_argument('--output', default=None, help="Result JSON path")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("MESSAGE HANDLING BENCHMARK")
+    print("=" * 60)
+    content = 'x' * args.content_size
+
+    server, sockets = build_server(args)
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(args.messages):
+        server.process_message(sockets[0], None, 'user0',
+                               {'type': 'message', 'recipient': 'user1', 'content': f'{i:08d}{content}'})
+    gc.collect()
+    per_message = (tracemalloc.get_traced_memory()[0] - before) / args.messages
+    tracemalloc.stop()
+    assert len(server.chat_history) == args.messages
+    print(f"Memory per stored message: {per_message:.0f} bytes "
+          f"({args.content_size + 8} characters of content)")
+
+    server, sockets = build_server(args)
+    cpu = {
+        'broadcast_us': cpu_per_call(server, sockets[0], {'type': 'message', 'recipient': 'all',
+                                                          'content': content}, args.calls),
+        'private_us': cpu_per_call(server, sockets[0], {'type': 'message', 'recipient': 'user1',
+                                                        'content': content}, args.calls),
+        'group_us': cpu_per_call(server, sockets[0], {'type': 'group_message', 'group_name': 'team',
+                                                      'content': content}, args.calls),
+        'ping_us': cpu_per_call(server, sockets[0], {'type': 'ping'}, args.calls),
+    }
+    print(f"CPU per message: broadcast to {args.clients} {cpu['broadcast_us']} us, "
+          f"private {cpu['private_us']} us, group of {args.group_size} {cpu['group_us']} us, "
+          f"ping {cpu['ping_us']} us")
+
+    results = dict(environment_info(), tool='bench_messages', config=vars(args),
+                   memory={'bytes_per_message': round(per_message)}, cpu=cpu)
+    print(f"Results written to {write_results(results, args.output, 'messages')}")
+
+
+if __name__ == "__main__":
+    main()
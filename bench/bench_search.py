@@ -0,0 +1,197 @@
+"""
+Search Benchmark
+Computer Networks Semester Project
+
+Measures the word index of the chat history (see src/search.py): how
+fast it is built as messages arrive, how much memory it takes and how
+long a 'search' request takes, compared to scanning the history.
+
+The history is filled with --messages synthetic messages whose words
+follow a Zipf distribution over a --vocabulary word list (like real
+text: a few very common words, a long tail of rare ones), sent by 1000
+users to everybody, to each other and to groups. Each query is answered
+for one user through ChatServer.search_response(), the same path a
+search request takes, including fetching the result messages:
+
+    common   - one of the most frequent words
+    medium   - a word in about 0.1% of the messages
+    rare     - a word in a handful of messages
+    and      - a common and a medium word together
+    private  - a common word in the user's busiest private conversation
+    range    - a common word within the oldest tenth of the time range
+    page     - the second page of the common word results
+
+'scan' is the same query answered by a linear pass over the history,
+newest first, stopping once a page is full (the time range is not
+applied there; messages carry no arrival time to compare).
+
+Usage:
+    python bench/bench_search.py --messages 1000000
+"""
+
+import argparse
+import itertools
+import random
+import resource
+import sys
+import time
+
+from loadgen import SRC_DIR, environment_info, summarize, write_results
+
+sys.path.insert(0, SRC_DIR)
+
+from search import CONVERSATION, DEFAULT_LIMIT, tokenize
+from server import ChatServer
+from sessions import MessageHistory
+from sync import conversation_of
+
+USERS = 1000
+WORDS_PER_MESSAGE = 8
+
+
+def build_server(args):
+    """A server whose history holds args.messages indexed messages"""
+    server = ChatServer(host='127.0.0.1', port=0)
+    server.server_socket.close()
+    server.chat_history = MessageHistory(args.messages)
+    for i in range(USERS // 5):
+        server.add_group(f'group{i}', [f'user{i * 5 + j}' for j in range(5)])
+
+    rng = random.Random(args.seed)
+    words = [f'w{i}' for i in range(args.vocabulary)]
+    weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(args.vocabulary)))
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    build_seconds = 0.0
+    started_at = time.time() - args.messages  # One message per second of history
+    for n in range(args.messages):
+        sender = rng.randrange(USERS)
+        kind = rng.random()
+        msg_id = next(server.message_ids)
+        content = ' '.join(rng.choices(words, cum_weights=weights, k=WORDS_PER_MESSAGE))
+        if kind < 0.15:
+            message = {'type': 'group_message', 'msg_id': msg_id, 'sender': f'user{sender}',
+                       'group_name': f'group{sender // 5}', 'content': content}
+        else:
+            recipient = 'all' if kind < 0.75 else f'user{rng.randrange(USERS)}'
+            message = {'type': 'message', 'msg_id': msg_id, 'sender': f'user{sender}',
+                       'recipient': recipient, 'content': content}
+        message['timestamp'] = '2024-01-01 12:00:00'
+        started = time.perf_counter()
+        server.chat_history.append(message)
+        server.search_index.add(message, arrived=started_at + n)
+        build_seconds += time.perf_counter() - started
+    rss_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+    return server, build_seconds, rss_mb
+
+
+def pick_words(server):
+    """A common, a medium and a rare word by posting list length"""
+    by_length = sorted(((word, posting) for word, posting in server.search_index.postings.items()
+                        if not word.startswith(CONVERSATION)), key=lambda item: len(item[1]))
+    total = len(server.search_index)
+    medium = next(word for word, posting in by_length if len(posting) >= total // 1000)
+    rare = next(word for word, posting in by_length if len(posting) >= 3)
+    return by_length[-1][0], medium, rare
+
+
+def busiest_partner(server, username):
+    """The user username has the most private messages with"""
+    postings = server.search_index.postings
+    pairs = [key for key in postings if key.startswith(CONVERSATION + 'pair:')
+             and username in key.split(':', 1)[1].split('\0')]
+    pair = max(pairs, key=lambda key: len(postings[key]))
+    return next(name for name in pair.split(':', 1)[1].split('\0') if name != username)
+
+
+def scan(server, username, message):
+    """Answer a search by a linear pass over the history (the baseline)"""
+    words = tokenize(message['query'])
+    before = message.get('before')
+    conversation = message.get('conversation')
+    results = []
+    for stored in reversed(server.chat_history.messages):
+        if before is not None and stored['msg_id'] >= before:
+            continue
+        if conversation is not None and conversation_of(stored, username) != conversation:
+            continue
+        if stored.get('type') == 'group_message':
+            if username not in (server.groups.get(stored['group_name']) or ()):
+                continue
+        elif stored['recipient'] != 'all' and username not in (stored['sender'], stored['recipient']):
+            continue
+        if words <= tokenize(stored['content']):
+            results.append(stored)
+            if len(results) == DEFAULT_LIMIT:
+                break
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat history search benchmark")
+    parser.add_argument('--messages', type=int, default=1000000, help="Messages in the history")
+    parser.add_argument('--vocabulary', type=int, default=50000, help="Distinct words")
+    parser.add_argument('--queries', type=int, default=200, help="Repetitions per query")
+    parser.add_argument('--scans', type=int, default=3, help="Repetitions per linear scan")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', default=None, help="Result JSON path")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("SEARCH BENCHMARK")
+    print("=" * 60)
+    server, build_seconds, rss_mb = build_server(args)
+    index = server.search_index
+    print(f"Indexed {len(index)} messages, {len(index.postings)} posting lists: "
+          f"{len(index) / build_seconds:.0f} messages/s, ~{rss_mb:.0f} MB for history and index")
+
+    username = 'user1'
+    common, medium, rare = pick_words(server)
+    first_page = server.search_response(username, {'query': common})
+    middle = time.time() - args.messages * 0.9
+    queries = {
+        'common': {'query': common},
+        'medium': {'query': medium},
+        'rare': {'query': rare},
+        'and': {'query': f'{common} {medium}'},
+        'private': {'query': common, 'conversation': f'user:{busiest_partner(server, username)}'},
+        'range': {'query': common, 'to': middle},
+        'page': {'query': common, 'before': first_page['next_before']},
+    }
+
+    print(f"{'query':>8} {'matches':>8} {'results':>8} {'p50 ms':>8} {'p99 ms':>8} {'scan ms':>9}")
+    rounds = []
+    for name, message in queries.items():
+        message = dict(message, type='search')
+        latencies = []
+        for _ in range(args.queries):
+            started = time.perf_counter()
+            response = server.search_response(username, message)
+            latencies.append(time.perf_counter() - started)
+        scans = []
+        for _ in range(args.scans):
+            started = time.perf_counter()
+            scanned = scan(server, username, message)
+            scans.append(time.perf_counter() - started)
+        assert [m['msg_id'] for m in scanned] == [m['msg_id'] for m in response['results']] \
+            or name == 'range', name
+        row = {
+            'query': name,
+            'words': message['query'],
+            'postings': min(len(index.postings[word]) for word in tokenize(message['query'])),
+            'results': len(response['results']),
+            'search_ms': summarize(latencies),
+            'scan_ms': round(min(scans) * 1000, 1),
+        }
+        rounds.append(row)
+        print(f"{name:>8} {row['postings']:>8} {row['results']:>8} {row['search_ms']['p50']:>8} "
+              f"{row['search_ms']['p99']:>8} {row['scan_ms']:>9}")
+
+    results = dict(environment_info(), tool='bench_search', config=vars(args),
+                   build={'messages_per_second': round(len(index) / build_seconds),
+                          'posting_lists': len(index.postings), 'rss_mb': round(rss_mb)},
+                   rounds=rounds)
+    print(f"Results written to {write_results(results, args.output, 'search')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Snapshot Startup Benchmark
+Computer Networks Semester Project
+
+Measures how long a restarted server needs to restore its state from a
+snapshot (see src/snapshot.py), depending on how much history there is.
+
+For each history size it writes a snapshot with that many messages plus
+--groups groups, then times:
+
+    write    - saving the snapshot
+    resave   - the next periodic save after --new more messages (only
+               those are encoded, the rest is copied from the last file)
+    restore  - StateSnapshots.restore() into a fresh ChatServer
+    recent   - restore plus decoding the --recent newest messages
+    json     - loading the same state saved as one JSON document, the
+               straightforward alternative that parses everything up front
+
+Usage:
+    python bench/bench_snapshot.py --sizes 10000,100000,1000000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from loadgen import SRC_DIR, environment_info, write_results
+
+sys.path.insert(0, SRC_DIR)
+
+from server import ChatServer
+from sessions import MessageHistory
+from snapshot import StateSnapshots
+
+
+def build_server(messages, groups):
+    """A server with the given number of history messages and groups"""
+    server = ChatServer(host='127.0.0.1', port=0)
+    server.server_socket.close()
+    server.chat_history = MessageHistory(max(messages, 1))
+    for i in range(groups):
+        server.add_group(f'group{i}', [f'user{i * 5 + j}' for j in range(5)])
+    add_messages(server, messages)
+    return server
+
+
+def add_messages(server, count):
+    for _ in range(count):
+        msg_id = next(server.message_ids)
+        server.chat_history.append({
+            'type': 'message', 'msg_id': msg_id, 'sender': f'user{msg_id % 1000}',
+            'recipient': 'all', 'content': f'message number {msg_id} ' + 'x' * 60,
+            'timestamp': '2024-01-01 12:00:00'
+        })
+
+
+def measure(size, args, directory):
+    path = os.path.join(directory, f'state-{size}.snap')
+    json_path = os.path.join(directory, f'state-{size}.json')
+    server = build_server(size, args.groups)
+
+    with open(json_path, 'w') as f:
+        json.dump({'groups': {name: list(members) for name, members in server.groups.snapshot().items()},
+                   'history': list(server.chat_history.messages),
+                   'next_msg_id': next(server.message_ids)}, f)
+
+    started = time.perf_counter()
+    StateSnapshots(path).attach(server)
+    server.snapshots.save()
+    write_ms = (time.perf_counter() - started) * 1000
+
+    add_messages(server, args.new)
+    started = time.perf_counter()
+    server.snapshots.save()
+    resave_ms = (time.perf_counter() - started) * 1000
+    del server
+
+    restore_ms, recent_ms = [], []
+    for _ in range(args.repeat):
+        fresh = ChatServer(host='127.0.0.1', port=0)
+        fresh.server_socket.close()
+        started = time.perf_counter()
+        StateSnapshots(path).attach(fresh)
+        fresh.snapshots.restore()
+        restore_ms.append((time.perf_counter() - started) * 1000)
+        assert len(fresh.chat_history.recent(args.recent)) == min(args.recent, len(fresh.chat_history))
+        recent_ms.append((time.perf_counter() - started) * 1000)
+
+    json_ms = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        with open(json_path) as f:
+            state = json.load(f)
+        assert len(state['history']) == size
+        json_ms.append((time.perf_counter() - started) * 1000)
+        del state
+
+    return {
+        'messages': size,
+        'groups': args.groups,
+        'snapshot_mb': round(os.path.getsize(path) / 1e6, 1),
+        'json_mb': round(os.path.getsize(json_path) / 1e6, 1),
+        'write_ms': round(write_ms, 1),
+        'resave_ms': round(resave_ms, 1),
+        'restore_ms': round(min(restore_ms), 2),
+        'restore_recent_ms': round(min(recent_ms), 2),
+        'json_load_ms': round(min(json_ms), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot startup benchmark")
+    parser.add_argument('--sizes', default='10000,100000,1000000', help="Comma separated history sizes")
+    parser.add_argument('--groups', type=int, default=1000, help="Groups in the state")
+    parser.add_argument('--new', type=int, default=1000, help="Messages added before the second save")
+    parser.add_argument('--recent', type=int, default=100, help="Newest messages decoded after restore")
+    parser.add_argument('--repeat', type=int, default=3, help="Restores per size (best is reported)")
+    parser.add_argument('--output', default=None, help="Result JSON path")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("SNAPSHOT STARTUP BENCHMARK")
+    print("=" * 60)
+    print(f"{'messages':>10} {'file MB':>8} {'write ms':>9} {'resave ms':>10} {'restore ms':>11} "
+          f"{'+recent ms':>11} {'json load ms':>13}")
+
+    rounds = []
+    with tempfile.TemporaryDirectory(prefix='chat-bench-snapshot-') as directory:
+        for size in (int(n) for n in args.sizes.split(',')):
+            row = measure(size, args, directory)
+            rounds.append(row)
+            print(f"{size:>10} {row['snapshot_mb']:>8} {row['write_ms']:>9} {row['resave_ms']:>10} "
+                  f"{row['restore_ms']:>11} "
+                  f"{row['restore_recent_ms']:>11} {row['json_load_ms']:>13}")
+
+    results = dict(environment_info(), tool='bench_snapshot', config=vars(args), rounds=rounds)
+    print(f"Results written to {write_results(results, args.output, 'snapshot')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+TLS Connection Setup Benchmark
+Computer Networks Semester Project
+
+Measures how many new sessions per second the server can set up: each
+client thread repeatedly connects, completes the TLS handshake, logs in,
+waits for the login response and disconnects. Three rounds run against a
+server with a fresh self-signed certificate (see src/tls.py):
+
+    plain    - no TLS, the baseline
+    full     - every connection does a full TLS handshake
+    resumed  - clients offer the session of their previous connection
+
+Besides connections per second and setup latency it reports the CPU time
+the server process spent per connection (read from /proc on Linux).
+
+Usage:
+    python bench/bench_tls.py --clients 4 --duration 5
+    python bench/bench_tls.py --server-args "--engine threads"
+"""
+
+import argparse
+import os
+import socket
+import ssl
+import sys
+import tempfile
+import threading
+import time
+
+from loadgen import (SRC_DIR, environment_info, free_port, start_server_process, summarize,
+                     write_results)
+from protocol import FrameReader, RECV_SIZE, encode_message
+
+sys.path.insert(0, SRC_DIR)
+
+from tls import client_context, generate_self_signed
+
+
+def process_cpu_seconds(pid):
+    """User + system CPU time of a process, or None where /proc is not available"""
+    try:
+        with open(f'/proc/{pid}/stat') as stat:
+            fields = stat.read().rsplit(')', 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def open_session(port, username, context=None, session=None):
+    """Connect, handshake and log in; returns (TLS session, whether it was resumed)"""
+    sock = socket.create_connection(('127.0.0.1', port), timeout=10)
+    try:
+        if context is not None:
+            sock = context.wrap_socket(sock, server_hostname='localhost', session=session)
+        sock.sendall(encode_message({'type': 'login', 'username': username}))
+        reader = FrameReader()
+        while True:
+            data = sock.recv(RECV_SIZE)
+            if not data:
+                raise ConnectionError("closed before login response")
+            if any(message.get('type') == 'login_response' for message in reader.feed(data)):
+                break
+        if context is not None:
+            return sock.session, sock.session_reused
+        return None, False
+    finally:
+        sock.close()
+
+
+def run_round(name, port, args, context=None, resume=False):
+    """Open sessions from args.clients threads for args.duration seconds"""
+    latencies = [[] for _ in range(args.clients)]
+    reused = [0] * args.clients
+    errors = [0] * args.clients
+    stop_at = time.perf_counter() + args.duration
+
+    def client(index):
+        session = None
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                new_session, was_reused = open_session(port, f'{name}{index}', context,
+                                                       session if resume else None)
+            except (OSError, ssl.SSLError):
+                errors[index] += 1
+                continue
+            latencies[index].append(time.perf_counter() - start)
+            reused[index] += was_reused
+            session = new_session
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    all_latencies = [value for values in latencies for value in values]
+    return {
+        'name': name,
+        'connections': len(all_latencies),
+        'per_second': round(len(all_latencies) / elapsed, 1),
+        'setup_ms': summarize(all_latencies),
+        'resumed': sum(reused),
+        'errors': sum(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TLS connection setup benchmark")
+    parser.add_argument('--clients', type=int, default=4, help="Concurrent connecting threads")
+    parser.add_argument('--duration', type=float, default=5.0, help="Seconds per round")
+    parser.add_argument('--server-args', default='--engine selector', help="Extra server options")
+    parser.add_argument('--output', default=None, help="Result JSON path")
+    args = parser.parse_args()
+
+    cert_dir = tempfile.mkdtemp(prefix='chat-bench-tls-')
+    certfile, keyfile = generate_self_signed(os.path.join(cert_dir, 'server.crt'),
+                                             os.path.join(cert_dir, 'server.key'))
+    context = client_context(certfile)
+    tls_args = ['--tls-cert', certfile, '--tls-key', keyfile]
+
+    print("=" * 60)
+    print("TLS CONNECTION SETUP BENCHMARK")
+    print(f"{args.clients} clients, {args.duration}s per round, {ssl.OPENSSL_VERSION}, "
+          f"{os.cpu_count()} CPUs")
+    print("=" * 60)
+    print(f"{'round':>8} {'conn/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'cpu ms/conn':>12} {'resumed':>8}")
+
+    rounds = []
+    for name, tls, resume in (('plain', False, False), ('full', True, False), ('resumed', True, True)):
+        port = free_port()
+        server = start_server_process(port, args.server_args.split() + (tls_args if tls else []))
+        try:
+            cpu_before = process_cpu_seconds(server.pid)
+            result = run_round(name, port, args, context if tls else None, resume)
+            cpu_after = process_cpu_seconds(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+        if cpu_before is not None and result['connections']:
+            result['server_cpu_ms_per_connection'] = round(
+                (cpu_after - cpu_before) * 1000 / result['connections'], 3)
+        rounds.append(result)
+        print(f"{name:>8} {result['per_second']:>8} {result['setup_ms'].get('p50'):>8} "
+              f"{result['setup_ms'].get('p99'):>8} "
+              f"{result.get('server_cpu_ms_per_connection', '-'):>12} {result['resumed']:>8}")
+
+    results = dict(environment_info(), tool='bench_tls', config=vars(args), rounds=rounds)
+    print(f"Results written to {write_results(results, args.output, 'tls')}")
+
+
+if __name__ == "__main__":
+    main()
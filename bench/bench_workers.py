@@ -0,0 +1,95 @@
+"""
+Multi-Process Scaling Benchmark
+Computer Networks Semester Project
+
+Runs the load generator against server.py --workers N for several worker
+counts and reports how delivered messages/sec scale.
+
+The clients are split over several load generator processes (each with
+its own username prefix) so that the generators are not limited to one
+core either. Broadcasts are left out of the default mix because each
+generator only knows how many deliveries its own clients should get.
+
+Scaling needs free cores: run it on a machine with at least
+workers + generators CPUs.
+
+Usage:
+    python bench/bench_workers.py --workers 1,2,4 --generators 4 --clients 50
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from loadgen import environment_info, free_port, start_server_process, write_results
+
+LOADGEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'loadgen.py')
+
+
+def run_round(workers, args):
+    """Run all generators against one server configuration"""
+    port = free_port()
+    server = start_server_process(port, ['--workers', str(workers)])
+    directory = tempfile.mkdtemp(prefix='bench-workers-')
+    try:
+        generators = []
+        for index in range(args.generators):
+            output = os.path.join(directory, f"gen{index}.json")
+            command = [sys.executable, LOADGEN, '--target', f"127.0.0.1:{port}",
+                       '--user-prefix', f"g{index}-", '--clients', str(args.clients),
+                       '--rate', str(args.rate), '--duration', str(args.duration),
+                       '--mix', args.mix, '--output', output]
+            generators.append((subprocess.Popen(command, stdout=subprocess.DEVNULL), output))
+        results = []
+        for process, output in generators:
+            process.wait()
+            with open(output) as f:
+                results.append(json.load(f))
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        'workers': workers,
+        'sent_per_s': round(sum(r['throughput']['sent_per_s'] for r in results), 1),
+        'delivered_per_s': round(sum(r['throughput']['delivered_per_s'] for r in results), 1),
+        'delivered': sum(sum(r['throughput']['delivered'].values()) for r in results),
+        'expected': sum(sum(r['throughput']['expected'].values()) for r in results),
+        'p99_ms': max(r['latency_ms']['all'].get('p99') or 0 for r in results),
+        'errors': sum(r['errors'] for r in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker process scaling benchmark")
+    parser.add_argument('--workers', default='1,2,4', help="Comma separated worker counts")
+    parser.add_argument('--generators', type=int, default=4, help="Load generator processes")
+    parser.add_argument('--clients', type=int, default=25, help="Clients per generator")
+    parser.add_argument('--rate', type=float, default=200.0, help="Operations per second per client")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds of traffic")
+    parser.add_argument('--mix', default='message=80,group=20', help="Operation mix")
+    parser.add_argument('--output', default=None, help="Result JSON path")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("MULTI-PROCESS SCALING BENCHMARK")
+    print(f"{args.generators} generators x {args.clients} clients, {args.rate} ops/s each, "
+          f"{os.cpu_count()} CPUs")
+    print("=" * 60)
+
+    rounds = []
+    for workers in [int(n) for n in args.workers.split(',')]:
+        result = run_round(workers, args)
+        rounds.append(result)
+        print(f"{workers:>3} workers: {result['delivered_per_s']:>10} delivered/s  "
+              f"p99 {result['p99_ms']} ms  ({result['delivered']}/{result['expected']} delivered)")
+
+    results = dict(environment_info(), tool='bench_workers', config=vars(args), rounds=rounds)
+    print(f"Results written to {write_results(results, args.output, 'workers')}")
+
+
+if __name__ == "__main__":
+    main()
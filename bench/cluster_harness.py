@@ -0,0 +1,103 @@
+"""
+Multi-Node Cluster Harness
+Computer Networks Semester Project
+
+Starts a message bus broker and several chat server nodes on localhost,
+each node a separate server.py process on its own port joined to the
+bus, then runs the load generator with its clients spread over all nodes.
+Users on different nodes message each other, and groups span nodes.
+
+Usage:
+    python bench/cluster_harness.py --nodes 3 --clients 30 --duration 10
+    python bench/cluster_harness.py --nodes 3 --keep-running   # for manual testing
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from loadgen import (SRC_DIR, LoadGenerator, environment_info, free_port, wait_for_port,
+                     write_results)
+
+
+def start_cluster(nodes, extra_args=()):
+    """Start a bus broker and N server nodes, return (processes, node ports)"""
+    bus_port = free_port()
+    broker = subprocess.Popen([sys.executable, os.path.join(SRC_DIR, 'bus.py'),
+                               '--listen', f"127.0.0.1:{bus_port}"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_for_port('127.0.0.1', bus_port):
+        broker.kill()
+        raise RuntimeError("Bus broker did not start")
+
+    processes = [broker]
+    ports = []
+    for index in range(nodes):
+        port = free_port()
+        command = [sys.executable, os.path.join(SRC_DIR, 'server.py'),
+                   '--host', '127.0.0.1', '--port', str(port), '--log-level', 'WARNING',
+                   '--cluster', f"127.0.0.1:{bus_port}", '--node-id', f"node{index}"]
+        processes.append(subprocess.Popen(command + list(extra_args),
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+        ports.append(port)
+    for port in ports:
+        if not wait_for_port('127.0.0.1', port):
+            stop_cluster(processes)
+            raise RuntimeError("Server node did not start")
+    # Let the nodes exchange their hello/sync messages
+    time.sleep(0.5)
+    return processes, ports
+
+
+def stop_cluster(processes):
+    # Nodes first, then the broker
+    for process in reversed(processes):
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a localhost multi-node chat cluster")
+    parser.add_argument('--nodes', type=int, default=3, help="Number of server nodes")
+    parser.add_argument('--clients', type=int, default=30, help="Clients spread over the nodes")
+    parser.add_argument('--rate', type=float, default=20.0, help="Operations per second per client")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds of traffic")
+    parser.add_argument('--mix', default='message=70,broadcast=5,group=20,file=5',
+                        help="Operation mix")
+    parser.add_argument('--keep-running', action='store_true',
+                        help="Only start the cluster and wait (Ctrl+C to stop)")
+    parser.add_argument('--output', default=None, help="Result JSON path")
+    args = parser.parse_args()
+
+    processes, ports = start_cluster(args.nodes)
+    print("=" * 60)
+    print("MULTI-NODE CLUSTER")
+    print(f"{args.nodes} nodes on ports {', '.join(map(str, ports))}")
+    print("=" * 60)
+
+    try:
+        if args.keep_running:
+            while True:
+                time.sleep(1)
+        generator = LoadGenerator('127.0.0.1', ports[0], clients=args.clients, mix=args.mix,
+                                  rate=args.rate, duration=args.duration,
+                                  targets=[('127.0.0.1', port) for port in ports])
+        results = generator.run()
+    except KeyboardInterrupt:
+        return
+    finally:
+        stop_cluster(processes)
+
+    throughput = results['throughput']
+    print(f"Delivered {sum(throughput['delivered'].values())} of "
+          f"{sum(throughput['expected'].values())} expected messages")
+    print(f"Latency p50 {results['latency_ms']['all'].get('p50')} ms, "
+          f"p99 {results['latency_ms']['all'].get('p99')} ms")
+    results = dict(environment_info(), tool='cluster_harness', config=vars(args), **results)
+    print(f"Results written to {write_results(results, args.output, 'cluster')}")
+
+
+if __name__ == "__main__":
+    main()
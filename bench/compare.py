@@ -0,0 +1,77 @@
+"""
+Benchmark Result Comparison
+Computer Networks Semester Project
+
+Compares two loadgen.py result files and flags regressions.
+
+Usage:
+    python bench/compare.py bench/results/old.json bench/results/new.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+
+# (label, path in the result JSON, True if higher is better)
+METRICS = [
+    ('connection rate (conn/s)', ('connections', 'rate_per_s'), True),
+    ('sent (req/s)', ('throughput', 'sent_per_s'), True),
+    ('delivered (msg/s)', ('throughput', 'delivered_per_s'), True),
+    ('latency p50 (ms)', ('latency_ms', 'all', 'p50'), False),
+    ('latency p99 (ms)', ('latency_ms', 'all', 'p99'), False),
+    ('latency p999 (ms)', ('latency_ms', 'all', 'p999'), False),
+]
+
+
+def lookup(results, path):
+    """Follow a key path into nested dictionaries, None if missing"""
+    for key in path:
+        if not isinstance(results, dict) or key not in results:
+            return None
+        results = results[key]
+    return results
+
+
+def compare(old, new, threshold):
+    """Return a list of (label, old, new, change %, regressed) rows"""
+    rows = []
+    for label, path, higher_is_better in METRICS:
+        before, after = lookup(old, path), lookup(new, path)
+        if not before or after is None:
+            rows.append((label, before, after, None, False))
+            continue
+        change = (after - before) / before * 100
+        worse = -change if higher_is_better else change
+        rows.append((label, before, after, change, worse > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two load generator result files")
+    parser.add_argument('old', help="Baseline result JSON")
+    parser.add_argument('new', help="New result JSON")
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help="Percent change counted as a regression")
+    args = parser.parse_args()
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print(f"old: {old.get('git_commit')} {old.get('timestamp')}")
+    print(f"new: {new.get('git_commit')} {new.get('timestamp')}")
+    print()
+
+    regressions = 0
+    for label, before, after, change, regressed in compare(old, new, args.threshold):
+        change_text = f"{change:+.1f}%" if change is not None else "n/a"
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{label:<26} {before!s:>12} {after!s:>12} {change_text:>9}{flag}")
+        regressions += regressed
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
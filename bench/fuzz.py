@@ -0,0 +1,306 @@
+"""
+Protocol Fuzzer
+Computer Networks Semester Project
+
+Sends malformed, truncated and oversized frames to a local chat server
+and checks that it neither crashes nor leaks. Every case is one
+connection (logged in or not) that sends one kind of bad input:
+
+    garbage      - random bytes
+    invalid      - broken JSON, invalid UTF-8
+    not_object   - valid JSON that is not an object
+    nested       - deeply nested arrays/objects
+    wrong_types  - known message types with fields of random JSON types
+    unknown      - unknown message types
+    truncated    - a valid frame cut short (sometimes closing right after)
+    split        - valid frames sent a few bytes at a time
+    oversized    - a frame larger than the server accepts
+    flood        - many small valid frames at once
+
+After the input the case sends a ping: the server must answer with a
+pong or close the connection (oversized frames), never hang. At the end
+two fresh clients must still be able to log in and exchange a message,
+and the server process must not hold more file descriptors or threads
+than before (the connections are all gone by then). The pool engine may
+have started more of its DEFAULT_WORKERS worker threads meanwhile.
+
+Usage:
+    python bench/fuzz.py --engine threads --cases 2000
+    python bench/fuzz.py --engine selector --cases 5000 --seed 7
+"""
+
+import argparse
+import base64
+import os
+import random
+import socket
+import sys
+import time
+
+from loadgen import SRC_DIR, environment_info, free_port, start_server_process, write_results
+
+sys.path.insert(0, SRC_DIR)
+
+from pool_server import DEFAULT_WORKERS
+from protocol import FrameReader, RECV_SIZE, encode_message
+
+KINDS = ('garbage', 'invalid', 'not_object', 'nested', 'wrong_types', 'unknown', 'truncated',
+         'split', 'oversized', 'flood')
+
+# Fields each message type reads
+MESSAGE_FIELDS = {
+    'login': ('username',),
+    'message': ('recipient', 'content'),
+    'group_create': ('group_name', 'members'),
+    'group_message': ('group_name', 'content'),
+    'file_offer': ('sha256', 'filename', 'recipient', 'recipients', 'group_name'),
+    'file_transfer': ('sha256', 'filename', 'filedata', 'recipient', 'recipients', 'group_name'),
+    'ping': (),
+    'pong': (),
+    'sync': ('since', 'after'),
+    'search': ('query', 'conversation', 'from', 'to', 'before', 'limit'),
+    'get_users': (),
+}
+
+FIELDS = tuple(sorted({field for fields in MESSAGE_FIELDS.values() for field in fields})) + ('sent_at', 'trace')
+
+# Seconds a case waits for the answer to its ping
+PROBE_TIMEOUT = 5.0
+
+
+def random_value(rng, depth=0):
+    """A random JSON value, biased towards the troublesome ones"""
+    kind = rng.randrange(12 if depth < 3 else 9)
+    if kind == 0:
+        return None
+    if kind == 1:
+        return rng.choice((True, False))
+    if kind == 2:
+        return rng.choice((0, -1, 2 ** 63, -(2 ** 63), 2 ** 64 + 1, rng.randint(-10 ** 6, 10 ** 6)))
+    if kind == 3:
+        return rng.choice((0.5, -1e308, 1e308, rng.random()))
+    if kind == 4:
+        return ''
+    if kind == 5:
+        return rng.choice(('all', 'fuzz0', 'group:x', 'user:fuzz1', 'pair:\0x'))
+    if kind == 6:
+        return ''.join(chr(rng.randrange(1, 0x3000)) for _ in range(rng.randrange(1, 40)))
+    if kind == 7:
+        return 'x' * rng.randrange(1000, 100000)
+    if kind == 8:
+        return base64.b64encode(os.urandom(rng.randrange(0, 64))).decode()
+    if kind == 9:
+        return [random_value(rng, depth + 1) for _ in range(rng.randrange(0, 5))]
+    if kind == 10:
+        return {rng.choice(FIELDS): random_value(rng, depth + 1) for _ in range(rng.randrange(0, 4))}
+    return [rng.choice(('fuzz0', 'fuzz1', 'all'))] * rng.randrange(0, 5)
+
+
+def case_chunks(kind, rng, max_frame_size):
+    """Byte chunks a case sends, and whether the server may close the connection"""
+    if kind == 'garbage':
+        return [os.urandom(rng.randrange(1, 4096)) + b'\n'], False
+    if kind == 'invalid':
+        return [rng.choice((b'{"type": "message",\n', b'{]\n', b'\xff\xfe{"type":"ping"}\n',
+                            b'{"type": "ping"}}\n', b'{"a":1,"a"\n', b'\x00\n', b'{"type": NaN}\n',
+                            b'9' * 5000 + b'\n'))], False
+    if kind == 'not_object':
+        return [rng.choice((b'[1,2]\n', b'"ping"\n', b'null\n', b'42\n', b'true\n', b'[]\n'))], False
+    if kind == 'nested':
+        depth = rng.choice((1000, 100000))
+        opener, closer = rng.choice(((b'[', b']'), (b'{"a":', b'}')))
+        frame = opener * depth + closer * depth + b'\n'
+        return [frame], len(frame) > max_frame_size
+    if kind == 'wrong_types':
+        msg_type = rng.choice(list(MESSAGE_FIELDS))
+        message = {'type': msg_type}
+        for field in MESSAGE_FIELDS[msg_type] + tuple(rng.sample(FIELDS, 2)):
+            if rng.random() < 0.8:
+                message[field] = random_value(rng)
+        return [encode_message(message)], False
+    if kind == 'unknown':
+        message = {'type': random_value(rng), rng.choice(FIELDS): random_value(rng)}
+        return [encode_message(message)], False
+    if kind == 'truncated':
+        frame = encode_message({'type': 'message', 'recipient': 'all', 'content': 'x' * rng.randrange(10, 5000)})
+        return [frame[:rng.randrange(1, len(frame) - 1)]], False
+    if kind == 'split':
+        data = b''.join(encode_message({'type': rng.choice(('ping', 'get_users'))}) for _ in range(10))
+        chunks = []
+        while data:
+            size = rng.randrange(1, 8)
+            chunks.append(data[:size])
+            data = data[size:]
+        return chunks, False
+    if kind == 'oversized':
+        size = max_frame_size + RECV_SIZE * 2
+        return [b'{"type":"message","content":"' + b'x' * size], True
+    if kind == 'flood':
+        return [encode_message({'type': 'ping'}) * rng.randrange(100, 2000)], False
+    raise ValueError(kind)
+
+
+def run_case(host, port, kind, rng, max_frame_size, index):
+    """Run one case; returns 'answered', 'closed' or an error description"""
+    chunks, may_close = case_chunks(kind, rng, max_frame_size)
+    try:
+        sock = socket.create_connection((host, port), timeout=PROBE_TIMEOUT)
+    except OSError as e:
+        return f"connect failed: {e}"
+    reader = FrameReader()
+    try:
+        if rng.random() < 0.5:
+            sock.sendall(encode_message({'type': 'login', 'username': f'fuzz{index}'}))
+        for chunk in chunks:
+            sock.sendall(chunk)
+        if kind == 'truncated' and rng.random() < 0.5:
+            return 'closed'  # Hang up in the middle of a frame
+        sock.sendall(b'\n' + encode_message({'type': 'ping', 'fuzz_probe': index}))
+        deadline = time.monotonic() + PROBE_TIMEOUT
+        while time.monotonic() < deadline:
+            data = sock.recv(RECV_SIZE)
+            if not data:
+                return 'closed' if may_close else f"{kind}: connection closed"
+            for message in reader.feed(data):
+                if message.get('type') == 'pong':
+                    return 'answered'
+        return f"{kind}: no answer"
+    except socket.timeout:
+        return f"{kind}: no answer"
+    except OSError as e:
+        return 'closed' if may_close else f"{kind}: {e}"
+    finally:
+        sock.close()
+
+
+def run_fuzz(host, port, cases, seed=1, max_frame_size=None, kinds=KINDS):
+    """Run cases fuzz cases; returns ({kind: {outcome: count}}, [failures])"""
+    from protocol import MAX_FRAME_SIZE
+    max_frame_size = max_frame_size or MAX_FRAME_SIZE
+    rng = random.Random(seed)
+    outcomes = {kind: {} for kind in kinds}
+    failures = []
+    for index in range(cases):
+        kind = kinds[index % len(kinds)]
+        outcome = run_case(host, port, kind, rng, max_frame_size, index)
+        if outcome not in ('answered', 'closed'):
+            failures.append(outcome)
+            outcome = 'failed'
+        outcomes[kind][outcome] = outcomes[kind].get(outcome, 0) + 1
+    return outcomes, failures
+
+
+def healthy(host, port, timeout=5.0):
+    """Whether two fresh clients can log in and exchange a message"""
+    try:
+        alice = socket.create_connection((host, port), timeout=timeout)
+        bob = socket.create_connection((host, port), timeout=timeout)
+    except OSError:
+        return False
+    try:
+        readers = {alice: FrameReader(), bob: FrameReader()}
+
+        def wait_for(sock, msg_type):
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                data = sock.recv(RECV_SIZE)
+                if not data:
+                    return None
+                for message in readers[sock].feed(data):
+                    if message.get('type') == msg_type:
+                        return message
+            return None
+
+        alice.sendall(encode_message({'type': 'login', 'username': 'health-alice'}))
+        bob.sendall(encode_message({'type': 'login', 'username': 'health-bob'}))
+        if not wait_for(alice, 'login_response') or not wait_for(bob, 'login_response'):
+            return False
+        alice.sendall(encode_message({'type': 'message', 'recipient': 'health-bob', 'content': 'still alive'}))
+        received = wait_for(bob, 'message')
+        return bool(received) and received.get('content') == 'still alive'
+    except OSError:
+        return False
+    finally:
+        alice.close()
+        bob.close()
+
+
+def process_usage(pid):
+    """(open file descriptors, threads, RSS in MB) of a process, from /proc"""
+    fds = len(os.listdir(f'/proc/{pid}/fd'))
+    status = {}
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            status[key] = value.split()
+    return fds, int(status['Threads'][0]), int(status['VmRSS'][0]) / 1024
+
+
+def settle(pid, baseline, timeout=10.0):
+    """Wait for fds and threads to get back to baseline; returns the last usage"""
+    deadline = time.monotonic() + timeout
+    while True:
+        usage = process_usage(pid)
+        if (usage[0] <= baseline[0] and usage[1] <= baseline[1]) or time.monotonic() > deadline:
+            return usage
+        time.sleep(0.2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat protocol fuzzer")
+    parser.add_argument('--engine', default='threads', choices=['threads', 'selector', 'pool'])
+    parser.add_argument('--cases', type=int, default=2000, help="Fuzz cases (connections)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--max-frame-mb', type=float, default=1.0,
+                        help="Frame size limit the server is started with (oversized cases exceed it)")
+    parser.add_argument('--output', default=None, help="Result JSON path")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"PROTOCOL FUZZER ({args.engine} engine, {args.cases} cases)")
+    print("=" * 60)
+    port = free_port()
+    max_frame_size = int(args.max_frame_mb * 1024 * 1024)
+    process = start_server_process(port, ['--engine', args.engine, '--max-frame-mb', str(args.max_frame_mb),
+                                          '--heartbeat-interval', '0'])
+    try:
+        healthy('127.0.0.1', port)  # Warm up
+        baseline = settle(process.pid, (0, 0), timeout=1.0)
+        started = time.perf_counter()
+        outcomes, failures = run_fuzz('127.0.0.1', port, args.cases, args.seed, max_frame_size)
+        elapsed = time.perf_counter() - started
+        alive = process.poll() is None
+        usage = settle(process.pid, baseline) if alive else None
+        works = alive and healthy('127.0.0.1', port)
+    finally:
+        process.kill()
+        process.wait()
+
+    for kind, counts in outcomes.items():
+        print(f"{kind:>12}: " + ", ".join(f"{outcome} {count}" for outcome, count in sorted(counts.items())))
+    for failure in sorted(set(failures))[:20]:
+        print(f"  failure: {failure} (x{failures.count(failure)})")
+    problems = list(failures)
+    if not alive:
+        problems.append("server process exited")
+    elif not works:
+        problems.append("server no longer serves clients")
+    else:
+        print(f"fds {baseline[0]} -> {usage[0]}, threads {baseline[1]} -> {usage[1]}, "
+              f"RSS {baseline[2]:.1f} -> {usage[2]:.1f} MB")
+        if usage[0] > baseline[0]:
+            problems.append(f"file descriptors leaked: {baseline[0]} -> {usage[0]}")
+        # Executor threads are started on demand, up to the worker count
+        if usage[1] > baseline[1] + (DEFAULT_WORKERS if args.engine == 'pool' else 0):
+            problems.append(f"threads leaked: {baseline[1]} -> {usage[1]}")
+    print(f"{args.cases} cases in {elapsed:.1f} s: " + ("PASS" if not problems else "FAIL"))
+
+    results = dict(environment_info(), tool='fuzz', config=vars(args), outcomes=outcomes,
+                   failures=failures, problems=problems,
+                   usage={'baseline': baseline, 'after': usage})
+    print(f"Results written to {write_results(results, args.output, 'fuzz')}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
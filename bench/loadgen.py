@@ -0,0 +1,611 @@
+"""
+Load Generator
+Computer Networks Semester Project
+
+Spawns N simulated chat clients against a local ChatServer and measures:
+- Connection setup rate (TCP connect + login round trip)
+- Throughput (requests sent and messages delivered per second)
+- Delivery latency percentiles (p50 / p99 / p999) per message type
+
+Every simulated client is a connection with its own receiver thread and a
+sender thread that performs a weighted random mix of operations:
+    login      - disconnect and log in again (connection churn)
+    message    - private message to a random user
+    broadcast  - message to 'all'
+    group      - message to one of the client's groups
+    file       - file transfer to a random user
+
+Every request carries 'sent_at' (time.perf_counter_ns() at send time),
+which the server copies into the forwarded message, so the receiving
+client can compute the delivery latency.
+
+Results are written as JSON so runs can be compared between versions
+(see compare.py). With --trace-rate the clients flag a sample of their
+messages for tracing, write their own send/receive spans and merge them
+with the server's per-stage trace into one Chrome trace file.
+
+Usage:
+    python bench/loadgen.py --clients 50 --duration 10
+    python bench/loadgen.py --mix message=50,group=40,file=10 --rate 100
+    python bench/loadgen.py --target 192.168.1.10:5555
+    python bench/loadgen.py --trace-rate 0.01 --trace-file trace.json
+"""
+
+import argparse
+import base64
+import datetime
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, SRC_DIR)
+
+from protocol import FrameReader, RECV_SIZE, encode_message
+from tracing import Tracer, merge_trace_files, span
+
+DEFAULT_MIX = 'message=70,broadcast=5,group=20,file=5'
+OPERATIONS = ('login', 'message', 'broadcast', 'group', 'file')
+
+# Delivered message type -> operation it is counted under
+DELIVERY_OPS = {'message': 'message', 'group_message': 'group', 'file_transfer': 'file'}
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def parse_mix(text):
+    """Parse 'message=70,group=30' into a {operation: weight} dict"""
+    mix = {}
+    for item in text.split(','):
+        if not item.strip():
+            continue
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}' (expected one of {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Operation mix must have at least one positive weight")
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(values):
+    """Summarize a list of latencies (in seconds) in milliseconds"""
+    values = sorted(values)
+    if not values:
+        return {'count': 0}
+    to_ms = lambda v: round(v * 1000, 3)
+    return {
+        'count': len(values),
+        'mean': to_ms(sum(values) / len(values)),
+        'p50': to_ms(percentile(values, 0.50)),
+        'p99': to_ms(percentile(values, 0.99)),
+        'p999': to_ms(percentile(values, 0.999)),
+        'max': to_ms(values[-1]),
+    }
+
+
+class Stats:
+    """Thread-safe counters and latency samples shared by all clients"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tracer = Tracer(process_name='loadgen')
+        self.sent = {op: 0 for op in OPERATIONS}
+        self.expected = {op: 0 for op in OPERATIONS}
+        self.delivered = {op: 0 for op in OPERATIONS}
+        self.latencies = {op: [] for op in OPERATIONS}
+        self.setup_times = []
+        self.groups_joined = 0
+        self.throttled = {}  # {request type: count} of 'throttled' replies
+        self.errors = 0
+
+    def record_sent(self, op, expected):
+        with self.lock:
+            self.sent[op] += 1
+            self.expected[op] += expected
+
+    def record_delivery(self, op, latency):
+        with self.lock:
+            self.delivered[op] += 1
+            if latency is not None:
+                self.latencies[op].append(latency)
+
+    def record_setup(self, seconds):
+        with self.lock:
+            self.setup_times.append(seconds)
+
+    def record_throttled(self, request):
+        with self.lock:
+            self.throttled[request] = self.throttled.get(request, 0) + 1
+
+    def record_error(self):
+        with self.lock:
+            self.errors += 1
+
+    def total_delivered(self):
+        with self.lock:
+            return sum(self.delivered.values())
+
+
+class SimClient:
+    """
+    One simulated (headless) chat client
+
+    OSI Model Mapping:
+    - Transport Layer: One TCP connection per client
+    - Application Layer: Scripted chat protocol traffic
+    """
+
+    def __init__(self, index, host, port, stats, prefix='user'):
+        self.index = index
+        self.username = f"{prefix}{index}"
+        self.host = host
+        self.port = port
+        self.stats = stats
+        self.socket = None
+        self.groups = []
+        self.logged_in = threading.Event()
+        self.send_lock = threading.Lock()
+
+    def connect(self):
+        """Connect, log in and wait for the login response"""
+        start = time.perf_counter()
+        sock = socket.create_connection((self.host, self.port))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.logged_in.clear()
+        self.socket = sock
+        threading.Thread(target=self.receive_loop, args=(sock,), daemon=True).start()
+        self.send({'type': 'login', 'username': self.username})
+        if not self.logged_in.wait(30):
+            raise TimeoutError(f"{self.username}: no login response")
+        self.stats.record_setup(time.perf_counter() - start)
+
+    def reconnect(self):
+        """Drop the connection and log in again"""
+        self.close()
+        self.connect()
+
+    def send(self, message):
+        with self.send_lock:
+            self.socket.sendall(encode_message(message))
+
+    def close(self):
+        if self.socket:
+            try:
+                self.socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.socket.close()
+
+    def receive_loop(self, sock):
+        """Receive messages and record delivery latency"""
+        reader = FrameReader()
+        try:
+            while True:
+                data = sock.recv(RECV_SIZE)
+                if not data:
+                    break
+                now = time.perf_counter_ns()
+                for message in reader.feed(data):
+                    self.handle_message(message, now)
+        except OSError:
+            pass
+
+    def handle_message(self, message, now):
+        msg_type = message.get('type')
+        if msg_type == 'login_response':
+            self.logged_in.set()
+        elif msg_type == 'group_created':
+            with self.stats.lock:
+                self.stats.groups_joined += 1
+        elif msg_type == 'ping':
+            self.send({'type': 'pong'})
+        elif msg_type == 'throttled':
+            self.stats.record_throttled(message.get('request'))
+        elif msg_type in DELIVERY_OPS:
+            op = DELIVERY_OPS[msg_type]
+            if op == 'message' and message.get('recipient') == 'all':
+                op = 'broadcast'
+            sent_at = message.get('sent_at')
+            if not isinstance(sent_at, int):
+                self.stats.record_delivery(op, None)
+                return
+            self.stats.record_delivery(op, (now - sent_at) / 1e9)
+            if message.get('trace'):
+                # Close the loop: client send -> client receive span
+                self.stats.tracer.add_events([span(
+                    f"deliver {msg_type} {message.get('msg_id')}", sent_at, now,
+                    self.stats.tracer.pid, self.username,
+                    {'msg_id': message.get('msg_id'), 'from': message.get('sender'),
+                     'to': self.username}
+                )])
+
+
+class LoadGenerator:
+    """
+    Drive a population of SimClients against one server
+
+    With ``targets`` (a list of (host, port)) the clients are spread
+    round-robin over several servers, e.g. the nodes of a cluster.
+    """
+
+    def __init__(self, host, port, clients=20, mix=DEFAULT_MIX, rate=20.0,
+                 duration=10.0, group_size=5, message_size=64, file_size=16384,
+                 connect_concurrency=16, seed=1, trace_rate=0.0, user_prefix='user',
+                 targets=None):
+        self.host = host
+        self.port = port
+        self.targets = targets or [(host, port)]
+        self.mix = parse_mix(mix) if isinstance(mix, str) else dict(mix)
+        self.rate = rate
+        self.duration = duration
+        self.group_size = max(2, group_size)
+        self.message_size = message_size
+        self.file_size = file_size
+        self.connect_concurrency = max(1, connect_concurrency)
+        self.seed = seed
+        self.trace_rate = trace_rate
+        self.stats = Stats()
+        self.user_prefix = user_prefix
+        self.clients = [SimClient(i, *self.targets[i % len(self.targets)], self.stats, user_prefix)
+                        for i in range(clients)]
+        self.content = 'x' * message_size
+        self.filedata = base64.b64encode(os.urandom(file_size)).decode('utf-8') if file_size else ''
+
+    def connect_all(self):
+        """Connect all clients with bounded concurrency, return elapsed seconds"""
+        pending = list(self.clients)
+        pending_lock = threading.Lock()
+
+        def worker():
+            while True:
+                with pending_lock:
+                    if not pending:
+                        return
+                    client = pending.pop()
+                try:
+                    client.connect()
+                except OSError:
+                    self.stats.record_error()
+
+        start = time.perf_counter()
+        workers = [threading.Thread(target=worker) for _ in range(self.connect_concurrency)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return time.perf_counter() - start
+
+    def create_groups(self, timeout=10.0):
+        """Partition clients into groups and wait until every member is notified"""
+        expected = 0
+        for first in range(0, len(self.clients), self.group_size):
+            members = self.clients[first:first + self.group_size]
+            if len(members) < 2:
+                break
+            group_name = f"{self.user_prefix}-group-{first // self.group_size}"
+            for client in members:
+                client.groups.append((group_name, len(members)))
+            members[0].send({
+                'type': 'group_create',
+                'group_name': group_name,
+                'members': [client.username for client in members]
+            })
+            expected += len(members)
+
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with self.stats.lock:
+                if self.stats.groups_joined >= expected:
+                    return
+            time.sleep(0.01)
+
+    def run_client(self, client, stop_at):
+        """Sender loop of one client: weighted random operations at a fixed rate"""
+        rng = random.Random(self.seed * 100003 + client.index)
+        ops = list(self.mix)
+        weights = [self.mix[op] for op in ops]
+        others = [c.username for c in self.clients if c is not client]
+        interval = 1.0 / self.rate if self.rate > 0 else 0.0
+        next_send = time.perf_counter() + rng.random() * interval
+
+        while time.perf_counter() < stop_at:
+            if interval:
+                delay = next_send - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_send += interval
+            op = rng.choices(ops, weights)[0]
+            try:
+                self.perform(client, op, rng, others)
+            except OSError:
+                self.stats.record_error()
+
+    def perform(self, client, op, rng, others):
+        """Send one operation"""
+        if op == 'login':
+            client.reconnect()
+            self.stats.record_sent('login', 0)
+            return
+        
+        if op == 'message' and others:
+            message = {'type': 'message', 'recipient': rng.choice(others), 'content': self.content}
+            expected = 1
+        elif op == 'broadcast':
+            message = {'type': 'message', 'recipient': 'all', 'content': self.content}
+            expected = len(self.clients) - 1
+        elif op == 'group' and client.groups:
+            group_name, size = rng.choice(client.groups)
+            message = {'type': 'group_message', 'group_name': group_name, 'content': self.content}
+            expected = size - 1
+        elif op == 'file' and others:
+            message = {'type': 'file_transfer', 'recipient': rng.choice(others),
+                       'filename': 'bench.bin', 'filedata': self.filedata}
+            expected = 1
+        else:
+            return
+        
+        if self.trace_rate and rng.random() < self.trace_rate:
+            message['trace'] = True
+        message['sent_at'] = time.perf_counter_ns()
+        client.send(message)
+        self.stats.record_sent(op, expected)
+
+    def wait_for_drain(self, timeout=5.0, settle=0.5):
+        """Wait until deliveries stop arriving"""
+        deadline = time.time() + timeout
+        last = -1
+        while time.time() < deadline:
+            current = self.stats.total_delivered()
+            if current == last:
+                return
+            last = current
+            time.sleep(settle)
+
+    def run(self):
+        """Run the full benchmark and return the results dictionary"""
+        connect_elapsed = self.connect_all()
+        self.create_groups()
+
+        start = time.perf_counter()
+        stop_at = start + self.duration
+        senders = [threading.Thread(target=self.run_client, args=(client, stop_at))
+                   for client in self.clients]
+        for thread in senders:
+            thread.start()
+        for thread in senders:
+            thread.join()
+        send_elapsed = time.perf_counter() - start
+        self.wait_for_drain()
+        elapsed = time.perf_counter() - start
+
+        for client in self.clients:
+            client.close()
+
+        return self.results(connect_elapsed, send_elapsed, elapsed)
+
+    def results(self, connect_elapsed, send_elapsed, elapsed):
+        stats = self.stats
+        with stats.lock:
+            all_latencies = [v for op in OPERATIONS for v in stats.latencies[op]]
+            return {
+                'connections': {
+                    'count': len(self.clients),
+                    'elapsed_s': round(connect_elapsed, 4),
+                    'rate_per_s': round(len(self.clients) / connect_elapsed, 1) if connect_elapsed else None,
+                    'setup_ms': summarize(stats.setup_times),
+                },
+                'throughput': {
+                    'duration_s': round(send_elapsed, 3),
+                    'sent_per_s': round(sum(stats.sent.values()) / send_elapsed, 1),
+                    'delivered_per_s': round(sum(stats.delivered.values()) / elapsed, 1),
+                    'sent': dict(stats.sent),
+                    'expected': dict(stats.expected),
+                    'delivered': dict(stats.delivered),
+                },
+                'latency_ms': dict(
+                    {'all': summarize(all_latencies)},
+                    **{op: summarize(stats.latencies[op]) for op in OPERATIONS if stats.latencies[op]}
+                ),
+                'throttled': dict(stats.throttled),
+                'errors': stats.errors,
+            }
+
+
+def free_port():
+    """Ask the OS for a free TCP port"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(host, port, timeout=10.0):
+    """Wait until a server accepts connections on host:port"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def start_server_process(port, extra_args=()):
+    """Start src/server.py in a subprocess listening on 127.0.0.1:port"""
+    command = [sys.executable, os.path.join(SRC_DIR, 'server.py'),
+               '--host', '127.0.0.1', '--port', str(port),
+               '--log-level', 'WARNING'] + list(extra_args)
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if not wait_for_port('127.0.0.1', port):
+        process.kill()
+        raise RuntimeError("Server did not start")
+    return process
+
+
+def start_server_thread(tracer=None):
+    """Start a ChatServer in a background thread of this process"""
+    from server import ChatServer
+    server = ChatServer(host='127.0.0.1', port=0, tracer=tracer)
+    threading.Thread(target=server.start, daemon=True).start()
+    server.ready.wait()
+    return server
+
+
+def environment_info():
+    """Version information stored with every result file"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SRC_DIR,
+                                capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'git_commit': commit or None,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def write_results(results, output, prefix='loadgen'):
+    """Write results JSON, default to bench/results/<prefix>-<time>.json"""
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        name = datetime.datetime.now().strftime(f'{prefix}-%Y%m%d-%H%M%S.json')
+        output = os.path.join(RESULTS_DIR, name)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    return output
+
+
+def write_trace_files(client_tracer, server_tracer, process, server_trace_file, output):
+    """Write the client trace merged with the server trace (if available)"""
+    client_trace_file = output + '.client'
+    client_tracer.dump(client_trace_file)
+    inputs = [client_trace_file]
+    if server_tracer:
+        server_tracer.dump(server_trace_file)
+    if (server_tracer or process) and os.path.exists(server_trace_file):
+        inputs.append(server_trace_file)
+    count = merge_trace_files(inputs, output)
+    for path in inputs:
+        os.remove(path)
+    print(f"Trace with {count} events written to {output}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Chat server load generator")
+    parser.add_argument('--clients', type=int, default=20, help="Number of simulated clients")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds of traffic")
+    parser.add_argument('--rate', type=float, default=20.0,
+                        help="Operations per second per client (0 = as fast as possible)")
+    parser.add_argument('--mix', default=DEFAULT_MIX,
+                        help="Weighted operation mix, e.g. message=70,group=20,file=5,login=1")
+    parser.add_argument('--group-size', type=int, default=5, help="Members per group")
+    parser.add_argument('--message-size', type=int, default=64, help="Chat message size in bytes")
+    parser.add_argument('--file-size', type=int, default=16384, help="File transfer size in bytes")
+    parser.add_argument('--connect-concurrency', type=int, default=16,
+                        help="Parallel connection attempts during setup")
+    parser.add_argument('--seed', type=int, default=1, help="Random seed for the operation mix")
+    parser.add_argument('--user-prefix', default='user',
+                        help="Username prefix (lets several generators share one server)")
+    parser.add_argument('--server', choices=('process', 'thread'), default='process',
+                        help="Run the local server as a subprocess or in this process")
+    parser.add_argument('--server-args', default='',
+                        help="Extra command line arguments for a subprocess server")
+    parser.add_argument('--target', default=None,
+                        help="host:port of an already running server (skips starting one); "
+                             "a comma separated list spreads the clients over several servers")
+    parser.add_argument('--output', default=None, help="Result JSON path")
+    parser.add_argument('--trace-rate', type=float, default=0.0,
+                        help="Fraction of requests flagged for end-to-end tracing")
+    parser.add_argument('--trace-file', default='trace.json',
+                        help="Merged client + server Chrome trace written when tracing")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    process = None
+    server_tracer = None
+    server_args = args.server_args.split()
+    server_trace_file = args.trace_file + '.server'
+    targets = None
+    if args.target:
+        targets = []
+        for target in args.target.split(','):
+            host, _, port = target.strip().rpartition(':')
+            targets.append((host, int(port)))
+        host, port = targets[0]
+    elif args.server == 'thread':
+        if args.trace_rate:
+            server_tracer = Tracer(follow_clients=True)
+        server = start_server_thread(server_tracer)
+        host, port = '127.0.0.1', server.port
+    else:
+        if args.trace_rate:
+            server_args += ['--trace-clients', '--trace-file', server_trace_file]
+        host, port = '127.0.0.1', free_port()
+        process = start_server_process(port, server_args)
+
+    print("=" * 60)
+    print("CHAT SERVER LOAD GENERATOR")
+    print(f"{args.clients} clients, {args.rate} ops/s each, {args.duration}s, mix: {args.mix}")
+    print("=" * 60)
+
+    try:
+        generator = LoadGenerator(
+            host, port, clients=args.clients, mix=args.mix, rate=args.rate,
+            duration=args.duration, group_size=args.group_size,
+            message_size=args.message_size, file_size=args.file_size,
+            connect_concurrency=args.connect_concurrency, seed=args.seed,
+            user_prefix=args.user_prefix, trace_rate=args.trace_rate, targets=targets
+        )
+        results = generator.run()
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+    
+    if args.trace_rate:
+        write_trace_files(generator.stats.tracer, server_tracer, process, server_trace_file,
+                          args.trace_file)
+
+    results = dict(environment_info(), config=vars(args), **results)
+    path = write_results(results, args.output)
+
+    connections = results['connections']
+    throughput = results['throughput']
+    latency = results['latency_ms']['all']
+    print(f"Connection setup: {connections['rate_per_s']} conn/s "
+          f"(p50 {connections['setup_ms'].get('p50')} ms)")
+    print(f"Throughput:       {throughput['sent_per_s']} sent/s, "
+          f"{throughput['delivered_per_s']} delivered/s")
+    print(f"Latency (ms):     p50 {latency.get('p50')}  p99 {latency.get('p99')}  "
+          f"p999 {latency.get('p999')}")
+    if results['throttled']:
+        print(f"Throttled:        {sum(results['throttled'].values())}")
+    print(f"Errors:           {results['errors']}")
+    print(f"Results written to {path}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Soak Test
+Computer Networks Semester Project
+
+Runs a local chat server under a steady load for a long time and checks
+that it does not degrade: the load generator (loadgen.py) keeps a mix of
+messages, broadcasts, group messages, files and login churn going while
+the server process is sampled every --interval seconds:
+
+    rss_mb      - resident memory
+    threads     - threads of the server process
+    fds         - open file descriptors
+    delivered   - messages delivered to the clients per second
+
+Samples from the first --warmup seconds are dropped (history, search
+index and caches fill up then; the server runs with a small
+--history-size so this happens quickly). The median of the first quarter
+of the remaining samples is compared with the median of the last
+quarter; the run fails if memory, threads or descriptors keep growing
+beyond the tolerances or the delivered rate drops. At the end, once the
+clients are gone, descriptors and threads must be back to where they were
+before the load started.
+
+Usage:
+    python bench/soak.py --duration 600
+    python bench/soak.py --engine selector --clients 50 --duration 3600 --interval 5
+"""
+
+import argparse
+import statistics
+import sys
+import threading
+import time
+
+from fuzz import process_usage, settle
+from loadgen import LoadGenerator, environment_info, free_port, start_server_process, write_results
+from pool_server import DEFAULT_WORKERS
+
+DEFAULT_MIX = 'message=60,broadcast=5,group=20,file=5,login=10'
+
+
+def sample(process, generator, interval, stop):
+    """Usage samples every interval seconds until stop is set"""
+    samples = []
+    started = time.perf_counter()
+    delivered = generator.stats.total_delivered()
+    while not stop.wait(interval):
+        now = time.perf_counter()
+        fds, threads, rss_mb = process_usage(process.pid)
+        total = generator.stats.total_delivered()
+        samples.append({'t': round(now - started, 2), 'rss_mb': round(rss_mb, 1), 'threads': threads,
+                        'fds': fds, 'delivered': round((total - delivered) / interval, 1)})
+        delivered = total
+    return samples
+
+
+def check_trend(samples, args):
+    """Problems found comparing the first and the last quarter of the samples"""
+    if len(samples) < 8:
+        return [f"only {len(samples)} samples after warm-up; run longer or sample more often"]
+    quarter = len(samples) // 4
+
+    def medians(field):
+        return (statistics.median(s[field] for s in samples[:quarter]),
+                statistics.median(s[field] for s in samples[-quarter:]))
+
+    problems = []
+    first, last = medians('rss_mb')
+    if last > first * (1 + args.rss_growth) + args.rss_slack_mb:
+        problems.append(f"memory grew from {first:.1f} to {last:.1f} MB")
+    for field in ('threads', 'fds'):
+        first, last = medians(field)
+        if last > first * 1.1 + 4:
+            problems.append(f"{field} grew from {first:g} to {last:g}")
+    first, last = medians('delivered')
+    if last < first * (1 - args.throughput_drop):
+        problems.append(f"delivered rate dropped from {first:.0f}/s to {last:.0f}/s")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-running load with leak and slowdown checks")
+    parser.add_argument('--engine', default='threads', choices=['threads', 'selector', 'pool'])
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--rate', type=float, default=20.0, help="Operations per client per second")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="Operation mix (see loadgen.py)")
+    parser.add_argument('--file-size', type=int, default=16384)
+    parser.add_argument('--duration', type=float, default=300.0, help="Seconds of load")
+    parser.add_argument('--warmup', type=float, default=30.0, help="Seconds before samples count")
+    parser.add_argument('--interval', type=float, default=2.0, help="Seconds between samples")
+    parser.add_argument('--history-size', type=int, default=2000, help="History size of the server")
+    parser.add_argument('--rss-growth', type=float, default=0.2,
+                        help="Allowed relative memory growth, first to last quarter")
+    parser.add_argument('--rss-slack-mb', type=float, default=10.0, help="Allowed memory growth on top")
+    parser.add_argument('--throughput-drop', type=float, default=0.2,
+                        help="Allowed relative drop of the delivered rate")
+    parser.add_argument('--output', default=None, help="Result JSON path")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"SOAK TEST ({args.engine} engine, {args.clients} clients, {args.duration:g} s)")
+    print("=" * 60)
+    port = free_port()
+    process = start_server_process(port, ['--engine', args.engine, '--history-size', str(args.history_size)])
+    try:
+        baseline = process_usage(process.pid)
+        generator = LoadGenerator('127.0.0.1', port, clients=args.clients, mix=args.mix, rate=args.rate,
+                                  duration=args.duration, file_size=args.file_size, user_prefix='soak')
+        results = {}
+        runner = threading.Thread(target=lambda: results.update(generator.run()))
+        stop = threading.Event()
+        runner.start()
+        threading.Thread(target=lambda: (runner.join(), stop.set()), daemon=True).start()
+        samples = sample(process, generator, args.interval, stop)
+        alive = process.poll() is None
+        usage = settle(process.pid, baseline) if alive else None
+    finally:
+        process.kill()
+        process.wait()
+
+    counted = [s for s in samples if args.warmup <= s['t'] <= args.duration]  # Not the drain
+    for s in counted[::max(1, len(counted) // 10)]:
+        print(f"{s['t']:>8.0f} s  RSS {s['rss_mb']:>6.1f} MB  threads {s['threads']:>4}  "
+              f"fds {s['fds']:>4}  delivered {s['delivered']:>8.0f}/s")
+
+    problems = [] if alive else ["server process exited"]
+    if alive:
+        problems += check_trend(counted, args)
+        print(f"After the load: fds {baseline[0]} -> {usage[0]}, threads {baseline[1]} -> {usage[1]}")
+        if usage[0] > baseline[0]:
+            problems.append(f"file descriptors leaked: {baseline[0]} -> {usage[0]}")
+        # Pool executor threads are started on demand, up to the worker count
+        if usage[1] > baseline[1] + (DEFAULT_WORKERS if args.engine == 'pool' else 0):
+            problems.append(f"threads leaked: {baseline[1]} -> {usage[1]}")
+    if results.get('errors'):
+        problems.append(f"{results['errors']} client errors")
+    for problem in problems:
+        print(f"  problem: {problem}")
+    print("PASS" if not problems else "FAIL")
+
+    output = dict(environment_info(), tool='soak', config=vars(args), samples=samples,
+                  loadgen=results, problems=problems)
+    print(f"Results written to {write_results(output, args.output, 'soak')}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+"""
+Admin Socket
+Computer Networks Semester Project
+
+A local-only control socket for inspecting a running server without
+restarting it. Enabled with ``server.py --admin-socket /tmp/chat-admin.sock``.
+
+Commands (one line of text per connection):
+    threads                                   - stack dump of every thread
+    profile start [seconds] [cprofile|sample] [output]
+                                              - profile the handler threads
+    profile stop                              - stop early and write the stats
+    snapshot                                  - save the server state now
+    help                                      - list commands
+
+Profilers:
+    cprofile - deterministic cProfile of every client handler thread, merged
+               into one pstats file (open with ``python -m pstats FILE``)
+    sample   - statistical profiler that snapshots all thread stacks every
+               few milliseconds and writes folded stacks (flamegraph format)
+
+Nothing runs while profiling is off: the handler threads only check one
+attribute per received packet, and the sampler thread exists only while
+a sampling session is active.
+
+Usage from a shell:
+    python src/admin.py --socket /tmp/chat-admin.sock threads
+    python src/admin.py --socket /tmp/chat-admin.sock profile start 30 sample
+"""
+
+import argparse
+import collections
+import cProfile
+import os
+import pstats
+import socket
+import sys
+import threading
+import time
+import traceback
+
+from server_logging import get_logger
+
+log = get_logger()
+
+DEFAULT_DURATION = 30
+SAMPLE_INTERVAL = 0.005
+
+HELP = """threads                                             stack dump of every thread
+profile start [seconds] [cprofile|sample] [output]  profile the handler threads
+profile stop                                        stop early and write the stats
+snapshot                                            save the server state now
+help                                                list commands"""
+
+
+class CProfileSession:
+    """
+    cProfile across all client handler threads
+
+    cProfile only profiles the thread that enabled it, so every handler
+    thread enables its own Profile while it processes messages; the
+    profiles are merged when the session ends.
+    """
+
+    kind = 'cprofile'
+
+    def __init__(self, output):
+        self.output = output
+        self.profiles = {}
+        self.lock = threading.Lock()
+        self.stopped = False
+
+    def enable_thread(self):
+        """Called by a handler thread before processing received messages"""
+        if self.stopped:
+            return
+        ident = threading.get_ident()
+        profile = self.profiles.get(ident)
+        if profile is None:
+            profile = cProfile.Profile()
+            with self.lock:
+                self.profiles[ident] = profile
+        profile.enable()
+
+    def disable_thread(self):
+        """Called by a handler thread after processing received messages"""
+        profile = self.profiles.get(threading.get_ident())
+        if profile is not None:
+            profile.disable()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        """Merge per-thread profiles and write them to the output file"""
+        self.stopped = True
+        # Give handler threads in the middle of a batch a moment to finish
+        time.sleep(0.05)
+        with self.lock:
+            profiles = list(self.profiles.values())
+        if not profiles:
+            return "No messages were processed while profiling"
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(self.output)
+        return f"Profiled {len(profiles)} handler threads, stats written to {self.output}"
+
+
+class SamplingSession:
+    """
+    Statistical profiler over all threads
+
+    A background thread records the stack of every other thread at a fixed
+    interval. Stacks are written in folded format ("a;b;c count") which
+    flamegraph.pl and speedscope can display.
+    """
+
+    kind = 'sample'
+
+    def __init__(self, output, interval=SAMPLE_INTERVAL):
+        self.output = output
+        self.interval = interval
+        self.counts = collections.Counter()
+        self.samples = 0
+        self.running = threading.Event()
+        self.thread = None
+
+    def enable_thread(self):
+        pass
+
+    def disable_thread(self):
+        pass
+
+    def start(self):
+        self.running.set()
+        self.thread = threading.Thread(target=self.run, name='admin-sampler', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        own = threading.get_ident()
+        while self.running.is_set():
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[';'.join(reversed(stack))] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.running.clear()
+        if self.thread:
+            self.thread.join()
+        with open(self.output, 'w') as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+        return f"Took {self.samples} samples, folded stacks written to {self.output}"
+
+
+def thread_dump():
+    """Return a text dump of the current stack of every thread"""
+    frames = sys._current_frames()
+    lines = []
+    for thread in sorted(threading.enumerate(), key=lambda t: t.name):
+        lines.append(f"Thread {thread.name} (ident={thread.ident}, daemon={thread.daemon})")
+        frame = frames.get(thread.ident)
+        if frame is not None:
+            lines.extend(line.rstrip('\n') for line in traceback.format_stack(frame))
+        lines.append('')
+    return '\n'.join(lines)
+
+
+class AdminServer:
+    """
+    Local admin socket attached to a running ChatServer
+
+    Listens on a Unix domain socket (only reachable from the same machine,
+    protected by file permissions). On platforms without Unix sockets it
+    falls back to TCP on 127.0.0.1, with the port given as the address.
+    """
+
+    def __init__(self, chat_server, address):
+        self.chat_server = chat_server
+        self.address = address
+        self.session = None
+        self.timer = None
+        self.lock = threading.Lock()
+        self.socket = None
+
+    def start(self):
+        """Bind the admin socket and serve commands in a background thread"""
+        if hasattr(socket, 'AF_UNIX') and not str(self.address).isdigit():
+            if os.path.exists(self.address):
+                os.remove(self.address)
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.bind(self.address)
+            os.chmod(self.address, 0o600)
+        else:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.socket.bind(('127.0.0.1', int(self.address)))
+        self.socket.listen(2)
+        threading.Thread(target=self.serve, name='admin', daemon=True).start()
+        log.info("Admin socket listening on %s", self.address)
+
+    def serve(self):
+        while True:
+            try:
+                conn, _ = self.socket.accept()
+            except OSError:
+                break
+            with conn:
+                try:
+                    command = conn.makefile('r').readline().strip()
+                    reply = self.execute(command)
+                except Exception as e:
+                    reply = f"error: {e}"
+                conn.sendall(reply.encode('utf-8') + b'\n')
+
+    def close(self):
+        if self.session:
+            self.stop_profile()
+        if self.socket:
+            self.socket.close()
+        if hasattr(socket, 'AF_UNIX') and os.path.exists(str(self.address)):
+            os.remove(self.address)
+
+    def execute(self, command):
+        """Run one admin command and return the reply text"""
+        words = command.split()
+        if not words or words[0] == 'help':
+            return HELP
+        if words[0] == 'threads':
+            return thread_dump()
+        if words[0] == 'snapshot':
+            snapshots = self.chat_server.snapshots
+            if snapshots is None:
+                return "Snapshots are disabled (start the server with --state-file)"
+            return f"Saved {snapshots.save()} messages to {snapshots.path}"
+        if words[0] == 'profile' and len(words) > 1:
+            if words[1] == 'start':
+                seconds = float(words[2]) if len(words) > 2 else DEFAULT_DURATION
+                kind = words[3] if len(words) > 3 else 'cprofile'
+                output = words[4] if len(words) > 4 else None
+                return self.start_profile(seconds, kind, output)
+            if words[1] == 'stop':
+                return self.stop_profile()
+        return f"unknown command: {command}"
+
+    def start_profile(self, seconds, kind='cprofile', output=None):
+        """Start a profiling session that stops by itself after N seconds"""
+        with self.lock:
+            if self.session:
+                return f"A {self.session.kind} session is already running"
+            stamp = time.strftime('%Y%m%d-%H%M%S')
+            if kind == 'cprofile':
+                session = CProfileSession(output or f"server-{stamp}.prof")
+            elif kind == 'sample':
+                session = SamplingSession(output or f"server-{stamp}.folded")
+            else:
+                return f"unknown profiler: {kind} (use cprofile or sample)"
+            session.start()
+            self.session = session
+            self.chat_server.profiler = session
+            self.timer = threading.Timer(seconds, self.stop_profile)
+            self.timer.daemon = True
+            self.timer.start()
+        log.info("Started %s profiling for %ss", kind, seconds)
+        return f"Started {kind} profiling for {seconds:g}s, output: {session.output}"
+
+    def stop_profile(self):
+        """Stop the running session and write its output"""
+        with self.lock:
+            session = self.session
+            if session is None:
+                return "No profiling session is running"
+            self.session = None
+            self.chat_server.profiler = None
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+        result = session.stop()
+        log.info("%s", result)
+        return result
+
+
+def send_command(address, command, timeout=30):
+    """Send one command to an admin socket and return the reply"""
+    if hasattr(socket, 'AF_UNIX') and not str(address).isdigit():
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        target = address
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        target = ('127.0.0.1', int(address))
+    with sock:
+        sock.settimeout(timeout)
+        sock.connect(target)
+        sock.sendall(command.encode('utf-8') + b'\n')
+        chunks = []
+        while True:
+            data = sock.recv(65536)
+            if not data:
+                break
+            chunks.append(data)
+    return b''.join(chunks).decode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat server admin tool")
+    parser.add_argument('--socket', default='/tmp/chat-admin.sock',
+                        help="Admin socket path (or TCP port on 127.0.0.1)")
+    parser.add_argument('command', nargs='+', help="Command, e.g. 'threads' or 'profile start 10 sample'")
+    args = parser.parse_args()
+    print(send_command(args.socket, ' '.join(args.command)), end='')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Admission Control
+Computer Networks Semester Project
+
+Protects the server from clients that send more than their share, and
+from overload in general. Two mechanisms work together:
+
+    Rate limits  - a token bucket per user and message type, e.g. at most
+                   20 chat messages per second with bursts of 40
+    Load shedding - while the server's outbound queues or its CPU use are
+                   above a threshold, fan-out requests (messages, group
+                   messages, files) are refused
+
+A refused request is answered with an explicit reply instead of being
+silently dropped:
+
+    {"type": "throttled", "request": "message", "reason": "rate_limit",
+     "retry_after": 0.05}
+
+and the server stops reading from that client's socket for retry_after
+seconds (backpressure), so a flooding bot ends up blocked by its own TCP
+window instead of filling server memory.
+
+Enabled with e.g.:
+    python src/server.py --rate-limits default --max-queued-mb 64 --max-cpu 0.9
+    python src/server.py --rate-limits message=50/100,file_transfer=2/4
+
+OSI Model Mapping:
+- Application Layer: Per-user request quotas
+- Session Layer: Pausing and resuming client sessions
+"""
+
+import threading
+import time
+
+from server_logging import get_logger
+
+log = get_logger()
+
+# Requests per second and burst size per message type
+DEFAULT_LIMITS = {
+    'message': (20.0, 40),
+    'group_message': (20.0, 40),
+    'group_create': (2.0, 10),
+    'file_transfer': (2.0, 4),
+    'file_offer': (2.0, 4),
+    'get_users': (5.0, 10),
+    'sync': (2.0, 10),
+    'search': (5.0, 10),
+}
+
+# Requests refused while the server is overloaded (logins and lookups still pass)
+SHEDDABLE = ('message', 'group_message', 'file_transfer', 'file_offer', 'group_create', 'search')
+
+# How long an overloaded server asks clients to back off
+OVERLOAD_RETRY_AFTER = 0.5
+
+# Seconds between CPU usage measurements
+CPU_INTERVAL = 0.5
+
+# Seconds between sweeps for idle token buckets
+BUCKET_SWEEP_INTERVAL = 60.0
+
+
+def parse_limits(text):
+    """Parse 'default' or 'message=20/40,file_transfer=2' into {type: (rate, burst)}"""
+    if text.strip() == 'default':
+        return dict(DEFAULT_LIMITS)
+    limits = {}
+    for item in text.split(','):
+        if not item.strip():
+            continue
+        name, _, spec = item.partition('=')
+        rate, _, burst = spec.partition('/')
+        rate = float(rate)
+        if rate <= 0:
+            raise ValueError(f"Rate limit for '{name.strip()}' must be positive")
+        limits[name.strip()] = (rate, int(burst) if burst else max(1, int(rate)))
+    return limits
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average and `burst` at once
+
+    The bucket refills continuously; every request takes one token.
+    """
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst, now=None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic() if now is None else now
+
+    def take(self, now=None):
+        """Take a token; returns 0 on success, else seconds until one is available"""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+    def full(self, now):
+        """Whether the bucket has refilled completely (it is then as good as new)"""
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class RateLimiter:
+    """
+    Token buckets per (user, message type)
+
+    Buckets outlive the connection, so logging in again does not refill
+    them. Every BUCKET_SWEEP_INTERVAL seconds the buckets that have
+    refilled completely are dropped: a new bucket starts out full too.
+    """
+
+    def __init__(self, limits, sweep_interval=BUCKET_SWEEP_INTERVAL):
+        self.limits = limits  # {msg_type: (rate, burst)}
+        self.buckets = {}  # {(username, msg_type): TokenBucket}
+        self.lock = threading.Lock()
+        self.sweep_interval = sweep_interval
+        self.next_sweep = time.monotonic() + sweep_interval
+
+    def check(self, username, msg_type, now=None):
+        """Returns 0 if the request is allowed, else seconds to wait"""
+        limit = self.limits.get(msg_type)
+        if limit is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        key = (username, msg_type)
+        with self.lock:
+            if now >= self.next_sweep:
+                self.sweep(now)
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(*limit, now=now)
+            return bucket.take(now)
+
+    def sweep(self, now):
+        """Drop the buckets that are full again (lock held)"""
+        self.buckets = {key: bucket for key, bucket in self.buckets.items() if not bucket.full(now)}
+        self.next_sweep = now + self.sweep_interval
+
+
+class AdmissionController:
+    """
+    Decides for every request of a logged in user whether it is processed
+
+    Attached to a ChatServer as ``server.admission``. The server calls
+    check() before processing a request and pauses reading from the
+    client's socket when a request is refused.
+    """
+
+    def __init__(self, limits=None, max_queued_bytes=0, max_cpu=0.0):
+        self.limiter = RateLimiter(limits) if limits else None
+        self.max_queued_bytes = max_queued_bytes
+        self.max_cpu = max_cpu
+        self.server = None
+        self.shedding = None  # Reason while load is being shed
+        self.cpu = 0.0  # Process CPU use during the last interval (1.0 = one core)
+        self.cpu_sample = (time.monotonic(), time.process_time())
+        self.throttled = {'rate_limit': 0, 'overload': 0}
+
+    def attach(self, server):
+        self.server = server
+        server.admission = self
+
+    def check(self, username, msg_type):
+        """Returns None to admit the request, else (reason, retry_after)"""
+        if msg_type in SHEDDABLE:
+            reason = self.overloaded()
+            if reason:
+                self.throttled['overload'] += 1
+                return 'overload', OVERLOAD_RETRY_AFTER
+        if self.limiter:
+            delay = self.limiter.check(username, msg_type)
+            if delay:
+                self.throttled['rate_limit'] += 1
+                return 'rate_limit', delay
+        return None
+
+    def overloaded(self):
+        """Name of the exceeded threshold, or None"""
+        reason = None
+        if self.max_queued_bytes and self.server.queued_output() > self.max_queued_bytes:
+            reason = 'queued_output'
+        elif self.max_cpu and self.cpu_usage() > self.max_cpu:
+            reason = 'cpu'
+        if reason != self.shedding:
+            if reason:
+                log.warning("Shedding load: %s above threshold", reason)
+            else:
+                log.warning("Load back to normal, no longer shedding (%s)", self.shedding)
+            self.shedding = reason
+        return reason
+
+    def cpu_usage(self):
+        """Process CPU use, measured over the last CPU_INTERVAL seconds"""
+        now = time.monotonic()
+        started, cpu_started = self.cpu_sample
+        if now - started >= CPU_INTERVAL:
+            cpu_now = time.process_time()
+            self.cpu = (cpu_now - cpu_started) / (now - started)
+            self.cpu_sample = (now, cpu_now)
+        return self.cpu
@@ -0,0 +1,319 @@
+"""
+Message Bus
+Computer Networks Semester Project
+
+Pluggable transport that connects chat server nodes (worker processes on
+one machine or servers on different machines). The routing layer
+(routing.py) only needs two things from a bus:
+
+    bus.connect(node_id, listener)   join the bus
+    bus.publish(payload, to=None)    send a dict to one node, or to all others
+
+and calls back ``listener.on_bus_message(source, payload)`` for every
+payload addressed to it and ``listener.on_node_left(node_id)`` when another
+node disconnects. The callbacks run on a delivery thread of the bus, never
+on the thread reading from the network, and a payload whose callback
+raises is logged and skipped.
+
+Implementations:
+    LocalBus  - nodes inside one process (tests, demos)
+    BrokerBus - nodes connected to a BusBroker over TCP or a Unix socket
+
+A production deployment could plug in Redis pub/sub, NATS or Kafka by
+implementing the same two methods.
+
+Run a standalone broker:
+    python src/bus.py --listen 127.0.0.1:7000
+
+OSI Model Mapping:
+- Session Layer: One bus session per server node
+- Transport Layer: TCP or Unix domain stream sockets between nodes
+"""
+
+import argparse
+import os
+import queue
+import socket
+import threading
+
+from protocol import FrameReader, RECV_SIZE, encode_message
+from server_logging import get_logger
+
+log = get_logger()
+
+
+def is_unix_address(address):
+    """'host:port' is TCP, anything else is a Unix socket path"""
+    host, sep, port = str(address).rpartition(':')
+    return not (sep and port.isdigit())
+
+
+def create_socket(address):
+    """Create an unconnected stream socket and target for a bus address"""
+    if is_unix_address(address):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM), address
+    host, _, port = address.rpartition(':')
+    return socket.socket(socket.AF_INET, socket.SOCK_STREAM), (host, int(port))
+
+
+class MessageBus:
+    """Interface of a message bus between server nodes"""
+
+    listener = None
+    inbox = None  # queue.SimpleQueue of ('message' | 'left', source, payload) for deliver_loop
+
+    def connect(self, node_id, listener):
+        raise NotImplementedError
+
+    def publish(self, payload, to=None):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def deliver_loop(self):
+        """Hand the items of the inbox to the listener until None arrives"""
+        while True:
+            item = self.inbox.get()
+            if item is None:
+                break
+            kind, source, payload = item
+            try:
+                if kind == 'left':
+                    self.listener.on_node_left(source)
+                else:
+                    self.listener.on_bus_message(source, payload)
+            except Exception as e:
+                log.error("Bus payload from %s failed: %s", source, e)
+
+
+class LocalBroker:
+    """In-process meeting point for LocalBus nodes"""
+
+    def __init__(self):
+        self.nodes = {}  # {node_id: LocalBus}
+        self.lock = threading.Lock()
+
+
+class LocalBus(MessageBus):
+    """
+    Bus between nodes living in the same process
+
+    Every node gets its own delivery thread, like a real network, so a
+    listener never runs inside the publisher's call stack.
+    """
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.node_id = None
+        self.listener = None
+        self.inbox = queue.SimpleQueue()
+
+    def connect(self, node_id, listener):
+        self.node_id = node_id
+        self.listener = listener
+        with self.broker.lock:
+            self.broker.nodes[node_id] = self
+        threading.Thread(target=self.deliver_loop, name=f"bus-{node_id}", daemon=True).start()
+
+    def publish(self, payload, to=None):
+        with self.broker.lock:
+            if to is None:
+                targets = [bus for node, bus in self.broker.nodes.items() if node != self.node_id]
+            else:
+                targets = [self.broker.nodes[to]] if to in self.broker.nodes else []
+        for bus in targets:
+            bus.inbox.put(('message', self.node_id, payload))
+
+    def close(self):
+        with self.broker.lock:
+            self.broker.nodes.pop(self.node_id, None)
+            others = list(self.broker.nodes.values())
+        for bus in others:
+            bus.inbox.put(('left', self.node_id, None))
+        self.inbox.put(None)
+
+
+class BusBroker:
+    """
+    Minimal message broker for BrokerBus nodes
+
+    Nodes send {'op': 'hello', 'node': id} and then
+    {'op': 'publish', 'to': node_or_null, 'payload': {...}}; the broker
+    forwards {'op': 'message', 'from': id, 'payload': {...}} to the target
+    node(s) and {'op': 'left', 'node': id} when a node disconnects.
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self.socket = None
+        self.nodes = {}  # {node_id: socket}
+        self.send_locks = {}  # {node_id: Lock}
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Listen in the background; returns the actual listening address"""
+        self.socket, target = create_socket(self.address)
+        if is_unix_address(self.address):
+            if os.path.exists(self.address):
+                os.remove(self.address)
+        else:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind(target)
+        if not is_unix_address(self.address):
+            host, port = self.socket.getsockname()[:2]
+            self.address = f"{host}:{port}"
+        self.socket.listen(128)
+        threading.Thread(target=self.accept_loop, name='bus-broker', daemon=True).start()
+        log.info("Bus broker listening on %s", self.address)
+        return self.address
+
+    def close(self):
+        if self.socket:
+            self.socket.close()
+        if is_unix_address(self.address) and os.path.exists(self.address):
+            os.remove(self.address)
+
+    def accept_loop(self):
+        while True:
+            try:
+                conn, _ = self.socket.accept()
+            except OSError:
+                break
+            threading.Thread(target=self.handle_node, args=(conn,), daemon=True).start()
+
+    def handle_node(self, conn):
+        reader = FrameReader()
+        node_id = None
+        try:
+            while True:
+                data = conn.recv(RECV_SIZE)
+                if not data:
+                    break
+                for frame in reader.feed(data):
+                    op = frame.get('op')
+                    if op == 'hello':
+                        node_id = frame['node']
+                        with self.lock:
+                            self.nodes[node_id] = conn
+                            self.send_locks[node_id] = threading.Lock()
+                        log.info("Node %s joined the bus", node_id)
+                    elif op == 'publish' and node_id is not None:
+                        self.forward(node_id, frame.get('to'),
+                                     {'op': 'message', 'from': node_id, 'payload': frame['payload']})
+        except OSError:
+            pass
+        finally:
+            conn.close()
+            if node_id is not None:
+                with self.lock:
+                    if self.nodes.get(node_id) is conn:
+                        del self.nodes[node_id]
+                        del self.send_locks[node_id]
+                self.forward(node_id, None, {'op': 'left', 'node': node_id})
+                log.info("Node %s left the bus", node_id)
+
+    def forward(self, source, to, frame):
+        """Send a frame to one node or to every node except the source"""
+        data = encode_message(frame)
+        with self.lock:
+            if to is None:
+                targets = [(node, conn, self.send_locks[node]) for node, conn in self.nodes.items()
+                           if node != source]
+            elif to in self.nodes:
+                targets = [(to, self.nodes[to], self.send_locks[to])]
+            else:
+                targets = []
+        for node, conn, lock in targets:
+            try:
+                with lock:
+                    conn.sendall(data)
+            except OSError as e:
+                log.error("Bus delivery to %s failed: %s", node, e)
+
+
+class BrokerBus(MessageBus):
+    """
+    Bus client connected to a BusBroker over TCP or a Unix socket
+
+    One thread reads frames from the broker into the inbox and another
+    delivers them, so a listener that blocks (e.g. sending to a slow
+    client) does not stop the node from reading the bus.
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self.node_id = None
+        self.listener = None
+        self.socket = None
+        self.send_lock = threading.Lock()
+        self.inbox = queue.SimpleQueue()
+
+    def connect(self, node_id, listener):
+        self.node_id = node_id
+        self.listener = listener
+        self.socket, target = create_socket(self.address)
+        self.socket.connect(target)
+        if not is_unix_address(self.address):
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.send({'op': 'hello', 'node': node_id})
+        threading.Thread(target=self.receive_loop, name=f"bus-read-{node_id}", daemon=True).start()
+        threading.Thread(target=self.deliver_loop, name=f"bus-{node_id}", daemon=True).start()
+
+    def send(self, frame):
+        try:
+            with self.send_lock:
+                self.socket.sendall(encode_message(frame))
+        except OSError as e:
+            log.error("Message bus unreachable: %s", e)
+
+    def publish(self, payload, to=None):
+        self.send({'op': 'publish', 'to': to, 'payload': payload})
+
+    def receive_loop(self):
+        reader = FrameReader()
+        try:
+            while True:
+                data = self.socket.recv(RECV_SIZE)
+                if not data:
+                    break
+                for frame in reader.feed(data):
+                    if frame.get('op') == 'message':
+                        self.inbox.put(('message', frame['from'], frame['payload']))
+                    elif frame.get('op') == 'left':
+                        self.inbox.put(('left', frame['node'], None))
+        except OSError:
+            pass
+        finally:
+            self.inbox.put(None)
+
+    def close(self):
+        if self.socket:
+            try:
+                self.socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.socket.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat cluster message bus broker")
+    parser.add_argument('--listen', default='127.0.0.1:7000',
+                        help="host:port for TCP or a path for a Unix socket")
+    args = parser.parse_args()
+
+    from server_logging import setup_logging
+    listener = setup_logging()
+    broker = BusBroker(args.listen)
+    broker.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broker.close()
+        listener.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,20 +5,45 @@ Computer Networks Semester Project
 This client implements a GUI-based chat application demonstrating OSI Model layers.
 """
 
+import argparse
+import collections
 import socket
 import threading
-import json
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog, simpledialog
-import datetime
 import base64
 import os
+import time
+
+from filestore import file_hash
+from lanes import FileAssembler
+from messages import format_time
+from protocol import FrameReader, RECV_SIZE, encode_message
+from sync import MessageCache, conversation_of
+from tls import client_context
+
+# Fields that address a file transfer: one user, a list of users or a group
+FILE_TARGET_FIELDS = ('recipient', 'recipients', 'group_name')
+
+
+def describe_target(message):
+    """Readable name of the user(s) a file transfer message is addressed to"""
+    if message.get('group_name') is not None:
+        return f"group {message['group_name']}"
+    if message.get('recipients') is not None:
+        return ', '.join(message['recipients'])
+    return str(message.get('recipient'))
 
 class ChatClient:
-    def __init__(self, host='127.0.0.1', port=5555):
+    def __init__(self, host='127.0.0.1', port=5555, ssl_context=None, use_cache=True):
         """
         Initialize the chat client
         
+        With an ssl_context (see tls.py) the connection is encrypted; the
+        TLS session is kept so that reconnecting can resume it. With
+        use_cache the transcript is kept on disk and only messages that
+        are not cached yet are fetched after logging in (see sync.py).
+        
         OSI Model Mapping:
         - Transport Layer: TCP socket creation
         - Network Layer: IP address configuration
@@ -26,9 +51,17 @@ class ChatClient:
         self.host = host
         self.port = port
         self.socket = None
+        self.ssl_context = ssl_context
+        self.tls_session = None
         self.username = None
         self.connected = False
         self.online_users = []
+        self.pending_uploads = {}  # {(sha256, target description): file path} offered to the server
+        self.groups = set()  # Groups this user is a member of
+        self.use_cache = use_cache
+        self.cache = None
+        self.unconfirmed = collections.deque()  # Sent chat messages waiting for message_sent
+        self.history_id = ''  # The server's history_id, whose msg_ids this client syncs (see sync.py)
         
         # GUI components
         self.root = None
@@ -44,10 +77,16 @@ class ChatClient:
         OSI Model Mapping:
         - Transport Layer: TCP connection establishment (3-way handshake)
         - Session Layer: Establishing a session with the server
+        - Presentation Layer: TLS handshake (when enabled)
         """
         try:
+            if self.use_cache and self.cache is None:
+                self.cache = MessageCache(MessageCache.path_for(self.host, self.port, username))
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.socket.connect((self.host, self.port))
+            if self.ssl_context is not None:
+                self.socket = self.ssl_context.wrap_socket(
+                    self.socket, server_hostname=self.host, session=self.tls_session)
             self.username = username
             self.connected = True
             
@@ -78,8 +117,7 @@ class ChatClient:
         - Transport Layer: TCP transmission
         """
         try:
-            data = json.dumps(message).encode('utf-8')
-            self.socket.send(data)
+            self.socket.sendall(encode_message(message))
         except Exception as e:
             print(f"[CLIENT ERROR] Error sending message: {e}")
             
@@ -92,15 +130,24 @@ class ChatClient:
         - Presentation Layer: JSON decoding
         - Application Layer: Message processing
         """
+        reader = FrameReader()
+        files = FileAssembler()  # Large files arrive in chunks (see lanes.py)
+        
         while self.connected:
             try:
-                data = self.socket.recv(4096)
+                data = self.socket.recv(RECV_SIZE)
                 
                 if not data:
                     break
                 
-                message = json.loads(data.decode('utf-8'))
-                self.handle_message(message)
+                for message in reader.feed(data):
+                    try:
+                        message = files.add(message)
+                    except ValueError as e:
+                        self.display_system_message(f"Error receiving file: {e}")
+                        continue
+                    if message is not None:
+                        self.handle_message(message)
                 
             except Exception as e:
                 if self.connected:
@@ -122,23 +169,43 @@ class ChatClient:
             status = message.get('status')
             msg = message.get('message')
             self.online_users = message.get('online_users', [])
+            if self.ssl_context is not None:
+                # Session tickets arrive after the handshake, so keep the session now
+                self.tls_session = self.socket.session
             
             if status == 'success':
+                self.history_id = message.get('history_id', '')
                 self.display_system_message(msg)
                 self.update_users_list()
+                if self.cache is not None:
+                    # Fetch only what was sent while this client was offline
+                    self.send_message(self.cache.sync_request(self.history_id))
+            else:
+                self.display_system_message(msg)
                 
-        elif msg_type == 'message':
-            sender = message.get('sender')
-            content = message.get('content')
-            timestamp = message.get('timestamp')
-            self.display_message(f"[{timestamp}] {sender}: {content}")
+        elif msg_type in ('message', 'group_message'):
+            self.cache_message(message)
+            self.display_message(self.format_message(message))
             
-        elif msg_type == 'group_message':
-            sender = message.get('sender')
-            group_name = message.get('group_name')
-            content = message.get('content')
-            timestamp = message.get('timestamp')
-            self.display_message(f"[{timestamp}] [{group_name}] {sender}: {content}")
+        elif msg_type == 'message_sent':
+            if self.unconfirmed:
+                sent = self.unconfirmed.popleft()
+                if message.get('msg_id') is not None:
+                    self.cache_message(dict(sent, msg_id=message['msg_id']),
+                                       message.get('history_id', self.history_id))
+            
+        elif msg_type == 'sync_response':
+            messages = message.get('messages', [])
+            if self.cache is not None:
+                history_id = message.get('history_id', self.history_id)
+                messages = self.cache.add_many(history_id, (
+                    (conversation_of(m, self.username), m) for m in messages
+                    if conversation_of(m, self.username)))
+                self.cache.set_synced_through(history_id, message.get('last_id', 0))
+                if message.get('more'):
+                    self.send_message(self.cache.sync_request(history_id))
+            for synced in messages:
+                self.display_message(self.format_message(synced))
             
         elif msg_type == 'user_joined':
             username = message.get('username')
@@ -154,6 +221,7 @@ class ChatClient:
             
         elif msg_type == 'group_created':
             group_name = message.get('group_name')
+            self.groups.add(group_name)
             self.display_system_message(f"Group '{group_name}' created")
             
         elif msg_type == 'file_transfer':
@@ -176,10 +244,83 @@ class ChatClient:
                 except Exception as e:
                     self.display_system_message(f"Error saving file: {e}")
                     
+        elif msg_type == 'file_offer_response':
+            target = describe_target(message)
+            file_path = self.pending_uploads.pop((message.get('sha256'), target), None)
+            filename = message.get('filename')
+            if message.get('status') == 'stored':
+                self.display_system_message(f"Sending '{filename}' to {target} "
+                                            f"(already on the server, no upload needed)")
+            elif file_path:
+                # The server does not have the file yet: upload it once for all recipients
+                try:
+                    with open(file_path, 'rb') as f:
+                        filedata = base64.b64encode(f.read()).decode('utf-8')
+                    upload = {
+                        'type': 'file_transfer',
+                        'filename': filename,
+                        'filedata': filedata,
+                        'sha256': message.get('sha256')
+                    }
+                    for field in FILE_TARGET_FIELDS:
+                        if field in message:
+                            upload[field] = message[field]
+                    self.send_message(upload)
+                    self.display_system_message(f"Uploading '{filename}' for {target}...")
+                except Exception as e:
+                    self.display_system_message(f"Error sending file: {e}")
+                    
+        elif msg_type == 'file_progress':
+            filename = message.get('filename')
+            recipient = message.get('recipient')
+            status = message.get('status')
+            self.display_system_message(f"File '{filename}' {status} to {recipient} "
+                                        f"({message.get('done')}/{message.get('total')})")
+                    
         elif msg_type == 'users_list':
             self.online_users = message.get('users', [])
             self.update_users_list()
             
+        elif msg_type == 'ping':
+            # Heartbeat from the server: answer so the session is not reaped
+            self.send_message({'type': 'pong'})
+            
+        elif msg_type == 'throttled':
+            request = message.get('request')
+            if request == 'message' and self.unconfirmed:
+                self.unconfirmed.popleft()  # Will not get a message_sent
+            retry_after = message.get('retry_after')
+            self.display_system_message(f"Server is busy, your {request} was not sent "
+                                        f"(try again in {retry_after}s)")
+            
+        elif msg_type == 'error':
+            if message.get('request') == 'message' and self.unconfirmed:
+                self.unconfirmed.popleft()  # Rejected, will not get a message_sent
+            self.display_system_message(f"Error: {message.get('message')}")
+            
+    def cache_message(self, message, history_id=None):
+        """Store a chat message in the local cache"""
+        if self.cache is None or message.get('msg_id') is None:
+            return
+        conversation = conversation_of(message, self.username)
+        if conversation:
+            # Messages routed from another node carry the history_id of their msg_id
+            history_id = history_id or message.get('history_id', self.history_id)
+            self.cache.add(history_id, conversation, message)
+            
+    def format_message(self, message):
+        """Transcript line of a chat message"""
+        timestamp = format_time(message.get('timestamp'))
+        sender = message.get('sender')
+        content = message.get('content')
+        if message.get('type') == 'group_message':
+            return f"[{timestamp}] [{message.get('group_name')}] {sender}: {content}"
+        if sender == self.username:
+            recipient = message.get('recipient')
+            recipient_display = recipient if recipient != "all" else "Everyone"
+            return f"[{timestamp}] You -> {recipient_display}: {content}"
+        return f"[{timestamp}] {sender}: {content}"
+        
     def display_message(self, message):
         """Display a chat message in the GUI"""
         if self.chat_display:
@@ -218,37 +359,44 @@ class ChatClient:
             }
             self.send_message(msg)
             
-            # Display in own chat
-            timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            recipient_display = self.selected_recipient if self.selected_recipient != "all" else "Everyone"
-            self.display_message(f"[{timestamp}] You -> {recipient_display}: {message_text}")
+            # Display in own chat (and cache it once the server assigned its msg_id)
+            sent = dict(msg, sender=self.username, timestamp=time.time())
+            self.unconfirmed.append(sent)
+            self.display_message(self.format_message(sent))
             
             self.message_entry.delete(0, tk.END)
             
     def send_file(self):
-        """Send a file to selected user"""
+        """Send a file to the selected user, or to a group or several users"""
         if self.selected_recipient == "all":
-            messagebox.showwarning("File Transfer", "Please select a specific user to send a file")
-            return
+            # One upload, fanned out by the server
+            answer = simpledialog.askstring(
+                "File Transfer", "Send to a group (name) or several users (comma separated):")
+            if not answer or not answer.strip():
+                return
+            if answer.strip() in self.groups:
+                target = {'group_name': answer.strip()}
+            else:
+                target = {'recipients': [user.strip() for user in answer.split(',') if user.strip()]}
+        else:
+            target = {'recipient': self.selected_recipient}
             
         file_path = filedialog.askopenfilename(title="Select file to send")
         
         if file_path:
             try:
                 with open(file_path, 'rb') as f:
-                    filedata = base64.b64encode(f.read()).decode('utf-8')
+                    digest = file_hash(f.read())
                 
                 filename = os.path.basename(file_path)
                 
-                msg = {
-                    'type': 'file_transfer',
-                    'recipient': self.selected_recipient,
-                    'filename': filename,
-                    'filedata': filedata
-                }
+                # Offer the hash first; the file is uploaded only if the
+                # server does not have it already (see filestore.py)
+                msg = dict(target, type='file_offer', filename=filename, sha256=digest)
+                self.pending_uploads[(digest, describe_target(msg))] = file_path
                 self.send_message(msg)
                 
-                self.display_system_message(f"File '{filename}' sent to {self.selected_recipient}")
+                self.display_system_message(f"Offering file '{filename}' to {describe_target(msg)}...")
                 
             except Exception as e:
                 messagebox.showerror("File Transfer Error", f"Error sending file: {e}")
@@ -455,6 +603,11 @@ class ChatClient:
         # Initialize users list
         self.update_users_list()
         
+        # Show the cached transcript right away
+        if self.cache is not None:
+            for cached in self.cache.recent(200):
+                self.display_message(self.format_message(cached))
+        
         # Display welcome message
         self.display_system_message("Welcome to the chat! Select a user to chat privately or 'All Users' to broadcast.")
         
@@ -469,10 +622,24 @@ class ChatClient:
             self.connected = False
             if self.socket:
                 self.socket.close()
+        if self.cache is not None:
+            self.cache.close()
         self.root.destroy()
 
 def main():
     """Main function to start the chat client"""
+    parser = argparse.ArgumentParser(description="Chat client")
+    parser.add_argument('--tls', action='store_true', help="Connect with TLS")
+    parser.add_argument('--ca-file', default=None,
+                        help="Trust this certificate (e.g. the server's self-signed one)")
+    parser.add_argument('--insecure', action='store_true', help="Do not verify the server certificate")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Do not keep the transcript on disk (fetches no history)")
+    args = parser.parse_args()
+    ssl_context = None
+    if args.tls or args.ca_file:
+        ssl_context = client_context(args.ca_file, verify=not args.insecure)
+    
     # Login dialog
     root = tk.Tk()
     root.withdraw()
@@ -583,7 +750,8 @@ def main():
             return
         
         # Create client and connect
-        client = ChatClient(host=server, port=port)
+        client = ChatClient(host=server, port=port, ssl_context=ssl_context,
+                            use_cache=not args.no_cache)
         
         if client.connect(username):
             splash.destroy()
@@ -0,0 +1,491 @@
+"""
+Event-Driven Chat Server
+Computer Networks Semester Project
+
+A selectors-based engine for ChatServer: one thread serves every client
+through the operating system's readiness notification (epoll on Linux,
+kqueue on BSD/macOS) instead of one blocking thread per client.
+
+Every client socket is non-blocking and has its own connection state:
+    - a FrameReader that collects incoming bytes until a frame is complete
+    - frames waiting to be sent, per priority lane (see lanes.py)
+    - an output buffer holding the next frames taken from the lanes
+
+send() on a non-blocking socket may accept only part of the data. The
+rest stays in the output buffer and the socket is watched for writability
+until the buffer is empty, so frames are never cut off or interleaved.
+Only then are the next frames taken from the lanes, so a chat message
+never waits behind more than OUTPUT_BATCH bytes of a file. A client that
+stops reading and lets its unsent output grow beyond max_output_buffer
+is disconnected instead of eating server memory. The largest file
+waiting for a client does not count towards the limit: its frames are
+shared with the other recipients and taken one at a time (see
+lanes.FrameStream), so a single file may be as large as a frame.
+
+Message processing (process_message) is shared with the threaded engine.
+
+With TLS (ssl_context) the handshake is non-blocking too: the loop calls
+do_handshake() whenever the socket is ready and watches for whatever the
+handshake wants next, so a slow client never stalls the other ones.
+
+OSI Model Mapping:
+- Transport Layer: Non-blocking TCP sockets, partial send handling
+- Session Layer: Per-connection session state in one event loop
+"""
+
+import collections
+import heapq
+import itertools
+import selectors
+import socket
+import ssl
+import threading
+import time
+
+from heartbeat import PING
+from lanes import BULK, CONTROL, FrameStream, LaneQueue, limit_unsent
+from protocol import FrameReader, RECV_SIZE
+from server import ChatServer, DEFAULT_BACKLOG, log
+from tls import HANDSHAKE_TIMEOUT
+from tracing import now as trace_now
+
+# Disconnect clients whose unsent data grows beyond this many bytes
+MAX_OUTPUT_BUFFER = 16 * 1024 * 1024
+
+# Bytes taken from the lanes into the output buffer at a time
+OUTPUT_BATCH = 64 * 1024
+
+
+class Connection:
+    """State of one client connection in the event loop"""
+
+    __slots__ = ('sock', 'address', 'reader', 'lanes', 'outbuf', 'outpos', 'username', 'events',
+                 'reading', 'paused_until', 'failed', 'closed', 'handshaking')
+
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.reader = FrameReader()
+        self.lanes = LaneQueue()  # Frames not in outbuf yet
+        self.outbuf = bytearray()
+        self.outpos = 0  # Bytes of outbuf already sent
+        self.username = None
+        self.events = selectors.EVENT_READ  # Events registered with the selector
+        self.reading = True  # False while reading is paused
+        self.paused_until = 0.0  # Reading stays paused until then (admission control)
+        self.failed = False  # Dropped while sending, closed after the current event
+        self.closed = False
+        self.handshaking = False  # TLS handshake still in progress
+
+
+class EventChatServer(ChatServer):
+    """
+    ChatServer running all clients in a single selector event loop
+
+    Frames sent from other threads (e.g. the cluster bus) are handed to the
+    loop through a queue and a wake-up socket, so only the loop thread ever
+    touches sockets and buffers. Other work is handed over the same way
+    with call_soon, and call_later runs a function on the loop after a delay.
+    """
+
+    thread_per_client = False
+    connection_class = Connection
+
+    def __init__(self, host='0.0.0.0', port=5555, tracer=None, reuse_port=False,
+                 backlog=DEFAULT_BACKLOG, max_connections=0, ssl_context=None,
+                 max_output_buffer=MAX_OUTPUT_BUFFER):
+        super().__init__(host=host, port=port, tracer=tracer, reuse_port=reuse_port,
+                         backlog=backlog, max_connections=max_connections, ssl_context=ssl_context)
+        self.selector = selectors.DefaultSelector()
+        self.connections = {}  # {socket: Connection}
+        self.max_output_buffer = max_output_buffer
+        self.loop_thread = None
+        self.pending = collections.deque()  # (socket, data) queued by other threads
+        self.calls = collections.deque()  # (function, args) to run on the loop thread
+        self.timers = []  # Heap of (deadline, seq, function, args)
+        self.timer_seq = itertools.count()
+        self.queued_bytes = 0  # Unsent bytes in all output buffers
+        self.failed = []  # Connections to close once the current event is handled
+        self.waker, self.wake_sender = socket.socketpair()
+        self.waker.setblocking(False)
+        self.wake_sender.setblocking(False)
+
+    def start(self):
+        """
+        Run the event loop
+
+        OSI Model Mapping:
+        - Transport Layer: TCP listening, accepting and I/O multiplexing
+        """
+        try:
+            self.server_socket.bind((self.host, self.port))
+            self.server_socket.listen(self.backlog)
+            self.server_socket.setblocking(False)
+            self.port = self.server_socket.getsockname()[1]
+            self.loop_thread = threading.get_ident()
+            self.selector.register(self.server_socket, selectors.EVENT_READ, 'accept')
+            self.selector.register(self.waker, selectors.EVENT_READ, 'wake')
+            self.ready.set()
+            log.info("Event server (%s) started on %s:%s",
+                     type(self.selector).__name__, self.host, self.port)
+            if self.heartbeat:
+                self.call_later(self.heartbeat.tick, self.heartbeat_tick)
+
+            while True:
+                for key, mask in self.selector.select(self.run_timers()):
+                    if key.data == 'accept':
+                        self.accept_clients()
+                    elif key.data == 'wake':
+                        self.flush_pending()
+                    else:
+                        conn = key.data
+                        if conn.handshaking:
+                            self.continue_handshake(conn)
+                        elif mask & selectors.EVENT_READ and not conn.failed:
+                            self.read_client(conn)
+                        if mask & selectors.EVENT_WRITE and not conn.failed:
+                            self.write_client(conn)
+                    if self.failed:
+                        self.close_failed()
+        except Exception as e:
+            log.error("%s", e)
+        finally:
+            for conn in list(self.connections.values()):
+                self.close_connection(conn)
+            self.close_failed()
+            self.selector.close()
+            self.server_socket.close()
+
+    def accept_clients(self):
+        """Accept every connection waiting in the backlog"""
+        while True:
+            try:
+                client_socket, address = self.server_socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            if not self.admit_connection(client_socket, address):
+                continue
+            client_socket.setblocking(False)
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            limit_unsent(client_socket)
+            if self.ssl_context is not None:
+                client_socket = self.ssl_context.wrap_socket(
+                    client_socket, server_side=True, do_handshake_on_connect=False)
+            if self.heartbeat:
+                self.heartbeat.track(client_socket)
+            conn = self.connection_class(client_socket, address)
+            conn.reader.max_frame_size = self.max_frame_size
+            self.connections[client_socket] = conn
+            self.selector.register(client_socket, selectors.EVENT_READ, conn)
+            if self.ssl_context is not None:
+                conn.handshaking = True
+                self.call_later(HANDSHAKE_TIMEOUT, self.handshake_timeout, conn)
+            log.debug("New connection from %s", address)
+
+    def continue_handshake(self, conn):
+        """
+        Advance a non-blocking TLS handshake
+
+        OSI Model Mapping:
+        - Presentation Layer: Negotiating encryption
+        - Session Layer: New or resumed TLS session
+        """
+        try:
+            conn.sock.do_handshake()
+        except ssl.SSLWantReadError:
+            events = selectors.EVENT_READ
+        except ssl.SSLWantWriteError:
+            events = selectors.EVENT_WRITE
+        except OSError as e:
+            log.warning("TLS handshake with %s failed: %s", conn.address, e)
+            self.close_connection(conn)
+            return
+        else:
+            conn.handshaking = False
+            log.debug("TLS %s with %s%s", conn.sock.version(), conn.address,
+                      " (resumed)" if conn.sock.session_reused else "")
+            self.update_events(conn)
+            if conn.sock.pending():
+                # The client's first frames arrived together with the handshake
+                self.read_client(conn)
+            return
+        if events != conn.events:
+            self.selector.modify(conn.sock, events, conn)
+            conn.events = events
+
+    def handshake_timeout(self, conn):
+        if conn.handshaking and not conn.closed:
+            log.warning("TLS handshake with %s timed out", conn.address)
+            self.close_connection(conn)
+
+    def receive(self, conn):
+        """
+        Read what the socket has: data, b'' if the connection is gone,
+        or None if nothing is available yet
+        """
+        try:
+            data = conn.sock.recv(RECV_SIZE)
+            # TLS decrypts a whole record at a time; what did not fit into this
+            # recv() is buffered in the SSL object, where select() cannot see it
+            while data and self.ssl_context is not None and conn.sock.pending():
+                data += conn.sock.recv(conn.sock.pending())
+            return data
+        except (BlockingIOError, InterruptedError, ssl.SSLWantReadError, ssl.SSLWantWriteError):
+            return None
+        except OSError as e:
+            log.error("Error handling client %s: %s", conn.address, e)
+            return b''
+
+    def read_client(self, conn):
+        """Read what is available and process every complete frame"""
+        data = self.receive(conn)
+        if data is None:
+            return
+        if not data:
+            self.close_connection(conn)
+            return
+        if self.heartbeat:
+            self.heartbeat.touch(conn.sock)
+
+        tracer = self.tracer
+        received_at = trace_now() if tracer.enabled else 0
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.enable_thread()
+
+        try:
+            for message in conn.reader.feed(data):
+                trace = tracer.begin(message, received_at) if tracer.enabled else None
+                conn.username = self.process_message(conn.sock, conn.address, conn.username, message)
+                if trace:
+                    tracer.end(trace)
+                if conn.failed:
+                    break
+        except Exception as e:
+            log.error("Error handling client %s: %s", conn.address, e)
+            self.close_connection(conn)
+        finally:
+            if profiler is not None:
+                profiler.disable_thread()
+
+    def send_data(self, client_socket, data, lane=CONTROL):
+        """
+        Queue an already encoded frame for a client and send as much as
+        the socket takes
+
+        OSI Model Mapping:
+        - Transport Layer: Non-blocking TCP transmission
+        """
+        if self.tracer.enabled:
+            self.tracer.mark('enqueue', bytes=len(data))
+        if threading.get_ident() != self.loop_thread:
+            self.pending.append((client_socket, data, lane))
+            self.wake()
+            return
+        conn = self.connections.get(client_socket)
+        if conn is not None and not conn.failed:
+            self.queue_output(conn, data, lane)
+
+    def send_frames(self, client_socket, frames, lane=BULK):
+        """Queue the frames of a file to be taken from the lanes one at a time"""
+        if len(frames) == 1:
+            self.send_data(client_socket, frames[0], lane)
+        else:
+            self.send_data(client_socket, FrameStream(frames), lane)
+
+    def wake(self):
+        """Interrupt the loop's select() from another thread"""
+        try:
+            self.wake_sender.send(b'\0')
+        except BlockingIOError:
+            pass  # The loop is already being woken up
+
+    def flush_pending(self):
+        """Send frames and run calls queued by other threads"""
+        try:
+            while self.waker.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+        while self.pending:
+            client_socket, data, lane = self.pending.popleft()
+            conn = self.connections.get(client_socket)
+            if conn is not None and not conn.failed:
+                self.queue_output(conn, data, lane)
+        while self.calls:
+            function, args = self.calls.popleft()
+            function(*args)
+        self.close_failed()
+
+    def call_soon(self, function, *args):
+        """Run function(*args) on the loop thread"""
+        self.calls.append((function, args))
+        self.wake()
+
+    def call_later(self, delay, function, *args):
+        """Run function(*args) on the loop thread after delay seconds (loop thread only)"""
+        heapq.heappush(self.timers, (time.monotonic() + delay, next(self.timer_seq), function, args))
+
+    def run_timers(self):
+        """Run due timers; returns the select() timeout until the next one"""
+        while self.timers:
+            deadline = self.timers[0][0]
+            now = time.monotonic()
+            if deadline > now:
+                return deadline - now
+            _, _, function, args = heapq.heappop(self.timers)
+            function(*args)
+        return None
+
+    def heartbeat_tick(self):
+        self.heartbeat.advance()
+        self.call_later(self.heartbeat.tick, self.heartbeat_tick)
+
+    def send_ping(self, client_socket):
+        self.send_message(client_socket, PING)
+
+    def reap_connection(self, client_socket):
+        conn = self.connections.get(client_socket)
+        if conn is not None:
+            self.close_connection(conn)
+
+    def queued_output(self):
+        return self.queued_bytes
+
+    def pause_reading(self, client_socket, seconds):
+        """Stop reading from a client for a while (backpressure)"""
+        if threading.get_ident() != self.loop_thread:
+            self.call_soon(self.pause_reading, client_socket, seconds)
+            return
+        conn = self.connections.get(client_socket)
+        if conn is None or conn.failed:
+            return
+        resume_at = time.monotonic() + seconds
+        if resume_at > conn.paused_until:
+            conn.paused_until = resume_at
+            self.call_later(seconds, self.resume_reading, conn)
+        conn.reading = False
+        self.update_events(conn)
+
+    def resume_reading(self, conn):
+        if conn.failed or conn.reading or conn.paused_until > time.monotonic():
+            return
+        conn.reading = True
+        self.update_events(conn)
+
+    def queue_output(self, conn, data, lane=CONTROL):
+        lanes = conn.lanes
+        if isinstance(data, FrameStream):
+            lanes.push_stream(lane, data)
+            if not conn.outbuf:
+                self.fill_output(conn)
+        elif conn.outbuf or lanes:
+            lanes.push(lane, data)
+            self.queued_bytes += len(data)
+        else:
+            conn.outbuf += data  # Nothing is waiting, no need to schedule
+            self.queued_bytes += len(data)
+        unsent = len(conn.outbuf) - conn.outpos + lanes.bytes + lanes.streamed
+        if (unsent > self.max_output_buffer and
+                unsent - lanes.largest_stream() > self.max_output_buffer):
+            log.warning("Disconnecting %s: %d bytes of unsent output",
+                        conn.username or conn.address, unsent)
+            self.drop_connection(conn)
+            return
+        if not conn.events & selectors.EVENT_WRITE and not conn.handshaking:
+            # Nothing was waiting, try to send right away
+            self.write_client(conn)
+
+    def write_client(self, conn):
+        """Send buffered output, handling partial writes, then the next frames of the lanes"""
+        while True:
+            try:
+                with memoryview(conn.outbuf) as view, view[conn.outpos:] as unsent:
+                    sent = conn.sock.send(unsent)
+            except (BlockingIOError, InterruptedError, ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                sent = 0
+            except OSError as e:
+                log.error("Error sending message: %s", e)
+                self.drop_connection(conn)
+                return
+            
+            # Advance an offset instead of deleting from the front on every send,
+            # which would copy the whole remaining buffer each time
+            conn.outpos += sent
+            self.queued_bytes -= sent
+            if conn.outpos < len(conn.outbuf):
+                break  # The socket is full
+            conn.outbuf.clear()
+            conn.outpos = 0
+            if not self.fill_output(conn):
+                if self.tracer.enabled:
+                    self.tracer.mark('write')
+                break
+
+        self.update_events(conn)
+
+    def fill_output(self, conn):
+        """Move the next frames from the lanes into the empty output buffer"""
+        lanes = conn.lanes
+        queued = lanes.bytes
+        pop = lanes.pop
+        while len(conn.outbuf) < OUTPUT_BATCH:
+            data = pop()
+            if data is None:
+                break
+            conn.outbuf += data
+        # Frames taken from FrameStreams count as queued from now on
+        self.queued_bytes += len(conn.outbuf) - (queued - lanes.bytes)
+        return bool(conn.outbuf)
+
+    def update_events(self, conn):
+        """Watch for readability unless paused and for writability while output is queued"""
+        events = ((selectors.EVENT_READ if conn.reading else 0) |
+                  (selectors.EVENT_WRITE if conn.outbuf else 0))
+        if events == conn.events or conn.closed:
+            return
+        if not events:
+            self.selector.unregister(conn.sock)
+        elif not conn.events:
+            self.selector.register(conn.sock, events, conn)
+        else:
+            self.selector.modify(conn.sock, events, conn)
+        conn.events = events
+
+    def drop_connection(self, conn):
+        """
+        Stop serving a connection that failed while sending
+
+        A send can fail in the middle of a fan-out (e.g. broadcast_local) or
+        while the client's own message is being processed, so
+        disconnect_client, which broadcasts 'user_left' itself, runs later
+        from the event loop in close_failed instead of inside the send.
+        """
+        if conn.failed:
+            return
+        conn.failed = True
+        self.discard_output(conn)
+        self.failed.append(conn)
+
+    def discard_output(self, conn):
+        self.queued_bytes -= len(conn.outbuf) - conn.outpos + conn.lanes.bytes
+        conn.lanes.clear()  # FrameStreams were not counted yet
+        conn.outbuf.clear()
+        conn.outpos = 0
+
+    def close_failed(self):
+        while self.failed:
+            self.close_connection(self.failed.pop())
+
+    def close_connection(self, conn):
+        if conn.closed:
+            return
+        conn.closed = True
+        conn.failed = True
+        self.discard_output(conn)
+        self.connections.pop(conn.sock, None)
+        try:
+            self.selector.unregister(conn.sock)
+        except (KeyError, ValueError):
+            pass
+        self.disconnect_client(conn.sock, conn.username)
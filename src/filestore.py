@@ -0,0 +1,118 @@
+"""
+File Store
+Computer Networks Semester Project
+
+Content-addressed store for file transfers, so a file sent to many
+recipients one after another is uploaded to the server only once.
+
+    sender                       server                     recipient
+      | file_offer (sha256) -------> |
+      | <------- file_offer_response |
+      |        status 'stored': the server has the blob from this
+      |                         sender and forwards it right away
+      |        status 'upload': the sender sends the usual
+      | file_transfer + sha256 ----> |  verified, stored --------> |
+
+Files are keyed by the SHA-256 of their content. An uploaded file is
+only stored if its data really has the announced hash, so nobody can
+plant different content under someone else's hash. A hash is not a
+secret, though (it may be shown to recipients or guessed for well-known
+files), so an offer is only answered 'stored' for users who uploaded
+that file themselves; everybody else has to prove they have it by
+uploading it. The store is bounded in bytes; the least recently used
+files are evicted first.
+
+Sized from the command line with:
+    python src/server.py --file-store-mb 64     (0 disables deduplication)
+
+OSI Model Mapping:
+- Application Layer: Deduplicated file transfer
+- Presentation Layer: Content hashes of the (base64 encoded) files
+"""
+
+import base64
+import binascii
+import collections
+import hashlib
+import threading
+
+# Bytes of (base64 encoded) file data kept by default
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def file_hash(data):
+    """Hex SHA-256 of raw file content"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class FileStore:
+    """
+    Bounded LRU store {sha256: base64 file data} remembering who uploaded each file
+
+    Files are kept base64 encoded, exactly as they are forwarded, so a
+    cache hit costs no encoding work.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.files = collections.OrderedDict()  # {sha256: (data, uploaders)}, least recently used first
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def get(self, digest, uploader=None):
+        """
+        File data for a hash, or None; a hit makes the file most recently used
+
+        With an uploader the file is only returned if that user uploaded it.
+        """
+        if not isinstance(digest, str):
+            return None
+        with self.lock:
+            entry = self.files.get(digest)
+            if entry is None or (uploader is not None and uploader not in entry[1]):
+                self.misses += 1
+                return None
+            self.files.move_to_end(digest)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, digest, filedata, uploader=None):
+        """
+        Store a file uploaded by a user under its announced hash
+
+        Returns False (and stores nothing) if the data does not match the
+        hash or is larger than the whole store.
+        """
+        if not isinstance(digest, str) or not isinstance(filedata, str):
+            return False
+        if len(filedata) > self.max_bytes:
+            return False
+        try:
+            data = base64.b64decode(filedata, validate=True)
+        except (binascii.Error, ValueError):
+            return False
+        if file_hash(data) != digest:
+            return False
+
+        with self.lock:
+            entry = self.files.get(digest)
+            if entry is not None:
+                entry[1].add(uploader)
+                self.files.move_to_end(digest)
+                return True
+            self.files[digest] = (filedata, {uploader})
+            self.size += len(filedata)
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self.files.popitem(last=False)
+                self.size -= len(evicted)
+                self.evicted += 1
+        return True
+
+    def __contains__(self, digest):
+        return digest in self.files
+
+    def __len__(self):
+        return len(self.files)
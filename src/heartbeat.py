@@ -0,0 +1,204 @@
+"""
+Heartbeats
+Computer Networks Semester Project
+
+Finds and removes dead connections (crashed clients, NAT entries that
+expired, unplugged cables), which otherwise stay logged in until a send
+to them fails and waste a share of every broadcast.
+
+Two layers:
+    TCP keepalive  - the kernel probes idle connections (SO_KEEPALIVE with
+                     tuned idle/interval/count, see configure_keepalive)
+    Ping / pong    - a connection that sent nothing for `interval` seconds
+                     gets {"type": "ping"}; without any reply within
+                     `timeout` seconds the session is reaped
+
+Connections are tracked on a hashed timer wheel: an array of slots, each
+holding the connections due in that tick. Advancing the wheel looks only
+at the current slot, so the cost per tick does not depend on how many
+connections are open. Recording activity is a single dict write; a
+connection that was active is simply rescheduled when its slot comes up.
+
+Enabled from the command line with:
+    python src/server.py --heartbeat-interval 30 --heartbeat-timeout 10
+
+OSI Model Mapping:
+- Session Layer: Detecting and ending dead sessions
+- Transport Layer: TCP keepalive probes
+"""
+
+import math
+import socket
+import threading
+import time
+
+from server_logging import get_logger
+
+log = get_logger()
+
+DEFAULT_INTERVAL = 30.0
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_TICK = 1.0
+WHEEL_SLOTS = 64
+
+# TCP keepalive probes: first after KEEPALIVE_IDLE idle seconds, then every
+# KEEPALIVE_INTERVAL seconds, giving up after KEEPALIVE_COUNT lost probes
+KEEPALIVE_IDLE = 60
+KEEPALIVE_INTERVAL = 10
+KEEPALIVE_COUNT = 5
+
+PING = {'type': 'ping'}
+
+
+def configure_keepalive(sock, idle=KEEPALIVE_IDLE, interval=KEEPALIVE_INTERVAL, count=KEEPALIVE_COUNT):
+    """Enable TCP keepalive with the given timing where the platform supports it"""
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    # TCP_KEEPIDLE on Linux, TCP_KEEPALIVE on macOS
+    idle_option = getattr(socket, 'TCP_KEEPIDLE', getattr(socket, 'TCP_KEEPALIVE', None))
+    for option, value in ((idle_option, idle),
+                          (getattr(socket, 'TCP_KEEPINTVL', None), interval),
+                          (getattr(socket, 'TCP_KEEPCNT', None), count)):
+        if option is not None:
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, option, value)
+            except OSError:
+                pass
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel
+
+    Keys are placed in slot (current + ticks) % slots, with the number of
+    full turns still to wait for delays longer than one turn of the wheel.
+    """
+
+    def __init__(self, tick=DEFAULT_TICK, slots=WHEEL_SLOTS, now=None):
+        self.tick = tick
+        self.slots = [{} for _ in range(slots)]  # [{key: remaining turns}]
+        self.where = {}  # {key: slot index}
+        self.current = 0
+        self.next_tick = (time.monotonic() if now is None else now) + tick
+
+    def schedule(self, key, delay):
+        """(Re)schedule key to expire after delay seconds"""
+        self.cancel(key)
+        ticks = max(1, math.ceil(delay / self.tick))
+        index = (self.current + ticks) % len(self.slots)
+        self.slots[index][key] = (ticks - 1) // len(self.slots)
+        self.where[key] = index
+
+    def cancel(self, key):
+        index = self.where.pop(key, None)
+        if index is not None:
+            del self.slots[index][key]
+
+    def advance(self, now=None):
+        """Move the wheel up to now; returns the keys that expired"""
+        now = time.monotonic() if now is None else now
+        expired = []
+        while now >= self.next_tick:
+            self.next_tick += self.tick
+            self.current = (self.current + 1) % len(self.slots)
+            slot = self.slots[self.current]
+            for key, turns in list(slot.items()):
+                if turns:
+                    slot[key] = turns - 1
+                else:
+                    del slot[key]
+                    del self.where[key]
+                    expired.append(key)
+        return expired
+
+    def __len__(self):
+        return len(self.where)
+
+
+class HeartbeatMonitor:
+    """
+    Pings idle connections of a ChatServer and reaps the ones that stay silent
+
+    Attached as ``server.heartbeat``. The server calls track() for new
+    connections, touch() whenever data arrives and forget() on disconnect;
+    advance() is driven either by the monitor's own thread (threaded
+    engine) or by a timer of the event loop.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, timeout=DEFAULT_TIMEOUT, tick=DEFAULT_TICK,
+                 keepalive_idle=KEEPALIVE_IDLE):
+        self.interval = interval
+        self.timeout = timeout
+        self.tick = tick
+        self.keepalive_idle = keepalive_idle
+        self.server = None
+        self.wheel = TimerWheel(tick)
+        self.last_seen = {}  # {socket: time.monotonic()}
+        self.pinged = set()  # Sockets that were pinged and have not answered yet
+        self.lock = threading.Lock()
+        self.running = threading.Event()
+        self.reaped = 0
+
+    def attach(self, server):
+        self.server = server
+        server.heartbeat = self
+
+    def start_thread(self):
+        """Advance the wheel from a background thread"""
+        self.running.set()
+        threading.Thread(target=self.run, name='heartbeat', daemon=True).start()
+
+    def stop(self):
+        self.running.clear()
+
+    def run(self):
+        while self.running.is_set():
+            time.sleep(self.tick)
+            self.advance()
+
+    def track(self, client_socket):
+        """Start watching a new connection"""
+        if self.keepalive_idle:
+            configure_keepalive(client_socket, idle=self.keepalive_idle)
+        with self.lock:
+            self.last_seen[client_socket] = time.monotonic()
+            self.wheel.schedule(client_socket, self.interval)
+
+    def touch(self, client_socket):
+        """Record activity; cheap enough to call for every received packet"""
+        self.last_seen[client_socket] = time.monotonic()
+        if self.pinged:
+            self.pinged.discard(client_socket)
+
+    def forget(self, client_socket):
+        with self.lock:
+            self.last_seen.pop(client_socket, None)
+            self.pinged.discard(client_socket)
+            self.wheel.cancel(client_socket)
+
+    def advance(self, now=None):
+        """Handle the connections whose timer expired"""
+        now = time.monotonic() if now is None else now
+        ping, reap = [], []
+        with self.lock:
+            for client_socket in self.wheel.advance(now):
+                last_seen = self.last_seen.get(client_socket)
+                if last_seen is None:
+                    continue
+                idle = now - last_seen
+                if idle < self.interval and client_socket not in self.pinged:
+                    # Active since it was scheduled: check again later
+                    self.wheel.schedule(client_socket, self.interval - idle)
+                elif client_socket not in self.pinged:
+                    self.pinged.add(client_socket)
+                    self.wheel.schedule(client_socket, self.timeout)
+                    ping.append(client_socket)
+                else:
+                    reap.append(client_socket)
+
+        for client_socket in ping:
+            self.server.send_ping(client_socket)
+        for client_socket in reap:
+            self.reaped += 1
+            log.info("Reaping connection silent for %.0fs", now - self.last_seen.get(client_socket, now))
+            self.forget(client_socket)
+            self.server.reap_connection(client_socket)
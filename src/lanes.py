@@ -0,0 +1,270 @@
+"""
+Outbound Priority Lanes
+Computer Networks Semester Project
+
+Everything the server sends a client shares one TCP stream, so a chat
+message queued behind a large file waits until the whole file has gone
+out. Outgoing frames are therefore put into one of three lanes:
+
+    CONTROL  - presence and replies to requests (login_response,
+               user_joined, ping, file_progress, throttled, ...)
+    CHAT     - message, group_message, sync_response, search_results
+    BULK     - file data
+
+and a file is not sent as one frame: file_frames() cuts its data into
+'file_chunk' frames of FILE_CHUNK_SIZE characters, followed by the
+'file_transfer' message itself carrying the rest and the number of
+chunks before it (clients put the file back together with FileAssembler):
+
+    {"type": "file_chunk", "msg_id": 12, "filedata": "<first part>"}
+    {"type": "file_chunk", "msg_id": 12, "filedata": "<second part>"}
+    {"type": "file_transfer", "msg_id": 12, ..., "filedata": "<rest>", "chunks": 2}
+
+A file routed from another cluster node carries that node's history_id
+(see routing.py), and so do its chunks: msg_ids are only unique within
+one history, and chunks of files from two nodes may interleave on one
+connection in the threaded engine. Clients key the chunks on both.
+
+Frames of other lanes can go out between the chunks. The event engines
+keep a LaneQueue per connection that picks the next frame by deficit
+round robin: each lane may send LANE_QUANTUM bytes per round, so control
+and chat frames wait for at most about one chunk and files still get
+their share of the connection. A file is queued as a FrameStream: its
+frames (encoded once for all recipients) are taken from it one at a
+time, so a connection only buffers the chunks about to be sent. The threaded engine sends from the
+handler threads; there SendLock lets threads with control or chat frames
+take the connection before the next chunk of a file.
+
+OSI Model Mapping:
+- Session Layer: Scheduling several kinds of traffic on one connection
+- Transport Layer: Sharing the TCP stream
+"""
+
+import collections
+import socket
+import threading
+
+from messages import ServerMessage
+from protocol import encode_message
+
+CONTROL, CHAT, BULK = range(3)
+LANE_NAMES = ('control', 'chat', 'bulk')
+
+CHAT_TYPES = frozenset(('message', 'group_message', 'sync_response', 'search_results'))
+BULK_TYPES = frozenset(('file_transfer', 'file_chunk'))
+
+# Characters of (base64) file data per frame
+FILE_CHUNK_SIZE = 64 * 1024
+
+# Bytes each lane may send per scheduling round (control:chat:bulk = 4:2:1)
+LANE_QUANTUM = (64 * 1024, 32 * 1024, 16 * 1024)
+
+# Longest a file chunk waits for other senders to a connection (threaded engine)
+BULK_MAX_WAIT = 0.02
+
+# Unsent bytes the kernel may hold for a connection (TCP_NOTSENT_LOWAT)
+UNSENT_LIMIT = 128 * 1024
+
+
+def lane_of(message):
+    """Lane of a message by its type"""
+    msg_type = message.get('type')
+    if msg_type in CHAT_TYPES:
+        return CHAT
+    if msg_type in BULK_TYPES:
+        return BULK
+    return CONTROL
+
+
+def file_frames(message, chunk_size=FILE_CHUNK_SIZE):
+    """Encoded frames of a file_transfer message: file_chunk frames, then the message"""
+    filedata = message.get('filedata')
+    if not isinstance(filedata, str) or len(filedata) <= chunk_size:
+        return [encode_message(message)]
+    chunk = {'type': 'file_chunk', 'msg_id': message.get('msg_id')}
+    history_id = message.get('history_id')
+    if history_id is not None:
+        chunk['history_id'] = history_id
+    last = (len(filedata) - 1) // chunk_size * chunk_size
+    frames = [encode_message(dict(chunk, filedata=filedata[start:start + chunk_size]))
+              for start in range(0, last, chunk_size)]
+    final = message.to_dict() if isinstance(message, ServerMessage) else dict(message)
+    final['filedata'] = filedata[last:]
+    final['chunks'] = len(frames)
+    frames.append(encode_message(final))
+    return frames
+
+
+def limit_unsent(sock, limit=UNSENT_LIMIT):
+    """
+    Keep the kernel from buffering more than limit unsent bytes for a socket
+
+    Frames handed to the kernel cannot be overtaken any more, and its send
+    buffer grows to megabytes; with TCP_NOTSENT_LOWAT the rest of a file
+    stays in the lanes. Without the option (not Linux or macOS) nothing
+    changes.
+    """
+    option = getattr(socket, 'TCP_NOTSENT_LOWAT', None)
+    if option is not None:
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, option, limit)
+        except OSError:
+            pass
+
+
+class FrameStream:
+    """The frames of one file still to be sent on one connection"""
+
+    __slots__ = ('frames', 'position', 'remaining')
+
+    def __init__(self, frames):
+        self.frames = frames  # Shared by every recipient of the file
+        self.position = 0
+        self.remaining = sum(map(len, frames))
+
+    def __len__(self):
+        return self.remaining
+
+
+class LaneQueue:
+    """Encoded frames waiting to be sent on one connection, a FIFO per lane"""
+
+    __slots__ = ('lanes', 'deficits', 'current', 'bytes', 'streamed')
+
+    def __init__(self):
+        self.lanes = tuple(collections.deque() for _ in LANE_NAMES)
+        self.deficits = [0] * len(LANE_NAMES)
+        self.current = 0  # Lane whose turn it is
+        self.bytes = 0  # Bytes of the frames in the lanes
+        self.streamed = 0  # Bytes still in FrameStreams
+
+    def __bool__(self):
+        return self.bytes > 0 or self.streamed > 0
+
+    def push(self, lane, data):
+        self.lanes[lane].append(data)
+        self.bytes += len(data)
+
+    def push_stream(self, lane, stream):
+        """Queue a FrameStream; its frames are taken when they are next in line"""
+        self.lanes[lane].append(stream)
+        self.streamed += stream.remaining
+
+    def head(self, frames):
+        """First frame of a lane, taken from a FrameStream if one is first; None if empty"""
+        if not frames:
+            return None
+        first = frames[0]
+        if not isinstance(first, FrameStream):
+            return first
+        data = first.frames[first.position]
+        first.position += 1
+        first.remaining -= len(data)
+        self.streamed -= len(data)
+        self.bytes += len(data)
+        if first.position == len(first.frames):
+            frames[0] = data
+        else:
+            frames.appendleft(data)
+        return data
+
+    def largest_stream(self):
+        """Bytes left in the largest FrameStream"""
+        return max((item.remaining for frames in self.lanes for item in frames
+                    if isinstance(item, FrameStream)), default=0)
+
+    def pop(self):
+        """Next frame to send (deficit round robin), None if nothing is queued"""
+        if not self:
+            return None
+        lanes, deficits = self.lanes, self.deficits
+        while True:
+            frames = lanes[self.current]
+            first = self.head(frames)
+            # The only lane with frames need not wait for its turns
+            if first is not None and (len(first) <= deficits[self.current] or
+                                      all(lane is frames or not lane for lane in lanes)):
+                data = frames.popleft()
+                self.bytes -= len(data)
+                deficits[self.current] = max(deficits[self.current] - len(data), 0) if frames else 0
+                return data
+            if not frames:
+                deficits[self.current] = 0
+            self.current = (self.current + 1) % len(lanes)
+            if lanes[self.current]:
+                deficits[self.current] += LANE_QUANTUM[self.current]
+
+    def clear(self):
+        for frames in self.lanes:
+            frames.clear()
+        self.bytes = 0
+        self.streamed = 0
+
+
+class SendLock:
+    """
+    Send lock of a connection in the threaded engine
+
+    acquire(lane=BULK) first waits (at most max_wait) until no thread with
+    a control or chat frame is queued for the lock. Those threads only
+    count themselves while a bulk frame is being sent, so the lock costs
+    nothing extra when no file is in flight.
+    """
+
+    def __init__(self, max_wait=BULK_MAX_WAIT):
+        self.lock = threading.Lock()
+        self.changed = threading.Condition()
+        self.waiting = 0  # Control and chat senders waiting behind a bulk frame
+        self.bulk = False  # The holder is sending a bulk frame
+        self.max_wait = max_wait
+
+    def acquire(self, blocking=True, lane=CONTROL):
+        if lane == BULK:
+            with self.changed:
+                self.changed.wait_for(lambda: not self.waiting, self.max_wait)
+            acquired = self.lock.acquire(blocking)
+            if acquired:
+                self.bulk = True
+            return acquired
+        if not self.bulk:
+            return self.lock.acquire(blocking)
+        with self.changed:
+            self.waiting += 1
+        try:
+            return self.lock.acquire(blocking)
+        finally:
+            with self.changed:
+                self.waiting -= 1
+                if not self.waiting:
+                    self.changed.notify_all()
+
+    def release(self):
+        self.bulk = False
+        self.lock.release()
+
+
+class FileAssembler:
+    """Joins file_chunk frames back into their file_transfer message (client side)"""
+
+    def __init__(self):
+        self.chunks = {}  # {(history_id, msg_id): [file data]} of files still arriving
+
+    def add(self, message):
+        """
+        The received message as it should be handled: None for a chunk,
+        the complete file for a file_transfer, other messages unchanged
+
+        Raises ValueError if chunks of a file are missing.
+        """
+        msg_type = message.get('type')
+        key = (message.get('history_id'), message.get('msg_id'))
+        if msg_type == 'file_chunk':
+            self.chunks.setdefault(key, []).append(message.get('filedata'))
+            return None
+        if msg_type == 'file_transfer' and 'chunks' in message:
+            chunks = self.chunks.pop(key, [])
+            if len(chunks) != message['chunks']:
+                raise ValueError(f"'{message.get('filename')}' arrived incomplete")
+            message = dict(message, filedata=''.join(chunks) + message.get('filedata', ''))
+            del message['chunks']
+        return message
@@ -0,0 +1,166 @@
+"""
+Chat Message Model
+Computer Networks Semester Project
+
+The messages the server creates and keeps in its history are small
+objects with __slots__ instead of dicts: no per-instance dict, and the
+timestamp is a float (epoch seconds) instead of a formatted string.
+Clients format it when they display a message (format_time).
+
+    ChatMessage   - 'message' to one user or to everybody
+    GroupMessage  - 'group_message'
+    FileMessage   - 'file_transfer' (relayed, not stored)
+
+On the wire they are the same JSON objects as before, apart from the
+numeric timestamp; encode_message() (protocol.py) turns them into their
+dict. For code that only reads fields, get() and [] work as on a dict,
+so helpers shared with the client (e.g. sync.conversation_of) take both.
+
+OSI Model Mapping:
+- Application Layer: Chat message structure
+- Presentation Layer: Timestamp representation
+"""
+
+import datetime
+import json
+import time
+
+# Display form of timestamps (and the wire form of older servers)
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+MISSING = object()
+
+
+def format_time(timestamp):
+    """Display form of a timestamp (strings from older servers pass through)"""
+    if isinstance(timestamp, (int, float)):
+        return datetime.datetime.fromtimestamp(timestamp).strftime(TIME_FORMAT)
+    return timestamp
+
+
+def parse_time(timestamp):
+    """Epoch seconds of a timestamp in either form, None if there is none"""
+    if isinstance(timestamp, (int, float)):
+        return timestamp
+    try:
+        return datetime.datetime.strptime(timestamp, TIME_FORMAT).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class ServerMessage:
+    """Fields of every message the server creates"""
+
+    __slots__ = ('msg_id', 'sender', 'timestamp', 'sent_at', 'trace')
+    type = None
+    FIELDS = ()  # Always on the wire, in this order
+    OPTIONAL = ('sent_at', 'trace')  # On the wire when set
+
+    def __init__(self, msg_id, sender, timestamp=None):
+        self.msg_id = msg_id
+        self.sender = sender
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.sent_at = None  # Client timing fields, see ChatServer.copy_trace_fields
+        self.trace = None
+
+    def to_dict(self):
+        """The message as sent on the wire"""
+        message = {'type': self.type}
+        for field in self.FIELDS:
+            message[field] = getattr(self, field)
+        return self.add_optional(message)
+
+    def add_optional(self, message):
+        for field in self.OPTIONAL:
+            value = getattr(self, field)
+            if value is not None:
+                message[field] = value
+        return message
+
+    def get(self, field, default=None):
+        if field == 'type':
+            return self.type
+        if field in self.FIELDS:
+            return getattr(self, field)
+        if field in self.OPTIONAL:
+            value = getattr(self, field)
+            if value is not None:
+                return value
+        return default
+
+    def __getitem__(self, field):
+        value = self.get(field, MISSING)
+        if value is MISSING:
+            raise KeyError(field)
+        return value
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class ChatMessage(ServerMessage):
+    __slots__ = ('recipient', 'content')
+    type = 'message'
+    FIELDS = ('msg_id', 'sender', 'recipient', 'content', 'timestamp')
+
+    def __init__(self, msg_id, sender, recipient, content, timestamp=None):
+        super().__init__(msg_id, sender, timestamp)
+        self.recipient = recipient
+        self.content = content
+
+    def to_dict(self):
+        return self.add_optional({'type': 'message', 'msg_id': self.msg_id, 'sender': self.sender,
+                                  'recipient': self.recipient, 'content': self.content,
+                                  'timestamp': self.timestamp})
+
+
+class GroupMessage(ServerMessage):
+    __slots__ = ('group_name', 'content')
+    type = 'group_message'
+    FIELDS = ('msg_id', 'sender', 'group_name', 'content', 'timestamp')
+
+    def __init__(self, msg_id, sender, group_name, content, timestamp=None):
+        super().__init__(msg_id, sender, timestamp)
+        self.group_name = group_name
+        self.content = content
+
+    def to_dict(self):
+        return self.add_optional({'type': 'group_message', 'msg_id': self.msg_id, 'sender': self.sender,
+                                  'group_name': self.group_name, 'content': self.content,
+                                  'timestamp': self.timestamp})
+
+
+class FileMessage(ServerMessage):
+    __slots__ = ('filename', 'filedata', 'sha256', 'group_name')
+    type = 'file_transfer'
+    FIELDS = ('msg_id', 'sender', 'filename', 'filedata', 'timestamp')
+    OPTIONAL = ('sha256', 'group_name', 'sent_at', 'trace')
+
+    def __init__(self, msg_id, sender, filename, filedata, sha256=None, group_name=None,
+                 timestamp=None):
+        super().__init__(msg_id, sender, timestamp)
+        self.filename = filename
+        self.filedata = filedata
+        self.sha256 = sha256
+        self.group_name = group_name
+
+
+MESSAGE_CLASSES = {cls.type: cls for cls in (ChatMessage, GroupMessage, FileMessage)}
+
+
+def from_dict(message):
+    """Message object of a decoded message (other types stay dicts)"""
+    cls = MESSAGE_CLASSES.get(message.get('type'))
+    if cls is None:
+        return message
+    obj = cls.__new__(cls)
+    for field in cls.FIELDS + cls.OPTIONAL:
+        setattr(obj, field, message.get(field))
+    timestamp = parse_time(obj.timestamp)
+    obj.timestamp = time.time() if timestamp is None else timestamp
+    return obj
+
+
+def decode_message(frame):
+    """Message object of an encoded frame (snapshot history, see snapshot.py)"""
+    return from_dict(json.loads(frame))
@@ -0,0 +1,156 @@
+"""
+Worker Pool Chat Server
+Computer Networks Semester Project
+
+An engine with a fixed number of threads no matter how many users are
+connected: the event loop of EventChatServer does all socket I/O and
+hands decoded messages to a bounded pool of worker threads that run
+process_message (routing, history, group fan-out).
+
+    clients <-> I/O thread (selector) --messages--> ThreadPoolExecutor
+                      ^                                    |
+                      +---------- frames to send ----------+
+
+Messages of one connection are processed in order: a connection has an
+inbox and at most one task in the pool at a time, which handles a batch
+of its messages and hands the connection back to the I/O thread. When an
+inbox holds max_inbox messages the I/O thread stops reading that socket
+until the workers catch up, so a fast sender fills its own TCP window
+instead of server memory.
+
+OSI Model Mapping:
+- Application Layer: Message processing on a bounded worker pool
+- Transport Layer: Non-blocking TCP sockets served by one I/O thread
+"""
+
+import collections
+import concurrent.futures
+
+from event_server import Connection, EventChatServer, MAX_OUTPUT_BUFFER
+from protocol import FrameTooLarge
+from server import DEFAULT_BACKLOG, log
+from tracing import now as trace_now
+
+DEFAULT_WORKERS = 4
+
+# Messages waiting per connection before reading from it pauses
+MAX_INBOX = 64
+
+# Messages a worker processes for one connection before yielding to others
+BATCH_SIZE = 16
+
+
+class PooledConnection(Connection):
+    """Connection with an inbox of messages waiting for a worker"""
+
+    __slots__ = ('inbox', 'busy')
+
+    def __init__(self, sock, address):
+        super().__init__(sock, address)
+        self.inbox = collections.deque()  # (message, received_at)
+        self.busy = False  # A worker task for this connection is queued or running
+
+
+class PooledChatServer(EventChatServer):
+    """
+    EventChatServer that processes messages on a bounded worker pool
+
+    Only the I/O thread changes a connection's busy flag, selector
+    registration and buffers; workers talk back to it through call_soon.
+    """
+
+    connection_class = PooledConnection
+
+    def __init__(self, host='0.0.0.0', port=5555, tracer=None, reuse_port=False,
+                 backlog=DEFAULT_BACKLOG, max_connections=0, ssl_context=None,
+                 max_output_buffer=MAX_OUTPUT_BUFFER, workers=DEFAULT_WORKERS, max_inbox=MAX_INBOX):
+        super().__init__(host=host, port=port, tracer=tracer, reuse_port=reuse_port,
+                         backlog=backlog, max_connections=max_connections, ssl_context=ssl_context,
+                         max_output_buffer=max_output_buffer)
+        self.workers = workers
+        self.max_inbox = max_inbox
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='chat-worker')
+
+    def start(self):
+        log.info("Processing messages on %d worker threads", self.workers)
+        try:
+            super().start()
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def read_client(self, conn):
+        """Read what is available and queue complete frames for the workers"""
+        data = self.receive(conn)
+        if data is None:
+            return
+        if not data:
+            self.close_connection(conn)
+            return
+        if self.heartbeat:
+            self.heartbeat.touch(conn.sock)
+
+        received_at = trace_now() if self.tracer.enabled else 0
+        try:
+            messages = conn.reader.feed(data)
+        except FrameTooLarge as e:
+            log.error("Error handling client %s: %s", conn.address, e)
+            self.close_connection(conn)
+            return
+        for message in messages:
+            conn.inbox.append((message, received_at))
+        if not conn.inbox:
+            return
+        if not conn.busy:
+            conn.busy = True
+            self.executor.submit(self.process_inbox, conn)
+        if len(conn.inbox) >= self.max_inbox:
+            conn.reading = False
+            self.update_events(conn)
+
+    def process_inbox(self, conn):
+        """Worker task: process a batch of one connection's messages"""
+        tracer = self.tracer
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.enable_thread()
+        failed = False
+        try:
+            for _ in range(BATCH_SIZE):
+                if not conn.inbox or conn.failed:
+                    break
+                message, received_at = conn.inbox.popleft()
+                trace = tracer.begin(message, received_at) if tracer.enabled else None
+                conn.username = self.process_message(conn.sock, conn.address, conn.username, message)
+                if trace:
+                    tracer.end(trace)
+        except Exception as e:
+            log.error("Error handling client %s: %s", conn.address, e)
+            failed = True
+        finally:
+            if profiler is not None:
+                profiler.disable_thread()
+            self.call_soon(self.inbox_done, conn, failed)
+
+    def inbox_done(self, conn, failed):
+        """Back on the I/O thread after a worker task for conn finished"""
+        conn.busy = False
+        if failed or conn.failed:
+            self.close_connection(conn)
+            return
+        if conn.inbox:
+            conn.busy = True
+            self.executor.submit(self.process_inbox, conn)
+        if not conn.reading and len(conn.inbox) < self.max_inbox:
+            self.resume_reading(conn)
+
+    def close_connection(self, conn):
+        if conn.busy and not conn.closed:
+            # A worker still uses the session; inbox_done finishes the close
+            conn.failed = True
+            conn.inbox.clear()
+            conn.reading = False
+            self.discard_output(conn)
+            self.update_events(conn)
+            return
+        super().close_connection(conn)
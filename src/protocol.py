@@ -0,0 +1,87 @@
+"""
+Wire Protocol
+Computer Networks Semester Project
+
+Message framing shared by the server, the client and the benchmark tools.
+
+TCP is a byte stream: one recv() may return half a message or several
+messages at once. Every message is therefore sent as one line of JSON
+terminated by a newline (JSON text never contains a raw newline), and the
+receiver splits the stream back into messages with a FrameReader.
+
+OSI Model Mapping:
+- Presentation Layer: JSON encoding/decoding
+- Session Layer: Message boundaries on top of the TCP stream
+"""
+
+import json
+
+FRAME_DELIMITER = b'\n'
+
+# Default receive buffer size for socket.recv()
+RECV_SIZE = 65536
+
+# Largest frame a FrameReader accepts (file transfers carry the whole file)
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+
+class FrameTooLarge(ValueError):
+    """A peer sent more than max_frame_size bytes without a frame delimiter"""
+
+
+def to_json(value):
+    """JSON encoder fallback: message objects encode as their dict"""
+    to_dict = getattr(value, 'to_dict', None)
+    if to_dict is None:
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return to_dict()
+
+
+# One encoder for every frame (json.dumps with options builds a new one per call)
+ENCODER = json.JSONEncoder(separators=(',', ':'), default=to_json)
+
+
+def encode_message(message):
+    """Encode a message dictionary (or message object, see messages.py) into a single frame"""
+    return ENCODER.encode(message).encode('utf-8') + FRAME_DELIMITER
+
+
+class FrameReader:
+    """
+    Reassemble frames from a TCP byte stream
+
+    Feed it whatever recv() returned and it gives back the complete
+    messages received so far, keeping any partial frame for the next call.
+    Frames that are not valid JSON objects are skipped. A partial frame
+    growing beyond max_frame_size raises FrameTooLarge instead of being
+    buffered without bound.
+    """
+
+    def __init__(self, max_frame_size=MAX_FRAME_SIZE):
+        self.buffer = bytearray()
+        self.max_frame_size = max_frame_size
+
+    def feed(self, data):
+        """Add received bytes and return the list of complete messages"""
+        self.buffer += data
+        if FRAME_DELIMITER not in data:
+            if len(self.buffer) > self.max_frame_size:
+                raise FrameTooLarge(f"frame exceeds {self.max_frame_size} bytes")
+            return []
+
+        end = self.buffer.rindex(FRAME_DELIMITER)
+        frames = bytes(self.buffer[:end]).split(FRAME_DELIMITER)
+        del self.buffer[:end + 1]
+        if len(self.buffer) > self.max_frame_size:
+            raise FrameTooLarge(f"frame exceeds {self.max_frame_size} bytes")
+        messages = []
+        for frame in frames:
+            if not frame.strip():
+                continue
+            try:
+                message = json.loads(frame)
+            except (ValueError, RecursionError):
+                continue  # Not JSON, not UTF-8, or nested too deeply to decode
+            if isinstance(message, dict):
+                messages.append(message)
+        return messages
@@ -0,0 +1,275 @@
+"""
+Cluster Routing
+Computer Networks Semester Project
+
+Lets several ChatServer nodes behave like a single server. A node is a
+worker process sharing a port with other workers (SO_REUSEPORT) or a
+server on another machine; the nodes talk to each other over a pluggable
+message bus (see bus.py).
+
+Every node only holds the sockets of its own users. To reach anybody else
+each node keeps a replica of the presence directory (which node every
+user is on) and of the group definitions, kept up to date by these bus
+payloads:
+
+    hello     - a node joined; the others reply with a sync
+    sync      - the sender's users and groups
+    presence  - a user logged in / out on the sender
+    group     - a group was created
+    deliver   - deliver a message to some users on the receiving node
+    broadcast - deliver a message to every user on the receiving node
+
+Group messages are fanned out once per node, not once per member: the
+sender sends one 'deliver' to each node with the list of members there.
+
+Every node numbers its messages on its own, so a msg_id is only unique
+together with the history_id of the node that assigned it (see sync.py).
+'deliver' and 'broadcast' carry the sender's history_id, and the
+receiving node adds it to messages with a msg_id before passing them on.
+
+Only live traffic is routed. The chat history stays with the node that
+stored each message, so sync and search answer from the history of the
+node a client is connected to.
+
+In the threaded engine a send blocks until the client has room for the
+data, so deliveries from the bus go through a LocalDelivery queue per
+recipient instead, sent by a thread of that recipient for as long as it
+is logged in: a slow client only holds up its own messages, not
+everything else arriving from other nodes.
+
+OSI Model Mapping:
+- Application Layer: Message routing across server nodes
+- Session Layer: User sessions spread over several servers
+"""
+
+import collections
+import threading
+
+from messages import ServerMessage
+from server_logging import get_logger
+
+log = get_logger()
+
+# Bus messages waiting for one local user before their connection is dropped
+DELIVERY_QUEUE_LIMIT = 1000
+
+
+class PresenceDirectory:
+    """Replica of the user -> node directory for users on other nodes"""
+
+    def __init__(self):
+        self.users = {}  # {username: node_id}
+        self.lock = threading.Lock()
+
+    def set(self, username, node_id):
+        with self.lock:
+            self.users[username] = node_id
+
+    def remove(self, username, node_id):
+        """Remove a user, unless they have meanwhile logged in on another node"""
+        with self.lock:
+            if self.users.get(username) == node_id:
+                del self.users[username]
+
+    def drop_node(self, node_id):
+        """Forget every user of a node that left the bus"""
+        with self.lock:
+            gone = [user for user, node in self.users.items() if node == node_id]
+            for user in gone:
+                del self.users[user]
+        return gone
+
+    def node_of(self, username):
+        return self.users.get(username)
+
+    def online_users(self):
+        with self.lock:
+            return list(self.users)
+
+
+class LocalDelivery:
+    """
+    Sends bus messages to local users without blocking the bus thread
+
+    Every local user that gets bus messages has one thread sending them
+    in order; it waits for more instead of ending, so a stream of
+    broadcasts does not start a thread per message, and ends when the
+    user logs out (stop). A user whose queue reaches DELIVERY_QUEUE_LIMIT
+    does not keep up and is disconnected.
+    """
+
+    def __init__(self, server, limit=DELIVERY_QUEUE_LIMIT):
+        self.server = server
+        self.limit = limit
+        self.pending = {}  # {username: deque of messages still to send}
+        self.ready = {}  # {username: Condition its delivery thread waits on}
+        self.lock = threading.Lock()
+
+    def put(self, username, message):
+        with self.lock:
+            waiting = self.pending.get(username)
+            if waiting is None:
+                # Checked under the lock: disconnect_client removes the session before stop()
+                if self.server.sessions.socket_of(username) is None:
+                    return
+                waiting = self.pending[username] = collections.deque()
+                ready = self.ready[username] = threading.Condition(self.lock)
+                threading.Thread(target=self.drain, args=(username, waiting, ready),
+                                 name=f"deliver-{username}", daemon=True).start()
+            elif len(waiting) >= self.limit:
+                waiting.clear()
+                client_socket = self.server.sessions.socket_of(username)
+                if client_socket is not None:
+                    log.warning("Disconnecting %s: %d bus messages waiting", username, self.limit)
+                    self.server.reap_connection(client_socket)
+                return
+            waiting.append(message)
+            self.ready[username].notify()
+
+    def stop(self, username):
+        """End the delivery thread of a user who logged out"""
+        with self.lock:
+            waiting = self.pending.pop(username, None)
+            if waiting is not None:
+                waiting.clear()
+                self.ready.pop(username).notify()
+
+    def drain(self, username, waiting, ready):
+        while True:
+            with self.lock:
+                while not waiting and self.pending.get(username) is waiting:
+                    ready.wait()
+                if self.pending.get(username) is not waiting:
+                    return
+                message = waiting.popleft()
+            try:
+                self.server.send_to_local_user(username, message)
+            except Exception as e:
+                log.error("Delivery to %s failed: %s", username, e)
+
+
+class ClusterRouter:
+    """
+    Routes messages for a ChatServer to users on other nodes
+
+    Attached to a ChatServer as ``server.router``. The server calls it for
+    anything concerning users it does not hold itself, and the bus calls
+    back into it with payloads from other nodes.
+    """
+
+    def __init__(self, bus, node_id):
+        self.bus = bus
+        self.node_id = node_id
+        self.server = None
+        self.directory = PresenceDirectory()
+        self.delivery = None  # LocalDelivery in the threaded engine
+
+    def attach(self, server):
+        """Join the bus on behalf of a ChatServer"""
+        self.server = server
+        server.router = self
+        if server.thread_per_client:
+            self.delivery = LocalDelivery(server)
+        self.bus.connect(self.node_id, self)
+        self.bus.publish({'kind': 'hello'})
+
+    def close(self):
+        self.bus.close()
+
+    # Called by the bus
+
+    def on_bus_message(self, source, payload):
+        kind = payload.get('kind')
+        if kind == 'deliver':
+            message = self.with_history(payload)
+            for username in payload['users']:
+                self.deliver_local(username, message)
+        elif kind == 'broadcast':
+            message = self.with_history(payload)
+            if self.delivery is None:
+                self.server.broadcast_local(message)
+            else:
+                for username in self.server.sessions.usernames():
+                    self.delivery.put(username, message)
+        elif kind == 'presence':
+            if payload['online']:
+                self.directory.set(payload['user'], source)
+            else:
+                self.directory.remove(payload['user'], source)
+        elif kind == 'group':
+            self.server.add_group(payload['group_name'], payload['members'])
+        elif kind == 'hello':
+            users = self.server.sessions.usernames()
+            groups = self.server.groups.snapshot()
+            self.bus.publish({'kind': 'sync', 'users': users, 'groups': groups}, to=source)
+        elif kind == 'sync':
+            for username in payload['users']:
+                self.directory.set(username, source)
+            for group_name, members in payload['groups'].items():
+                if group_name not in self.server.groups:
+                    self.server.add_group(group_name, members)
+
+    def with_history(self, payload):
+        """The message of a payload, with the history_id of its msg_id if that is not ours"""
+        message = payload['message']
+        history_id = payload.get('history_id')
+        if history_id is None or history_id == self.server.history_id or message.get('msg_id') is None:
+            return message
+        # Never changed in place: with a LocalBus it is the sending node's object
+        message = message.to_dict() if isinstance(message, ServerMessage) else dict(message)
+        message['history_id'] = history_id
+        return message
+
+    def deliver_local(self, username, message):
+        """Send a message from the bus to a user of this node"""
+        if self.delivery is None:
+            self.server.send_to_local_user(username, message)  # Event engines only queue it
+        else:
+            self.delivery.put(username, message)
+
+    def on_node_left(self, node_id):
+        gone = self.directory.drop_node(node_id)
+        log.info("Node %s left the cluster, %d users dropped", node_id, len(gone))
+
+    # Called by the ChatServer
+
+    def online_users(self):
+        """Users connected to other nodes"""
+        return self.directory.online_users()
+
+    def user_online(self, username):
+        self.bus.publish({'kind': 'presence', 'user': username, 'online': True})
+
+    def user_offline(self, username):
+        if self.delivery is not None:
+            self.delivery.stop(username)
+        self.bus.publish({'kind': 'presence', 'user': username, 'online': False})
+
+    def deliver(self, username, message):
+        """Route a message to a user on another node, False if unknown"""
+        return not self.deliver_many([username], message)
+
+    def deliver_many(self, usernames, message):
+        """
+        Route a message to users on other nodes, one bus payload per node
+
+        Returns the usernames that are not known anywhere.
+        """
+        by_node = {}
+        unknown = []
+        for username in usernames:
+            node_id = self.directory.node_of(username)
+            if node_id is None:
+                unknown.append(username)
+            else:
+                by_node.setdefault(node_id, []).append(username)
+        for node_id, users in by_node.items():
+            self.bus.publish({'kind': 'deliver', 'users': users, 'message': message,
+                              'history_id': self.server.history_id}, to=node_id)
+        return unknown
+
+    def broadcast(self, message):
+        self.bus.publish({'kind': 'broadcast', 'message': message, 'history_id': self.server.history_id})
+
+    def group_created(self, group_name, members):
+        self.bus.publish({'kind': 'group', 'group_name': group_name, 'members': members})
@@ -0,0 +1,259 @@
+"""
+Message Search
+Computer Networks Semester Project
+
+An inverted index over the content of the chat history, answering
+'search' requests without scanning the history:
+
+    client -> {"type": "search", "query": "release notes",
+               "conversation": "group:team", "from": 1700000000,
+               "to": 1700086400, "before": 5120, "limit": 20}
+    server -> {"type": "search_results", "query": "release notes",
+               "results": [...], "next_before": 4980}
+
+Every word of a message (lowercased) has a posting list: the sorted
+msg_ids of the messages that contain it. So does every conversation,
+which makes the 'conversation' filter one more list to intersect. A
+query intersects the posting lists of its words, walking the shortest
+one from the newest end and checking the others by binary search, so the
+work depends on how often the rarest query word occurs, not on the size
+of the history.
+
+Per indexed message the index also keeps, in parallel arrays ordered by
+msg_id, the time it arrived and its conversation. A time range becomes a
+msg_id range by binary search; the conversation decides whether the
+searching user may see the message. Results come newest first, a page
+at a time; 'next_before' continues with older results.
+
+The index covers the messages in the history and is updated as messages
+arrive. After a restart the restored history is indexed in the
+background (responses carry "indexing": true until that is done).
+
+Each server process indexes only its own history, i.e. the messages
+sent by its users. With several workers (--workers) or cluster nodes,
+a search is not forwarded to the others: it finds the messages that
+were sent through the node the client is connected to, and 'before' /
+'next_before' are msg_ids of that node's history (see sync.py).
+
+OSI Model Mapping:
+- Application Layer: Searching the chat history
+"""
+
+import array
+import bisect
+import re
+import threading
+import time
+
+from messages import parse_time
+from server_logging import get_logger
+
+log = get_logger()
+
+# Results per search_results page (and the most a client may ask for)
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+WORD = re.compile(r'\w+')
+
+# Prefix of the posting lists of conversations (no word starts with it)
+CONVERSATION = '\0'
+
+
+def tokenize(text):
+    """The distinct lowercase words of a text"""
+    if not isinstance(text, str):
+        return set()
+    return set(WORD.findall(text.lower()))
+
+
+def conversation_key(message):
+    """Conversation of a message independent of who looks at it"""
+    if message.get('type') == 'group_message':
+        return f"group:{message.get('group_name')}"
+    recipient = message.get('recipient')
+    if recipient == 'all':
+        return 'all'
+    return 'pair:' + '\0'.join(sorted((str(message.get('sender')), str(recipient))))
+
+
+def message_time(message):
+    """Epoch seconds of a message's timestamp (now if it has none)"""
+    timestamp = parse_time(message.get('timestamp'))
+    return time.time() if timestamp is None else timestamp
+
+
+class SearchIndex:
+    """Inverted index of chat messages by word"""
+
+    def __init__(self):
+        self.postings = {}  # {word: array of msg_ids, ascending}
+        self.ids = array.array('Q')  # Every indexed msg_id, ascending
+        self.times = array.array('d')  # Arrival time of ids[i]
+        self.conversations = array.array('I')  # Conversation number of ids[i]
+        self.conversation_names = []  # Conversation number -> key
+        self.conversation_numbers = {}  # Key -> conversation number
+        self.lock = threading.Lock()
+        self.indexing = False  # Restored history still being indexed
+
+    def __len__(self):
+        return len(self.ids)
+
+    def conversation_number(self, key):
+        number = self.conversation_numbers.get(key)
+        if number is None:
+            number = self.conversation_numbers[key] = len(self.conversation_names)
+            self.conversation_names.append(key)
+        return number
+
+    def add(self, message, arrived=None):
+        """Index one message (arrived defaults to its timestamp)"""
+        msg_id = message['msg_id']
+        key = conversation_key(message)
+        words = tokenize(message.get('content'))
+        words.add(CONVERSATION + key)
+        arrived = message_time(message) if arrived is None else arrived
+        with self.lock:
+            conversation = self.conversation_number(key)
+            if not self.ids or self.ids[-1] < msg_id:
+                self.ids.append(msg_id)
+                self.times.append(arrived)
+                self.conversations.append(conversation)
+            else:
+                # Handler threads can store messages slightly out of msg_id order
+                position = bisect.bisect_left(self.ids, msg_id)
+                self.ids.insert(position, msg_id)
+                self.times.insert(position, arrived)
+                self.conversations.insert(position, conversation)
+            for word in words:
+                posting = self.postings.get(word)
+                if posting is None:
+                    self.postings[word] = array.array('Q', (msg_id,))
+                elif posting[-1] < msg_id:
+                    posting.append(msg_id)
+                else:
+                    bisect.insort(posting, msg_id)
+
+    def add_history(self, messages):
+        """
+        Index older messages (a restored history), oldest first
+
+        They are indexed separately and put in front of what the index
+        already holds, so messages arriving meanwhile are not slowed down.
+        """
+        older = SearchIndex()
+        for message in messages:
+            older.add(message)
+        with self.lock:
+            if self.ids and older.ids and older.ids[-1] >= self.ids[0]:
+                raise ValueError("restored history overlaps indexed messages")
+            for key in self.conversation_names:
+                older.conversation_number(key)
+            renumber = array.array('I', (older.conversation_numbers[key]
+                                         for key in self.conversation_names))
+            self.conversations = older.conversations + array.array(
+                'I', (renumber[number] for number in self.conversations))
+            self.conversation_names = older.conversation_names
+            self.conversation_numbers = older.conversation_numbers
+            self.ids = older.ids + self.ids
+            self.times = older.times + self.times
+            for word, posting in self.postings.items():
+                older_posting = older.postings.get(word)
+                if older_posting is not None:
+                    older.postings[word] = older_posting + posting
+                else:
+                    older.postings[word] = posting
+            self.postings = older.postings
+
+    def index_in_background(self, messages):
+        """Run add_history in a thread"""
+        def run():
+            started = time.perf_counter()
+            try:
+                self.add_history(messages)
+            finally:
+                self.indexing = False
+            log.info("Indexed restored history for search in %.1f s", time.perf_counter() - started)
+        self.indexing = True
+        threading.Thread(target=run, name='search-index', daemon=True).start()
+
+    def prune(self, oldest_id):
+        """Forget messages with a msg_id below oldest_id (dropped from the history)"""
+        with self.lock:
+            cut = bisect.bisect_left(self.ids, oldest_id)
+            if not cut:
+                return
+            del self.ids[:cut]
+            del self.times[:cut]
+            del self.conversations[:cut]
+            for word in list(self.postings):
+                posting = self.postings[word]
+                cut = bisect.bisect_left(posting, oldest_id)
+                if cut == len(posting):
+                    del self.postings[word]
+                elif cut:
+                    del posting[:cut]
+
+    def search(self, query, visible, conversation=None, start=None, end=None, before=None,
+               limit=DEFAULT_LIMIT):
+        """
+        msg_ids of messages containing every word of query, newest first
+
+        visible(conversation key) says whether the searching user may see
+        a conversation; conversation restricts results to one key, start
+        and end to an arrival time range (epoch seconds), before to msg_ids
+        below it. Returns (msg_ids, more).
+        """
+        words = tokenize(query)
+        if not words:
+            return [], False
+        if conversation is not None:
+            words.add(CONVERSATION + conversation)
+        with self.lock:
+            postings = [self.postings.get(word) for word in words]
+            if not all(postings):
+                return [], False
+            postings.sort(key=len)
+            shortest, others = postings[0], postings[1:]
+
+            # msg_id range from the time range and the paging cursor
+            low = 0
+            if start is not None:
+                position = bisect.bisect_left(self.times, start)
+                if position == len(self.ids):
+                    return [], False
+                low = self.ids[position]
+            high = None
+            if end is not None:
+                position = bisect.bisect_right(self.times, end)
+                if position == 0:
+                    return [], False
+                high = self.ids[position - 1]
+            if before is not None:
+                high = before - 1 if high is None else min(high, before - 1)
+
+            allowed = {}  # Conversation number -> visible (cached per query)
+            results = []
+            position = len(shortest) if high is None else bisect.bisect_right(shortest, high)
+            while position > 0:
+                position -= 1
+                msg_id = shortest[position]
+                if msg_id < low:
+                    break
+                if not all(contains(posting, msg_id) for posting in others):
+                    continue
+                number = self.conversations[bisect.bisect_left(self.ids, msg_id)]
+                if number not in allowed:
+                    allowed[number] = visible(self.conversation_names[number])
+                if not allowed[number]:
+                    continue
+                if len(results) == limit:
+                    return results, True
+                results.append(msg_id)
+            return results, False
+
+
+def contains(posting, msg_id):
+    """Binary search of a sorted posting list"""
+    position = bisect.bisect_left(posting, msg_id)
+    return position < len(posting) and posting[position] == msg_id
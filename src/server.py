@@ -12,39 +12,183 @@ This server implements a multi-client chat system demonstrating OSI Model layers
 - Physical Layer: Hardware communication (managed by OS)
 """
 
+import argparse
+import selectors
 import socket
+import ssl
 import threading
-import json
-import datetime
 import os
 import base64
+import itertools
+import math
+import multiprocessing
+import secrets
+import signal
+import sys
+import tempfile
+import time
+
+from protocol import FrameReader, MAX_FRAME_SIZE, RECV_SIZE, encode_message
+from server_logging import get_logger, get_message_logger, setup_logging
+from tracing import Tracer, now as trace_now
+from admin import AdminServer
+from admission import AdmissionController, parse_limits
+from filestore import FileStore
+from heartbeat import HeartbeatMonitor, PING
+from lanes import BULK, CONTROL, SendLock, file_frames, lane_of, limit_unsent
+from messages import ChatMessage, FileMessage, GroupMessage
+from tls import HANDSHAKE_TIMEOUT, server_context
+from bus import BrokerBus, BusBroker
+from routing import ClusterRouter
+from search import DEFAULT_LIMIT as SEARCH_LIMIT, MAX_LIMIT as SEARCH_MAX_LIMIT, SearchIndex
+from sessions import GroupTable, HISTORY_SIZE, MessageHistory, SessionRegistry
+from snapshot import DEFAULT_INTERVAL as SNAPSHOT_INTERVAL, StateSnapshots
+from sync import SYNC_LIMIT, conversation_of
+
+log = get_logger()
+msg_log = get_message_logger()
+
+# Pending connections the kernel queues while the server is busy accepting
+DEFAULT_BACKLOG = 128
+
+# Message types handled before the client has logged in
+OPEN_TYPES = ('login', 'ping', 'pong')
+
+# Types of the fields the handlers read; a field that is present (not
+# null) with another type gets the message refused with an 'error' reply
+FILE_FIELDS = {'filename': str, 'sha256': str, 'recipient': str, 'recipients': list, 'group_name': str}
+FIELD_TYPES = {
+    'login': {'username': str},
+    'message': {'recipient': str, 'content': str},
+    'group_create': {'group_name': str, 'members': list},
+    'group_message': {'group_name': str, 'content': str},
+    'file_offer': FILE_FIELDS,
+    'file_transfer': dict(FILE_FIELDS, filedata=str),
+    'search': {'query': str},
+}
+
+# Fields a message type is refused without (or with an empty value)
+REQUIRED_FIELDS = {
+    'login': ('username',),
+    'message': ('recipient',),
+    'group_create': ('group_name',),
+    'group_message': ('group_name',),
+}
+
+
+def invalid_field(msg_type, message):
+    """The first missing or mistyped field of a message, None if it is well-formed"""
+    for field in REQUIRED_FIELDS.get(msg_type, ()):
+        if not message.get(field):
+            return field
+    for field, kind in FIELD_TYPES.get(msg_type, {}).items():
+        value = message.get(field)
+        if value is not None and not isinstance(value, kind):
+            return field
+    members = message.get('members') if msg_type == 'group_create' else None
+    if members and not all(isinstance(member, str) for member in members):
+        return 'members'
+    return None
+
 
 class ChatServer:
-    def __init__(self, host='0.0.0.0', port=5555):
+    # Every client gets its own handler thread (see event_server.py for an
+    # engine serving all clients from one thread)
+    thread_per_client = True
+    
+    def __init__(self, host='0.0.0.0', port=5555, tracer=None, reuse_port=False,
+                 backlog=DEFAULT_BACKLOG, max_connections=0, ssl_context=None):
         """
         Initialize the chat server
         
+        With reuse_port=True several worker processes can bind the same
+        port (SO_REUSEPORT) and the kernel spreads connections across them.
+        backlog is the accept queue length passed to listen(); a short queue
+        drops connection attempts during bursts, which clients only notice
+        as a SYN retransmit about a second later. Connections beyond
+        max_connections (0 = unlimited) are refused with an error reply.
+        With an ssl_context (see tls.py) clients must connect with TLS.
+        
         OSI Model Mapping:
         - Transport Layer: TCP socket creation
         - Network Layer: IP address binding
         """
         self.host = host
         self.port = port
+        self.backlog = backlog
+        self.max_connections = max_connections
+        self.ssl_context = ssl_context
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         
-        # Client management
-        self.clients = {}  # {socket: username}
-        self.client_addresses = {}  # {socket: address}
-        self.groups = {}  # {group_name: [usernames]}
+        # Client management: each part has its own synchronization and the
+        # roster and groups are copy-on-write, so fan-out reads take no lock
+        self.sessions = SessionRegistry()
+        self.groups = GroupTable()
+        self.send_locks = {}  # {socket: SendLock} keeps concurrent frames from interleaving
+        self.connection_count = 0  # Open client connections, logged in or not
+        self.read_paused_until = {}  # {socket: time.monotonic() deadline} set by throttle()
+        self.sending_bytes = 0  # Bytes inside sendall() calls (tracked with admission control)
+        self.output_lock = threading.Lock()
         
-        # Lock for thread safety
+        # Lock for the connection counter (never held while sending)
         self.lock = threading.Lock()
         
-        # Chat history
-        self.chat_history = []
+        # Chat history and its word index (see search.py), None disables search
+        self.chat_history = MessageHistory()
+        self.search_index = SearchIndex()
+        
+        # Largest frame a client may send; beyond it the connection is dropped
+        self.max_frame_size = MAX_FRAME_SIZE
+        
+        # Uploaded files by content hash (see filestore.py), None disables deduplication
+        self.file_store = FileStore()
         
-        print(f"[SERVER] Initializing on {host}:{port}")
+        # Server-assigned message IDs (itertools.count is thread-safe in CPython)
+        self.message_ids = itertools.count(1)
+        # Names the sequence of these msg_ids: a restart without a state file
+        # and every other worker or node count from 1 again (see sync.py)
+        self.history_id = secrets.token_hex(8)
+        
+        # Optional per-message latency tracing (disabled by default)
+        self.tracer = tracer or Tracer(sample_rate=0.0)
+        
+        # Profiling session set through the admin socket (None when idle)
+        self.profiler = None
+        
+        # Routes to users on other worker processes / cluster nodes (see routing.py)
+        self.router = None
+        
+        # Rate limits and load shedding (see admission.py), None when disabled
+        self.admission = None
+        
+        # Ping/pong and reaping of dead connections (see heartbeat.py), None when disabled
+        self.heartbeat = None
+        
+        # Periodic state snapshots (see snapshot.py), None when disabled
+        self.snapshots = None
+        
+        # Handler of each message type, called by process_message
+        self.handlers = {
+            'login': self.handle_login,
+            'message': self.handle_message,
+            'group_create': self.handle_group_create,
+            'group_message': self.handle_group_message,
+            'file_offer': self.handle_file_offer,
+            'file_transfer': self.handle_file_transfer,
+            'ping': self.handle_ping,
+            'pong': self.handle_pong,
+            'sync': self.handle_sync,
+            'search': self.handle_search,
+            'get_users': self.handle_get_users,
+        }
+        
+        # Set once the listening socket is bound (useful for tests/benchmarks)
+        self.ready = threading.Event()
+        
+        log.info("Initializing on %s:%s", host, port)
         
     def start(self):
         """
@@ -56,27 +200,86 @@ class ChatServer:
         """
         try:
             self.server_socket.bind((self.host, self.port))
-            self.server_socket.listen(5)
-            print(f"[SERVER] Server started on {self.host}:{self.port}")
-            print(f"[SERVER] Waiting for connections...")
+            self.server_socket.listen(self.backlog)
+            self.port = self.server_socket.getsockname()[1]
+            self.ready.set()
+            log.info("Server started on %s:%s", self.host, self.port)
+            log.info("Waiting for connections...")
+            if self.heartbeat:
+                self.heartbeat.start_thread()
             
             while True:
                 client_socket, address = self.server_socket.accept()
-                print(f"[SERVER] New connection from {address}")
+                if not self.admit_connection(client_socket, address):
+                    continue
+                log.info("New connection from %s", address)
                 
-                # Create a new thread for each client
+                # Create a new thread for each client (which also does the
+                # TLS handshake, so slow handshakes never hold up accept())
                 client_thread = threading.Thread(
                     target=self.handle_client,
-                    args=(client_socket, address)
+                    args=(client_socket, address),
+                    name=f"client-{address[0]}:{address[1]}"
                 )
                 client_thread.daemon = True
                 client_thread.start()
                 
         except Exception as e:
-            print(f"[SERVER ERROR] {e}")
+            log.error("%s", e)
         finally:
+            if self.heartbeat:
+                self.heartbeat.stop()
             self.server_socket.close()
             
+    def admit_connection(self, client_socket, address):
+        """
+        Count a new connection, or refuse it when the server is full
+
+        OSI Model Mapping:
+        - Session Layer: Admission of new sessions
+        """
+        with self.lock:
+            full = self.max_connections and self.connection_count >= self.max_connections
+            if not full:
+                self.connection_count += 1
+        if not full:
+            return True
+
+        log.warning("Refusing connection from %s: %d connections open", address, self.max_connections)
+        try:
+            client_socket.settimeout(1.0)
+            client_socket.sendall(encode_message({
+                'type': 'login_response',
+                'status': 'error',
+                'message': 'Server is full, please try again later'
+            }))
+        except OSError:
+            pass
+        client_socket.close()
+        return False
+
+    def start_tls(self, client_socket, address):
+        """
+        Perform the server side of the TLS handshake
+        
+        Returns the TLS socket, or None if the handshake failed.
+        
+        OSI Model Mapping:
+        - Presentation Layer: Negotiating encryption
+        - Session Layer: New or resumed TLS session
+        """
+        try:
+            client_socket.settimeout(HANDSHAKE_TIMEOUT)
+            tls_socket = self.ssl_context.wrap_socket(client_socket, server_side=True)
+            tls_socket.settimeout(None)
+        except OSError as e:
+            log.warning("TLS handshake with %s failed: %s", address, e)
+            self.disconnect_client(client_socket, None)
+            return None
+        log.debug("TLS %s with %s%s", tls_socket.version(), address,
+                  " (resumed)" if tls_socket.session_reused else "")
+        return tls_socket
+    
     def handle_client(self, client_socket, address):
         """
         Handle individual client connections
@@ -86,168 +289,506 @@ class ChatServer:
         - Presentation Layer: JSON encoding/decoding
         - Session Layer: Managing client session lifecycle
         """
+        limit_unsent(client_socket)
+        if self.ssl_context is not None:
+            client_socket = self.start_tls(client_socket, address)
+            if client_socket is None:
+                return
+        
         username = None
+        reader = FrameReader(self.max_frame_size)
+        tracer = self.tracer
+        heartbeat = self.heartbeat
+        if heartbeat:
+            heartbeat.track(client_socket)
+        self.send_locks[client_socket] = SendLock()
         
         try:
             while True:
                 # Receive data from client
-                data = client_socket.recv(4096)
+                data = client_socket.recv(RECV_SIZE)
                 
                 if not data:
                     break
+                if heartbeat:
+                    heartbeat.touch(client_socket)
                 
-                # Presentation Layer: Decode received data
-                try:
-                    message = json.loads(data.decode('utf-8'))
-                except json.JSONDecodeError:
-                    continue
+                received_at = trace_now() if tracer.enabled else 0
+                profiler = self.profiler
+                if profiler is not None:
+                    profiler.enable_thread()
                 
-                # Application Layer: Process different message types
-                msg_type = message.get('type')
+                # Presentation Layer: Split the stream into messages
+                for message in reader.feed(data):
+                    trace = tracer.begin(message, received_at) if tracer.enabled else None
+                    username = self.process_message(client_socket, address, username, message)
+                    if trace:
+                        tracer.end(trace)
                 
-                if msg_type == 'login':
-                    username = message.get('username')
-                    with self.lock:
-                        self.clients[client_socket] = username
-                        self.client_addresses[client_socket] = address
-                    
-                    response = {
-                        'type': 'login_response',
-                        'status': 'success',
-                        'message': f'Welcome {username}!',
-                        'online_users': list(self.clients.values())
-                    }
-                    self.send_message(client_socket, response)
-                    
-                    # Notify all clients about new user
-                    self.broadcast({
-                        'type': 'user_joined',
-                        'username': username,
-                        'online_users': list(self.clients.values())
-                    }, exclude=client_socket)
-                    
-                    print(f"[SERVER] {username} logged in from {address}")
-                    
-                elif msg_type == 'message':
-                    if username:
-                        recipient = message.get('recipient')
-                        content = message.get('content')
-                        timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        
-                        chat_message = {
-                            'type': 'message',
-                            'sender': username,
-                            'recipient': recipient,
-                            'content': content,
-                            'timestamp': timestamp
-                        }
-                        
-                        # Store in history
-                        self.chat_history.append(chat_message)
-                        
-                        # Send to recipient
-                        if recipient == 'all':
-                            self.broadcast(chat_message, exclude=client_socket)
-                        else:
-                            self.send_to_user(recipient, chat_message)
-                        
-                        # Send confirmation to sender
-                        self.send_message(client_socket, {
-                            'type': 'message_sent',
-                            'status': 'success'
-                        })
-                        
-                        print(f"[SERVER] Message from {username} to {recipient}")
-                        
-                elif msg_type == 'group_create':
-                    if username:
-                        group_name = message.get('group_name')
-                        members = message.get('members', [])
-                        
-                        with self.lock:
-                            self.groups[group_name] = members
-                        
-                        response = {
-                            'type': 'group_created',
-                            'group_name': group_name,
-                            'members': members
-                        }
-                        
-                        # Notify all group members
-                        for member in members:
-                            self.send_to_user(member, response)
-                        
-                        print(f"[SERVER] Group '{group_name}' created by {username}")
-                        
-                elif msg_type == 'group_message':
-                    if username:
-                        group_name = message.get('group_name')
-                        content = message.get('content')
-                        timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        
-                        if group_name in self.groups:
-                            group_msg = {
-                                'type': 'group_message',
-                                'sender': username,
-                                'group_name': group_name,
-                                'content': content,
-                                'timestamp': timestamp
-                            }
-                            
-                            # Send to all group members
-                            for member in self.groups[group_name]:
-                                if member != username:
-                                    self.send_to_user(member, group_msg)
-                            
-                            print(f"[SERVER] Group message in '{group_name}' from {username}")
-                            
-                elif msg_type == 'file_transfer':
-                    if username:
-                        recipient = message.get('recipient')
-                        filename = message.get('filename')
-                        filedata = message.get('filedata')
-                        
-                        file_msg = {
-                            'type': 'file_transfer',
-                            'sender': username,
-                            'filename': filename,
-                            'filedata': filedata,
-                            'timestamp': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                        }
-                        
-                        self.send_to_user(recipient, file_msg)
-                        print(f"[SERVER] File '{filename}' transferred from {username} to {recipient}")
-                        
-                elif msg_type == 'get_users':
-                    if username:
-                        response = {
-                            'type': 'users_list',
-                            'users': list(self.clients.values())
-                        }
-                        self.send_message(client_socket, response)
+                if profiler is not None:
+                    profiler.disable_thread()
+                
+                # Backpressure: leave the data in the socket while throttled
+                paused_until = self.read_paused_until.pop(client_socket, None)
+                if paused_until:
+                    time.sleep(max(0.0, paused_until - time.monotonic()))
                         
         except Exception as e:
-            print(f"[SERVER ERROR] Error handling client {address}: {e}")
+            log.error("Error handling client %s: %s", address, e)
         finally:
-            # Client disconnected
-            if username:
-                with self.lock:
-                    if client_socket in self.clients:
-                        del self.clients[client_socket]
-                    if client_socket in self.client_addresses:
-                        del self.client_addresses[client_socket]
-                
-                # Notify all clients
-                self.broadcast({
-                    'type': 'user_left',
-                    'username': username,
-                    'online_users': list(self.clients.values())
-                })
-                
-                print(f"[SERVER] {username} disconnected")
+            self.disconnect_client(client_socket, username)
             
-            client_socket.close()
+    def disconnect_client(self, client_socket, username):
+        """
+        Clean up after a client disconnected
+        
+        OSI Model Mapping:
+        - Session Layer: Session termination
+        """
+        if username:
+            self.sessions.remove(client_socket)
+            
+            if self.router:
+                self.router.user_offline(username)
+            
+            # Notify all clients
+            self.broadcast({
+                'type': 'user_left',
+                'username': username,
+                'online_users': self.online_users()
+            })
             
+            log.info("%s disconnected", username)
+        
+        with self.lock:
+            self.connection_count -= 1
+        
+        if self.heartbeat:
+            self.heartbeat.forget(client_socket)
+        self.read_paused_until.pop(client_socket, None)
+        self.send_locks.pop(client_socket, None)
+        client_socket.close()
+            
+    def process_message(self, client_socket, address, username, message):
+        """
+        Process one decoded message from a client
+        
+        Returns the username of the session (set by a login message).
+        
+        OSI Model Mapping:
+        - Application Layer: Processing chat commands and messages
+        """
+        # Application Layer: Process different message types
+        msg_type = message.get('type')
+        if not isinstance(msg_type, str):
+            return username
+        
+        if username and self.admission is not None:
+            refused = self.admission.check(username, msg_type)
+            if refused:
+                self.throttle(client_socket, message, *refused)
+                return username
+        
+        handler = self.handlers.get(msg_type)
+        if handler is not None and (username or msg_type in OPEN_TYPES):
+            field = invalid_field(msg_type, message)
+            if field is not None:
+                self.refuse_invalid(client_socket, msg_type, field)
+                return username
+            session = handler(client_socket, address, username, message)
+            if session is not None:
+                username = session
+        return username
+    
+    def refuse_invalid(self, client_socket, msg_type, field):
+        """Answer a message with a missing or mistyped field"""
+        text = f"Missing or invalid '{field}'"
+        if msg_type == 'login':
+            self.send_message(client_socket, {'type': 'login_response', 'status': 'error', 'message': text})
+        else:
+            self.send_message(client_socket, {'type': 'error', 'request': msg_type, 'message': text})
+        msg_log.info("Refused %s: %s", msg_type, text, extra={'fields': {'event': 'invalid'}})
+    
+    def handle_login(self, client_socket, address, username, message):
+        """Start a session; returns its username"""
+        username = message.get('username')
+        self.sessions.add(client_socket, username, address)
+        # Show the user in admin thread dumps (before any reply reaches the client)
+        if self.thread_per_client:
+            threading.current_thread().name = f"client-{username}@{address[0]}:{address[1]}"
+        
+        if self.router:
+            self.router.user_online(username)
+        
+        response = {
+            'type': 'login_response',
+            'status': 'success',
+            'message': f'Welcome {username}!',
+            'online_users': self.online_users(),
+            'history_id': self.history_id
+        }
+        self.send_message(client_socket, response)
+        
+        # Notify all clients about new user
+        self.broadcast({
+            'type': 'user_joined',
+            'username': username,
+            'online_users': self.online_users()
+        }, exclude=client_socket)
+        
+        log.info("%s logged in from %s", username, address)
+        return username
+    
+    def handle_message(self, client_socket, address, username, message):
+        """A chat message to one user or to everybody ('all')"""
+        recipient = message.get('recipient')
+        chat_message = ChatMessage(next(self.message_ids), username, recipient, message.get('content'))
+        self.copy_trace_fields(message, chat_message)
+        
+        # Store in history
+        self.store_message(chat_message)
+        
+        # Send to recipient
+        if recipient == 'all':
+            self.broadcast(chat_message, exclude=client_socket)
+        else:
+            self.send_to_user(recipient, chat_message)
+        
+        # Send confirmation to sender
+        self.send_message(client_socket, {
+            'type': 'message_sent',
+            'status': 'success',
+            'msg_id': chat_message.msg_id,
+            'history_id': self.history_id
+        })
+        
+        msg_log.info("Message from %s to %s", username, recipient,
+                     extra={'fields': {'event': 'message'}})
+    
+    def handle_group_create(self, client_socket, address, username, message):
+        group_name = message.get('group_name')
+        members = message.get('members', [])
+        
+        self.add_group(group_name, members)
+        if self.router:
+            self.router.group_created(group_name, members)
+        
+        response = {
+            'type': 'group_created',
+            'group_name': group_name,
+            'members': members
+        }
+        
+        # Notify all group members
+        self.send_to_users(members, response)
+        
+        log.info("Group '%s' created by %s", group_name, username)
+    
+    def handle_group_message(self, client_socket, address, username, message):
+        group_name = message.get('group_name')
+        members = self.groups.get(group_name)
+        if members is None:
+            return
+        group_msg = GroupMessage(next(self.message_ids), username, group_name, message.get('content'))
+        self.copy_trace_fields(message, group_msg)
+        self.store_message(group_msg)
+        
+        # Send to all group members
+        self.send_to_users([member for member in members if member != username], group_msg)
+        
+        msg_log.info("Group message in '%s' from %s", group_name, username,
+                     extra={'fields': {'event': 'group_message'}})
+    
+    def handle_file_offer(self, client_socket, address, username, message):
+        """The sender asks whether the file must be uploaded at all"""
+        if username in self.file_recipients(username, message):
+            self.send_message(client_socket, {'type': 'error', 'request': 'file_offer',
+                                              'message': 'Files cannot be offered to yourself'})
+            return
+        # Only a file this user uploaded before is forwarded: knowing a hash is no proof of having the file
+        digest = message.get('sha256')
+        filedata = self.file_store.get(digest, username) if self.file_store is not None else None
+        response = {
+            'type': 'file_offer_response',
+            'status': 'upload' if filedata is None else 'stored',
+            'sha256': digest,
+            'filename': message.get('filename')
+        }
+        for field in ('recipient', 'recipients', 'group_name'):
+            if field in message:
+                response[field] = message[field]
+        self.send_message(client_socket, response)
+        if filedata is not None:
+            self.forward_file(client_socket, username, message, filedata, digest)
+    
+    def handle_file_transfer(self, client_socket, address, username, message):
+        filedata = message.get('filedata')
+        digest = message.get('sha256')
+        if digest and self.file_store is not None:
+            if not self.file_store.put(digest, filedata, username):
+                digest = None
+        self.forward_file(client_socket, username, message, filedata, digest)
+    
+    def handle_ping(self, client_socket, address, username, message):
+        self.send_message(client_socket, {'type': 'pong'})
+    
+    def handle_pong(self, client_socket, address, username, message):
+        pass  # Answer to a heartbeat ping; receiving it was enough
+    
+    def handle_sync(self, client_socket, address, username, message):
+        self.send_message(client_socket, self.sync_response(username, message))
+    
+    def handle_search(self, client_socket, address, username, message):
+        self.send_message(client_socket, self.search_response(username, message))
+    
+    def handle_get_users(self, client_socket, address, username, message):
+        response = {
+            'type': 'users_list',
+            'users': self.online_users()
+        }
+        self.send_message(client_socket, response)
+            
+    def forward_file(self, client_socket, username, message, filedata, digest=None):
+        """
+        Deliver a file (uploaded or taken from the file store) to its recipients
+        
+        The file is encoded once, in chunks (see lanes.py), and those
+        frames go to every local recipient; recipients on other nodes share one bus payload per
+        node. After each recipient the sender gets a 'file_progress'
+        message: status 'sent' (handed to the recipient's connection),
+        'forwarded' (to another node) or 'offline'.
+        
+        OSI Model Mapping:
+        - Application Layer: File transfer to one or many users
+        - Presentation Layer: Encoding the file message once for all recipients
+        """
+        recipients = self.file_recipients(username, message)
+        filename = message.get('filename')
+        file_msg = FileMessage(next(self.message_ids), username, filename, filedata,
+                               digest or None, message.get('group_name'))
+        self.copy_trace_fields(message, file_msg)
+        
+        progress = {
+            'type': 'file_progress',
+            'transfer_id': file_msg.msg_id,
+            'filename': filename,
+            'total': len(recipients)
+        }
+        done = 0
+        frames = None
+        remote = []
+        for recipient in recipients:
+            recipient_socket = self.sessions.socket_of(recipient)
+            if recipient_socket is None:
+                remote.append(recipient)
+                continue
+            if frames is None:
+                frames = file_frames(file_msg)
+            self.send_frames(recipient_socket, frames)
+            done += 1
+            self.send_message(client_socket, dict(progress, recipient=recipient, status='sent', done=done))
+        
+        unknown = self.router.deliver_many(remote, file_msg) if remote and self.router else remote
+        for recipient in remote:
+            done += 1
+            status = 'offline' if recipient in unknown else 'forwarded'
+            self.send_message(client_socket, dict(progress, recipient=recipient, status=status, done=done))
+        
+        msg_log.info("File '%s' transferred from %s to %d recipient(s)%s", filename, username,
+                     len(recipients), " (deduplicated)" if message.get('type') == 'file_offer' else "",
+                     extra={'fields': {'event': 'file_transfer'}})
+    
+    def sync_response(self, username, message):
+        """
+        The history messages of a user's conversations that are newer
+        than what the client has (see sync.py)
+        
+        Everything up to 'after' was delivered by the previous sync, so the
+        scan starts there; 'since' only skips messages the client got
+        live after it. msg_ids of another history (an earlier run of the
+        server without a state file, or another node) say nothing about
+        this one, so the client then gets all of its messages.
+        
+        OSI Model Mapping:
+        - Application Layer: History synchronization
+        """
+        since = message.get('since')
+        since = {conversation: msg_id for conversation, msg_id in since.items()
+                 if isinstance(msg_id, int)} if isinstance(since, dict) else {}
+        after = message.get('after')
+        after = after if isinstance(after, int) else 0
+        if message.get('history_id', self.history_id) != self.history_id:
+            since, after = {}, 0
+        
+        messages = []
+        last_id = after
+        more = False
+        for stored in self.chat_history.since(after):
+            conversation = conversation_of(stored, username)
+            if conversation is not None and stored['msg_id'] > since.get(conversation, after):
+                if conversation.startswith('group:'):
+                    members = self.groups.get(stored.get('group_name'))
+                    if not members or username not in members:
+                        continue
+                if len(messages) == SYNC_LIMIT:
+                    more = True
+                    break
+                messages.append(stored)
+            last_id = max(last_id, stored['msg_id'])
+        
+        return {
+            'type': 'sync_response',
+            'history_id': self.history_id,
+            'messages': messages,
+            'last_id': last_id,
+            'more': more
+        }
+    
+    def store_message(self, message):
+        """Add a chat message to the history and the search index"""
+        self.chat_history.append(message)
+        index = self.search_index
+        if index is not None:
+            index.add(message)
+            # Drop what fell out of the history once the index is a quarter larger
+            if len(index) > self.chat_history.size + self.chat_history.size // 4:
+                index.prune(self.chat_history.oldest_id())
+    
+    def search_response(self, username, message):
+        """
+        One page of the history messages the user can see that contain
+        every word of the query, newest first (see search.py)
+        
+        Only this process's history is searched: messages that went
+        through other workers or cluster nodes are not found.
+        
+        OSI Model Mapping:
+        - Application Layer: Searching the chat history
+        """
+        query = message.get('query')
+        response = {'type': 'search_results', 'query': query}
+        if self.search_index is None:
+            return dict(response, status='error', message='Search is disabled on this server')
+        
+        def number(field):
+            value = message.get(field)
+            if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+                return value
+            return None
+        
+        def visible(key):
+            kind, _, name = key.partition(':')
+            if kind == 'pair':
+                return username in name.split('\0')
+            if kind == 'group':
+                members = self.groups.get(name)
+                return bool(members) and username in members
+            return True
+        
+        # Conversations are named as in sync.py: all, user:<name>, group:<name>
+        conversation = message.get('conversation')
+        if isinstance(conversation, str) and conversation.startswith('user:'):
+            conversation = 'pair:' + '\0'.join(sorted((username, conversation[5:])))
+        elif not isinstance(conversation, str):
+            conversation = None
+        limit = number('limit')
+        limit = max(1, min(int(limit), SEARCH_MAX_LIMIT)) if limit else SEARCH_LIMIT
+        
+        msg_ids, more = self.search_index.search(
+            query, visible, conversation, number('from'), number('to'), number('before'), limit)
+        results = [found for found in map(self.chat_history.get, msg_ids) if found is not None]
+        return dict(response, status='success', results=results,
+                    next_before=msg_ids[-1] if more else None,
+                    indexing=self.search_index.indexing)
+    
+    def file_recipients(self, username, message):
+        """Users a file goes to: a group's members, a 'recipients' list or one 'recipient'"""
+        group_name = message.get('group_name')
+        if group_name is not None:
+            members = self.groups.get(group_name) or ()
+            return [member for member in members if member != username]
+        recipients = message.get('recipients')
+        if isinstance(recipients, list):
+            return [user for user in dict.fromkeys(recipients) if isinstance(user, str)]
+        return [message.get('recipient')]
+    
+    def throttle(self, client_socket, message, reason, retry_after):
+        """
+        Refuse a request and stop reading from its client for a while
+        
+        OSI Model Mapping:
+        - Application Layer: Explicit 'throttled' reply
+        - Transport Layer: Backpressure through the TCP receive window
+        """
+        reply = {
+            'type': 'throttled',
+            'request': message.get('type'),
+            'reason': reason,
+            'retry_after': round(retry_after, 3)
+        }
+        if 'sent_at' in message:
+            reply['sent_at'] = message['sent_at']
+        self.send_message(client_socket, reply)
+        self.pause_reading(client_socket, retry_after)
+        msg_log.info("Throttled %s (%s)", message.get('type'), reason,
+                     extra={'fields': {'event': 'throttled'}})
+    
+    def pause_reading(self, client_socket, seconds):
+        """Stop reading from a client for a while (applied by its handler thread)"""
+        self.read_paused_until[client_socket] = time.monotonic() + seconds
+    
+    def send_ping(self, client_socket):
+        """
+        Send a heartbeat ping without ever blocking the heartbeat thread
+        
+        A dead peer may have a full send buffer or a handler stuck in
+        sendall() holding the send lock; then the ping is skipped and the
+        missing pong reaps the connection.
+        """
+        lock = self.send_locks.get(client_socket)
+        if lock is None or not lock.acquire(blocking=False):
+            return
+        try:
+            data = encode_message(PING)
+            if isinstance(client_socket, ssl.SSLSocket):
+                # TLS sockets take no send flags: send only if the buffer has room
+                with selectors.DefaultSelector() as selector:
+                    selector.register(client_socket, selectors.EVENT_WRITE)
+                    if selector.select(0):
+                        client_socket.sendall(data)
+            elif client_socket.send(data, getattr(socket, 'MSG_DONTWAIT', 0)) != len(data):
+                self.reap_connection(client_socket)
+        except OSError:
+            pass
+        finally:
+            lock.release()
+    
+    def reap_connection(self, client_socket):
+        """End a dead connection; its handler thread then cleans up as usual"""
+        try:
+            client_socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    
+    def queued_output(self):
+        """Bytes accepted for sending but not yet handed to the kernel"""
+        return self.sending_bytes
+    
+    def copy_trace_fields(self, message, outgoing):
+        """
+        Carry client timing fields over to a forwarded message
+        
+        'sent_at' is the sender's send timestamp and 'trace' its sampling
+        decision; both let receiving clients measure end-to-end latency.
+        The routing stage of a traced message is recorded here as well.
+        """
+        if 'sent_at' in message:
+            outgoing.sent_at = message['sent_at']
+        if message.get('trace'):
+            outgoing.trace = True
+        if self.tracer.enabled:
+            self.tracer.mark('route', msg_id=outgoing.msg_id)
+        
     def send_message(self, client_socket, message):
         """
         Send message to a specific client
@@ -256,19 +797,81 @@ class ChatServer:
         - Presentation Layer: JSON encoding
         - Transport Layer: TCP transmission
         """
+        lane = lane_of(message)
+        if lane == BULK:
+            self.send_frames(client_socket, file_frames(message))
+        else:
+            self.send_data(client_socket, encode_message(message), lane)
+    
+    def send_frames(self, client_socket, frames, lane=BULK):
+        """Send the frames of a file (see lanes.file_frames)"""
+        for frame in frames:
+            self.send_data(client_socket, frame, lane)
+    
+    def send_data(self, client_socket, data, lane=CONTROL):
+        """Send an already encoded frame (fan-outs of large messages encode once)"""
         try:
-            data = json.dumps(message).encode('utf-8')
-            client_socket.send(data)
+            if self.tracer.enabled:
+                self.tracer.mark('enqueue', bytes=len(data))
+            if self.admission is not None:
+                self.send_tracked(client_socket, data, lane)
+            else:
+                self.send_locked(client_socket, data, lane)
+            if self.tracer.enabled:
+                self.tracer.mark('write')
         except Exception as e:
-            print(f"[SERVER ERROR] Error sending message: {e}")
+            log.error("Error sending message: %s", e)
             
+    def send_tracked(self, client_socket, data, lane=CONTROL):
+        """sendall() while counting the bytes in queued_output()"""
+        with self.output_lock:
+            self.sending_bytes += len(data)
+        try:
+            self.send_locked(client_socket, data, lane)
+        finally:
+            with self.output_lock:
+                self.sending_bytes -= len(data)
+    
+    def send_locked(self, client_socket, data, lane):
+        """sendall() holding the connection's send lock (frames of files wait for other lanes)"""
+        lock = self.send_locks.get(client_socket)
+        if lock is None:
+            client_socket.sendall(data)
+            return
+        lock.acquire(lane=lane)
+        try:
+            client_socket.sendall(data)
+        finally:
+            lock.release()
+    
     def send_to_user(self, username, message):
         """Send message to a specific user by username"""
-        with self.lock:
-            for client_socket, user in self.clients.items():
-                if user == username:
-                    self.send_message(client_socket, message)
-                    break
+        if not self.send_to_local_user(username, message) and self.router:
+            self.router.deliver(username, message)
+            
+    def send_to_users(self, usernames, message):
+        """Send message to several users (encoded once), batching the ones on other nodes"""
+        data = None
+        remote = []
+        for username in usernames:
+            client_socket = self.sessions.socket_of(username)
+            if client_socket is None:
+                remote.append(username)
+                continue
+            if data is None:
+                data = encode_message(message)
+                lane = lane_of(message)
+            self.send_data(client_socket, data, lane)
+        if remote and self.router:
+            self.router.deliver_many(remote, message)
+            
+    def send_to_local_user(self, username, message):
+        """Send message to a user connected to this server, False if not found"""
+        client_socket = self.sessions.socket_of(username)
+        if client_socket is None:
+            return False
+        self.send_message(client_socket, message)
+        return True
                     
     def broadcast(self, message, exclude=None):
         """
@@ -277,10 +880,28 @@ class ChatServer:
         OSI Model Mapping:
         - Application Layer: Message routing to multiple recipients
         """
-        with self.lock:
-            for client_socket in list(self.clients.keys()):
-                if client_socket != exclude:
-                    self.send_message(client_socket, message)
+        self.broadcast_local(message, exclude)
+        if self.router:
+            self.router.broadcast(message)
+            
+    def broadcast_local(self, message, exclude=None):
+        """Broadcast message to the clients connected to this server (encoded once)"""
+        data = encode_message(message)
+        lane = lane_of(message)
+        for client_socket in self.sessions.roster:
+            if client_socket != exclude:
+                self.send_data(client_socket, data, lane)
+                    
+    def add_group(self, group_name, members):
+        """Create or replace a group"""
+        self.groups.set(group_name, members)
+            
+    def online_users(self):
+        """Usernames of everybody online, including users on other nodes"""
+        users = self.sessions.usernames()
+        if self.router:
+            users.extend(self.router.online_users())
+        return users
 
 def main():
     """
@@ -290,18 +911,224 @@ def main():
     - Default Host: 0.0.0.0 (listens on all network interfaces)
     - Default Port: 5555 (Application Layer port number)
     """
+    parser = argparse.ArgumentParser(description="Computer Networks Chat Server")
+    parser.add_argument('--host', default='0.0.0.0', help="Address to listen on")
+    parser.add_argument('--port', type=int, default=5555, help="TCP port to listen on")
+    parser.add_argument('--log-level', default='INFO',
+                        help="Level for server lifecycle events (DEBUG, INFO, WARNING, ...)")
+    parser.add_argument('--message-log-level', default=None,
+                        help="Level for per-message events (WARNING turns them off)")
+    parser.add_argument('--log-sample-rate', type=float, default=1.0,
+                        help="Fraction of per-message events to log (0.0 - 1.0)")
+    parser.add_argument('--log-file', default=None, help="Write logs to this file instead of stdout")
+    parser.add_argument('--trace-rate', type=float, default=0.0,
+                        help="Fraction of messages to trace (0 disables tracing)")
+    parser.add_argument('--trace-clients', action='store_true',
+                        help="Trace messages flagged by tracing clients (e.g. the load generator)")
+    parser.add_argument('--trace-file', default='server_trace.json',
+                        help="Chrome trace JSON written at shutdown when tracing is enabled")
+    parser.add_argument('--admin-socket', default=None,
+                        help="Unix socket path (or local TCP port) for admin commands: "
+                             "thread dumps and runtime profiling")
+    parser.add_argument('--engine', choices=('threads', 'selector', 'pool'), default='threads',
+                        help="threads: one thread per client; selector: one event loop "
+                             "(epoll/kqueue) for all clients; pool: event loop for I/O and "
+                             "a fixed worker pool for message processing")
+    parser.add_argument('--pool-workers', type=int, default=None,
+                        help="Worker threads of the pool engine (default 4)")
+    parser.add_argument('--backlog', type=int, default=DEFAULT_BACKLOG,
+                        help="Length of the queue of connections waiting to be accepted")
+    parser.add_argument('--max-connections', type=int, default=0,
+                        help="Refuse connections beyond this many (0 = unlimited)")
+    parser.add_argument('--rate-limits', default=None,
+                        help="Per-user token buckets: 'default' or e.g. message=20/40,file_transfer=2/4 "
+                             "(requests per second / burst)")
+    parser.add_argument('--max-queued-mb', type=float, default=0,
+                        help="Shed load while more than this many MB wait to be sent (0 = off)")
+    parser.add_argument('--max-cpu', type=float, default=0,
+                        help="Shed load while the process uses more than this fraction of a CPU (0 = off)")
+    parser.add_argument('--heartbeat-interval', type=float, default=30.0,
+                        help="Ping connections idle for this many seconds (0 disables heartbeats)")
+    parser.add_argument('--heartbeat-timeout', type=float, default=10.0,
+                        help="Reap connections that do not answer a ping within this many seconds")
+    parser.add_argument('--keepalive-idle', type=int, default=60,
+                        help="Seconds before TCP keepalive probes start (0 leaves keepalive off)")
+    parser.add_argument('--file-store-mb', type=float, default=64,
+                        help="Keep uploaded files up to this many MB to skip repeated uploads "
+                             "(0 disables deduplication)")
+    parser.add_argument('--max-frame-mb', type=float, default=MAX_FRAME_SIZE / (1024 * 1024),
+                        help="Drop clients that send a larger frame (files are sent in one frame)")
+    parser.add_argument('--history-size', type=int, default=HISTORY_SIZE,
+                        help="Chat messages kept in the history")
+    parser.add_argument('--no-search', action='store_true',
+                        help="Do not index the history for 'search' requests (saves memory)")
+    parser.add_argument('--state-file', default=None,
+                        help="Restore groups and history from this file at startup and save "
+                             "snapshots to it (see snapshot.py)")
+    parser.add_argument('--snapshot-interval', type=float, default=SNAPSHOT_INTERVAL,
+                        help="Seconds between snapshots to --state-file")
+    parser.add_argument('--tls-cert', default=None,
+                        help="Certificate file: accept only TLS connections (see tls.py)")
+    parser.add_argument('--tls-key', default=None, help="Private key file of --tls-cert")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes sharing the port via SO_REUSEPORT")
+    parser.add_argument('--cluster', default=None,
+                        help="Message bus broker (host:port or Unix socket path) to join a "
+                             "multi-node cluster, see bus.py")
+    parser.add_argument('--node-id', default=socket.gethostname(),
+                        help="Name of this node in the cluster")
+    args = parser.parse_args()
+    
+    # Treat SIGTERM like Ctrl+C so traces and logs are flushed on shutdown
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
     print("=" * 60)
     print("COMPUTER NETWORKS CHAT SERVER")
     print("Semester Project - OSI Model Implementation")
     print("=" * 60)
     
+    if args.workers > 1:
+        run_workers(args)
+    else:
+        run_server(args, bus_address=args.cluster)
+
+def run_server(args, worker_id=None, bus_address=None):
+    """
+    Run one server process until it is interrupted
+    
+    worker_id is set when running as one of several workers sharing the
+    port. With a bus_address the server joins the message bus as a
+    cluster node and routes messages for users on other nodes over it.
+    """
+    if worker_id is not None:
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
+    listener = setup_logging(
+        level=args.log_level.upper(),
+        message_level=args.message_log_level.upper() if args.message_log_level else None,
+        sample_rate=args.log_sample_rate,
+        log_file=args.log_file
+    )
+    
+    # Per-worker output files
+    suffix = f".{worker_id}" if worker_id is not None else ''
+    
     # Create and start server
-    server = ChatServer(host='0.0.0.0', port=5555)
+    tracer = Tracer(sample_rate=args.trace_rate, follow_clients=args.trace_clients)
+    options = dict(host=args.host, port=args.port, tracer=tracer, reuse_port=worker_id is not None,
+                   backlog=args.backlog, max_connections=args.max_connections)
+    if args.tls_cert:
+        options['ssl_context'] = server_context(args.tls_cert, args.tls_key or args.tls_cert)
+    if args.engine == 'selector':
+        from event_server import EventChatServer
+        raise_file_limit()
+        server = EventChatServer(**options)
+    elif args.engine == 'pool':
+        from pool_server import PooledChatServer, DEFAULT_WORKERS
+        raise_file_limit()
+        server = PooledChatServer(workers=args.pool_workers or DEFAULT_WORKERS, **options)
+    else:
+        server = ChatServer(**options)
+    server.file_store = FileStore(int(args.file_store_mb * 1024 * 1024)) if args.file_store_mb else None
+    if args.history_size != HISTORY_SIZE:
+        server.chat_history = MessageHistory(args.history_size)
+    if args.no_search:
+        server.search_index = None
+    server.max_frame_size = int(args.max_frame_mb * 1024 * 1024)
+    if args.rate_limits or args.max_queued_mb or args.max_cpu:
+        AdmissionController(
+            limits=parse_limits(args.rate_limits) if args.rate_limits else None,
+            max_queued_bytes=int(args.max_queued_mb * 1024 * 1024),
+            max_cpu=args.max_cpu
+        ).attach(server)
+    
+    if args.heartbeat_interval:
+        HeartbeatMonitor(interval=args.heartbeat_interval, timeout=args.heartbeat_timeout,
+                         keepalive_idle=args.keepalive_idle).attach(server)
+    
+    snapshots = None
+    if args.state_file:
+        snapshots = StateSnapshots(args.state_file + suffix, interval=args.snapshot_interval)
+        snapshots.attach(server)
+        snapshots.restore()
+        snapshots.start_thread()
+    
+    router = None
+    if bus_address:
+        node_id = args.node_id if worker_id is None else f"{args.node_id}-w{worker_id}"
+        router = ClusterRouter(BrokerBus(bus_address), node_id)
+        router.attach(server)
+    
+    admin = None
+    if args.admin_socket:
+        admin = AdminServer(server, args.admin_socket + suffix)
+        admin.start()
     
     try:
         server.start()
     except KeyboardInterrupt:
-        print("\n[SERVER] Shutting down...")
+        log.info("Shutting down...")
+    finally:
+        if admin:
+            admin.close()
+        if router:
+            router.close()
+        if snapshots:
+            snapshots.stop()
+            snapshots.save()
+        if tracer.enabled:
+            count = tracer.dump(args.trace_file + suffix)
+            log.info("Wrote %d trace events to %s", count, args.trace_file + suffix)
+        listener.stop()
+
+def raise_file_limit():
+    """Allow as many open sockets as the system permits (Unix only)"""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if hard == resource.RLIM_INFINITY or soft < hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+def run_workers(args):
+    """
+    Run several worker processes on the same port
+    
+    The workers are cluster nodes: they join the --cluster bus if one is
+    given, otherwise the parent process runs a bus broker on a Unix socket
+    that carries private messages, group updates and broadcasts between
+    the workers.
+    """
+    listener = setup_logging(level=args.log_level.upper(), log_file=args.log_file)
+    broker = None
+    bus_address = args.cluster
+    if not bus_address:
+        broker = BusBroker(os.path.join(tempfile.mkdtemp(prefix='chat-'), 'bus.sock'))
+        bus_address = broker.start()
+    
+    workers = [
+        multiprocessing.Process(target=run_server, args=(args, worker_id, bus_address),
+                                name=f"worker-{worker_id}")
+        for worker_id in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    log.info("Started %d workers on port %s", args.workers, args.port)
+    
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        log.info("Shutting down...")
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+        if broker:
+            broker.close()
+        listener.stop()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,127 @@
+"""
+Server Logging
+Computer Networks Semester Project
+
+Leveled, structured logging for the chat server.
+
+The client handler threads never write to stdout/files themselves: every
+record is pushed onto an in-memory queue and a single background listener
+thread does the actual I/O. Per-message events (chat messages, group
+messages, file transfers) go through their own logger which can be sampled
+so that only a fraction of them is recorded under heavy load.
+"""
+
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+
+# Lifecycle events: start-up, logins, logouts, errors
+SERVER_LOGGER = 'chat.server'
+
+# Per-message events on the hot path (message / group_message / file_transfer)
+MESSAGE_LOGGER = 'chat.server.messages'
+
+LOG_FORMAT = '%(asctime)s [SERVER] %(levelname)s %(message)s%(fields)s'
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of the records passing through a logger
+
+    A rate of 1.0 keeps everything, 0.0 drops everything.
+    """
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if self.rate >= 1.0:
+            return True
+        if self.rate <= 0.0:
+            return False
+        return random.random() < self.rate
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Formatter that appends structured fields as key=value pairs
+
+    Fields are passed with ``extra={'fields': {...}}``.
+    """
+
+    def format(self, record):
+        fields = getattr(record, 'fields', None)
+        if isinstance(fields, dict) and fields:
+            record.fields = ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        elif not isinstance(fields, str):
+            record.fields = ''
+        return super().format(record)
+
+
+class FastQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves formatting to the listener thread
+
+    The stdlib QueueHandler formats the message in the calling thread.
+    Our records only carry immutable arguments (strings and numbers), so
+    they can be handed over as they are and formatted in the background.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def get_logger():
+    """Return the server lifecycle logger"""
+    return logging.getLogger(SERVER_LOGGER)
+
+
+def get_message_logger():
+    """Return the (sampled) per-message event logger"""
+    return logging.getLogger(MESSAGE_LOGGER)
+
+
+def setup_logging(level='INFO', message_level=None, sample_rate=1.0,
+                  log_file=None, stream=None):
+    """
+    Configure queue-based asynchronous logging for the server
+
+    Args:
+        level: Level for lifecycle events (e.g. 'INFO', 'WARNING')
+        message_level: Level for per-message events, defaults to ``level``.
+            Use 'WARNING' or higher to turn per-message logging off.
+        sample_rate: Fraction of per-message events to keep (0.0 - 1.0)
+        log_file: Optional path, log to this file instead of the stream
+        stream: Output stream when no file is given (default: stdout)
+
+    Returns:
+        The started QueueListener. Call ``stop()`` on it at shutdown to
+        flush pending records.
+    """
+    if log_file:
+        target = logging.FileHandler(log_file, encoding='utf-8')
+    else:
+        target = logging.StreamHandler(stream or sys.stdout)
+    target.setFormatter(StructuredFormatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, target)
+
+    server_log = get_logger()
+    for handler in list(server_log.handlers):
+        server_log.removeHandler(handler)
+    server_log.addHandler(FastQueueHandler(log_queue))
+    server_log.setLevel(level)
+    server_log.propagate = False
+
+    message_log = get_message_logger()
+    for log_filter in list(message_log.filters):
+        message_log.removeFilter(log_filter)
+    message_log.addFilter(SamplingFilter(sample_rate))
+    message_log.setLevel(message_level or level)
+
+    listener.start()
+    return listener
@@ -0,0 +1,241 @@
+"""
+Server State
+Computer Networks Semester Project
+
+The chat server's shared state, split into parts that are synchronized
+independently instead of under one server-wide lock:
+
+    SessionRegistry - logged in users: a username index sharded over
+                      several locks, and a copy-on-write roster
+    GroupTable      - group memberships, copy-on-write
+    MessageHistory  - recent chat messages, with its own lock
+
+Copy-on-write: writers (login, logout, group creation) build a new dict
+under a lock and swap the reference; readers (every message, broadcast
+and group fan-out) just take the current reference and iterate it
+without any lock. Replacing a reference is atomic in Python, and a
+published dict is never modified again, so a reader always sees one
+consistent snapshot. Writes cost a copy, which suits data that is read
+on every message but changes only when users come and go.
+
+OSI Model Mapping:
+- Session Layer: Registry of active sessions
+- Application Layer: Groups and message history
+"""
+
+import collections
+import itertools
+import threading
+
+# Locks the username index is spread over
+DEFAULT_SHARDS = 16
+
+# Messages kept in memory
+HISTORY_SIZE = 10000
+
+
+class SessionRegistry:
+    """Logged in users of this server"""
+
+    def __init__(self, shards=DEFAULT_SHARDS):
+        # Username index, sharded: [({username: socket}, Lock)]
+        self.shards = [({}, threading.Lock()) for _ in range(shards)]
+        # Roster snapshot {socket: username}; replaced on every change, never modified
+        self.roster = {}
+        self.addresses = {}  # {socket: address}
+        self.roster_lock = threading.Lock()
+
+    def shard(self, username):
+        return self.shards[hash(username) % len(self.shards)]
+
+    def add(self, client_socket, username, address):
+        """Register a login (a later login with the same name takes over the name)"""
+        with self.roster_lock:
+            previous = self.roster.get(client_socket)
+            roster = dict(self.roster)
+            roster[client_socket] = username
+            self.roster = roster
+            self.addresses[client_socket] = address
+        if previous is not None and previous != username:
+            self.release(previous, client_socket)
+        users, lock = self.shard(username)
+        with lock:
+            users[username] = client_socket
+
+    def remove(self, client_socket):
+        """Unregister a connection; returns its username or None"""
+        with self.roster_lock:
+            username = self.roster.get(client_socket)
+            if username is None:
+                return None
+            roster = dict(self.roster)
+            del roster[client_socket]
+            self.roster = roster
+            self.addresses.pop(client_socket, None)
+        self.release(username, client_socket)
+        return username
+
+    def release(self, username, client_socket):
+        """Drop a username from the index unless another connection took it over"""
+        users, lock = self.shard(username)
+        with lock:
+            if users.get(username) is client_socket:
+                del users[username]
+
+    def socket_of(self, username):
+        """Socket of a user, or None (lock-free: a dict lookup is atomic)"""
+        return self.shard(username)[0].get(username)
+
+    def usernames(self):
+        return list(self.roster.values())
+
+    def __len__(self):
+        return len(self.roster)
+
+
+class GroupTable:
+    """Group memberships {group_name: (usernames...)}, copy-on-write"""
+
+    def __init__(self):
+        self.groups = {}
+        self.lock = threading.Lock()
+
+    def set(self, group_name, members):
+        """Create or replace a group"""
+        with self.lock:
+            groups = dict(self.groups)
+            groups[group_name] = tuple(members)
+            self.groups = groups
+
+    def update(self, groups):
+        """Create or replace several groups with a single copy"""
+        with self.lock:
+            merged = dict(self.groups)
+            merged.update((name, tuple(members)) for name, members in groups.items())
+            self.groups = merged
+
+    def get(self, group_name):
+        """Members of a group, or None"""
+        return self.groups.get(group_name)
+
+    def snapshot(self):
+        """The current {group_name: members} dict (must not be modified)"""
+        return self.groups
+
+    def __contains__(self, group_name):
+        return group_name in self.groups
+
+
+class MessageHistory:
+    """
+    The most recent chat messages
+
+    The older part can come from a snapshot (see snapshot.py): a read-only
+    sequence that is decoded on demand. New messages go to the in-memory
+    deque until the next snapshot takes them over; together the two keep
+    at most size messages. Both parts are in msg_id order, so since()
+    finds its start by binary search.
+    """
+
+    def __init__(self, size=HISTORY_SIZE):
+        self.size = size
+        self.messages = collections.deque(maxlen=size)
+        self.by_id = {}  # {msg_id: message} of the messages in the deque
+        self.base = ()  # Restored history, oldest first
+        self.lock = threading.Lock()
+
+    def restore(self, base):
+        """Put restored messages in front of the ones in memory"""
+        with self.lock:
+            self.base = base
+
+    def compact(self, base, saved_ids):
+        """
+        Replace the restored part with a newer snapshot, dropping the
+        messages it saved (saved_ids) from memory
+
+        Messages are not always stored in msg_id order, so one stored
+        after the snapshot was taken can sit among the saved ones; an ID
+        alone does not tell whether a message made it into the snapshot.
+        """
+        with self.lock:
+            kept = collections.deque(maxlen=self.size)
+            for message in self.messages:
+                if message['msg_id'] in saved_ids:
+                    del self.by_id[message['msg_id']]
+                else:
+                    kept.append(message)
+            self.messages = kept
+            self.base = base
+
+    def base_start(self):
+        """Position of the oldest restored message still within size"""
+        return max(0, len(self.base) - max(0, self.size - len(self.messages)))
+
+    def append(self, message):
+        with self.lock:
+            messages = self.messages
+            if len(messages) == self.size:
+                del self.by_id[messages.popleft()['msg_id']]
+            # Handler threads may store messages slightly out of msg_id order
+            position = len(messages)
+            while position and messages[position - 1]['msg_id'] > message['msg_id']:
+                position -= 1
+            messages.insert(position, message)
+            self.by_id[message['msg_id']] = message
+
+    def get(self, msg_id):
+        """The message with msg_id, or None if it is not (or no longer) in the history"""
+        with self.lock:
+            message = self.by_id.get(msg_id)
+            base, start = self.base, self.base_start()
+        if message is None and base:
+            position = base.position_after(msg_id - 1)
+            if start <= position < len(base) and base.ids[position] == msg_id:
+                message = base[position]
+        return message
+
+    def oldest_id(self):
+        """msg_id of the oldest message kept (None when empty)"""
+        with self.lock:
+            if self.base and self.base_start() < len(self.base):
+                return self.base.ids[self.base_start()]
+            return self.messages[0]['msg_id'] if self.messages else None
+
+    def recent(self, count):
+        if count <= 0:
+            return []
+        with self.lock:
+            messages = list(self.messages)[-count:]
+            missing = count - len(messages)
+            if missing > 0 and self.base:
+                start = max(self.base_start(), len(self.base) - missing)
+                messages = [self.base[i] for i in range(start, len(self.base))] + messages
+        return messages
+
+    def since(self, msg_id):
+        """Messages with an ID greater than msg_id, oldest first"""
+        with self.lock:
+            base, start, messages = self.base, self.base_start(), self.messages
+            low, high = 0, len(messages)
+            while low < high:
+                middle = (low + high) // 2
+                if messages[middle]['msg_id'] > msg_id:
+                    high = middle
+                else:
+                    low = middle + 1
+            # Copy only the newer messages, taken from the end of the deque
+            newer = list(itertools.islice(reversed(messages), len(messages) - low))
+        newer.reverse()
+        if base:
+            for position in range(max(start, base.position_after(msg_id)), len(base)):
+                yield base[position]
+        yield from newer
+
+    def snapshot_parts(self):
+        """(restored history, its first position still kept, messages in memory) for snapshots"""
+        with self.lock:
+            return self.base, self.base_start(), list(self.messages)
+
+    def __len__(self):
+        return len(self.base) - self.base_start() + len(self.messages)
@@ -0,0 +1,282 @@
+"""
+State Snapshots
+Computer Networks Semester Project
+
+Periodically saves the server state that outlives connections (groups,
+message history, the message ID counter and the history ID) to a file, and restores it at
+startup, so a restart does not lose them.
+
+Compact binary format, loaded with mmap:
+
+    header   magic, version, creation time, next message ID,
+             size of the groups section, history count, index offset,
+             history ID (see sync.py)
+    groups   JSON {group_name: [members]}
+    data     the history messages, each exactly as sent on the wire
+             (newline-terminated JSON frames) in msg_id order
+    index    per message: (msg_id, end offset in data), 2 x uint64 LE
+
+Restoring reads the header and the groups and maps the rest: the history
+is not parsed at startup. A message is only decoded when something asks
+for it (e.g. the most recent ones), found through the index with a
+binary search on msg_id. Startup time therefore barely depends on how
+much history there is (see bench/bench_snapshot.py), and the history
+costs page cache instead of Python objects.
+
+Files are written to a temporary name and renamed, so a crash during a
+snapshot leaves the previous one intact. After each save the server's
+history switches over to the new file, so messages move out of Python
+memory and the next save copies the saved frames instead of encoding
+them again: only messages newer than the last snapshot are encoded.
+
+Enabled from the command line with:
+    python src/server.py --state-file chat.state --snapshot-interval 60
+
+OSI Model Mapping:
+- Application Layer: Persisting groups and chat history
+- Presentation Layer: Binary snapshot encoding
+"""
+
+import array
+import bisect
+import heapq
+import itertools
+import json
+import mmap
+import operator
+import os
+import struct
+import sys
+import threading
+import time
+
+from messages import decode_message
+from protocol import encode_message
+from server_logging import get_logger
+
+log = get_logger()
+
+MAGIC = b'CHATSNAP'
+VERSION = 2
+
+# magic, version, created (epoch seconds), next msg_id, groups bytes, history count, index offset
+HEADER_V1 = struct.Struct('<8sIdQQQQ')
+# Version 2 adds the history ID (ASCII, zero-padded)
+HEADER = struct.Struct('<8sIdQQQQ16s')
+
+# Seconds between periodic snapshots
+DEFAULT_INTERVAL = 60.0
+
+
+def write_snapshot(path, groups, frames, next_msg_id, base=None, base_start=0, base_end=None,
+                   history_id=''):
+    """
+    Write a snapshot file
+
+    groups is {group_name: members}, frames an iterable of
+    (msg_id, encoded frame) in msg_id order. The history of a previous
+    snapshot (base, positions base_start up to base_end) goes in front of
+    the frames; its data is copied as one block. history_id names the
+    sequence the msg_ids belong to. Returns the number of messages.
+    """
+    index = array.array('Q')
+    group_data = json.dumps({name: list(members) for name, members in groups.items()}).encode('utf-8')
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(b'\0' * HEADER.size)
+        f.write(group_data)
+        end = 0
+        base_end = len(base) if base is not None and base_end is None else base_end
+        if base is not None and base_start < base_end:
+            first = base.index[2 * base_start - 1] if base_start else 0
+            last = base.index[2 * base_end - 1]
+            with memoryview(base.buffer) as view:
+                f.write(view[base.data_start + first:base.data_start + last])
+            index.extend(base.index[2 * base_start:2 * base_end])
+            if first:
+                for i in range(1, len(index), 2):
+                    index[i] -= first
+            end = last - first
+        for msg_id, frame in frames:
+            f.write(frame)
+            end += len(frame)
+            index.append(msg_id)
+            index.append(end)
+        # Align the index so it can be read in place as an array of uint64
+        index_offset = f.tell() + (-f.tell() % 8)
+        f.write(b'\0' * (index_offset - f.tell()))
+        if sys.byteorder != 'little':
+            index.byteswap()
+        index.tofile(f)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, time.time(), next_msg_id, len(group_data),
+                            len(index) // 2, index_offset, history_id.encode('ascii')))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return len(index) // 2
+
+
+class SnapshotHistory:
+    """
+    Read-only message history inside a mapped snapshot file
+
+    Behaves like a sequence of messages, decoded on access by decode
+    (dicts by default; a server's history uses message objects).
+    """
+
+    def __init__(self, buffer, data_start, index, decode=json.loads):
+        self.buffer = buffer
+        self.data_start = data_start
+        self.index = index  # Flat sequence: msg_id, end, msg_id, end, ...
+        self.ids = index[0::2]
+        self.decode = decode
+
+    def __len__(self):
+        return len(self.ids)
+
+    def frame(self, position):
+        """Encoded frame of the message at position (bytes, newline included)"""
+        start = self.index[2 * position - 1] if position else 0
+        end = self.index[2 * position + 1]
+        return self.buffer[self.data_start + start:self.data_start + end]
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return self.decode(self.frame(position))
+
+    def frames(self, start=0):
+        """(msg_id, frame) pairs from position start on, without decoding"""
+        for position in range(start, len(self)):
+            yield self.ids[position], self.frame(position)
+
+    def position_after(self, msg_id):
+        """Position of the first message with an ID greater than msg_id"""
+        return bisect.bisect_right(self.ids, msg_id)
+
+
+class Snapshot:
+    """A loaded snapshot file (the history stays mapped while it is in use)"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.created, self.next_msg_id, group_size, count, index_offset = \
+            HEADER_V1.unpack_from(self.mmap)
+        if magic != MAGIC or version not in (1, VERSION):
+            self.mmap.close()
+            raise ValueError(f"{path} is not a chat snapshot of version {VERSION} or older")
+        if version == 1:
+            header_size = HEADER_V1.size
+            self.history_id = None  # Older snapshots start a new history when restored
+        else:
+            header_size = HEADER.size
+            self.history_id = HEADER.unpack_from(self.mmap)[-1].rstrip(b'\0').decode('ascii')
+        self.groups = json.loads(self.mmap[header_size:header_size + group_size])
+
+        if sys.byteorder == 'little':
+            # Zero-copy view of the index inside the mapping
+            index = memoryview(self.mmap)[index_offset:index_offset + count * 16].cast('Q')
+        else:
+            index = array.array('Q', self.mmap[index_offset:index_offset + count * 16])
+            index.byteswap()
+        self.history = SnapshotHistory(self.mmap, header_size + group_size, index)
+
+
+def load_snapshot(path):
+    """Load a snapshot file, or None if there is none"""
+    if not os.path.exists(path):
+        return None
+    return Snapshot(path)
+
+
+class StateSnapshots:
+    """
+    Saves a ChatServer's state periodically and restores it at startup
+
+    Attached as ``server.snapshots``; restore() must run before the server
+    starts accepting clients.
+    """
+
+    def __init__(self, path, interval=DEFAULT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.server = None
+        self.snapshot = None  # Latest snapshot, backing the older part of the history
+        self.lock = threading.Lock()
+        self.running = threading.Event()
+
+    def attach(self, server):
+        self.server = server
+        server.snapshots = self
+
+    def restore(self):
+        """Load the state file into the server; returns False if there is none"""
+        started = time.perf_counter()
+        snapshot = load_snapshot(self.path)
+        if snapshot is None:
+            return False
+        snapshot.history.decode = decode_message
+        server = self.server
+        server.groups.update(snapshot.groups)
+        server.chat_history.restore(snapshot.history)
+        server.message_ids = itertools.count(snapshot.next_msg_id)
+        if snapshot.history_id:
+            server.history_id = snapshot.history_id  # The restored msg_ids stay valid for clients
+        if server.search_index is not None:
+            history = snapshot.history
+            server.search_index.index_in_background(
+                history[position] for position in range(server.chat_history.base_start(), len(history)))
+        self.snapshot = snapshot
+        log.info("Restored %d groups and %d messages from %s in %.1f ms",
+                 len(snapshot.groups), len(snapshot.history), self.path,
+                 (time.perf_counter() - started) * 1000)
+        return True
+
+    def save(self):
+        """Write a snapshot of the current state; returns the number of messages saved"""
+        server = self.server
+        with self.lock:
+            started = time.perf_counter()
+            # Taking the next ID leaves a gap in the sequence, which is harmless
+            next_msg_id = next(server.message_ids)
+            base, base_start, messages = server.chat_history.snapshot_parts()
+            base = base or None
+            # Handler threads may store messages out of msg_id order, even
+            # behind ones already in the previous snapshot: merge those in
+            frames = sorted(((message['msg_id'], encode_message(message)) for message in messages),
+                            key=operator.itemgetter(0))
+            base_end = len(base) if base is not None else 0
+            if base is not None and frames and frames[0][0] < base.ids[-1]:
+                base_end = max(base_start, base.position_after(frames[0][0]))
+                frames = heapq.merge(base.frames(base_end), frames, key=operator.itemgetter(0))
+            count = write_snapshot(self.path, server.groups.snapshot(), frames,
+                                   next_msg_id, base, base_start, base_end, server.history_id)
+            snapshot = Snapshot(self.path)
+            snapshot.history.decode = decode_message
+            server.chat_history.compact(snapshot.history, {message['msg_id'] for message in messages})
+            self.snapshot = snapshot
+        log.info("Saved %d messages to %s in %.1f ms", count, self.path,
+                 (time.perf_counter() - started) * 1000)
+        return count
+
+    def start_thread(self):
+        """Save every interval seconds from a background thread"""
+        self.running.set()
+        threading.Thread(target=self.run, name='snapshots', daemon=True).start()
+
+    def stop(self):
+        self.running.clear()
+
+    def run(self):
+        while self.running.is_set():
+            time.sleep(self.interval)
+            if not self.running.is_set():
+                break
+            try:
+                self.save()
+            except OSError as e:
+                log.error("Snapshot to %s failed: %s", self.path, e)
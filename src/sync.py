@@ -0,0 +1,168 @@
+"""
+History Sync
+Computer Networks Semester Project
+
+Clients keep their conversations in a local SQLite database
+(MessageCache) and, after logging in, ask the server only for what they
+have not seen yet:
+
+    client -> {"type": "sync", "history_id": "9f2c41d07a3e58b6",
+               "since": {"all": 120, "user:bob": 118}, "after": 130}
+    server -> {"type": "sync_response", "history_id": "9f2c41d07a3e58b6",
+               "messages": [...], "last_id": 135, "more": false}
+
+Messages carry server-assigned, increasing msg_ids. "after" is how far
+the previous sync got: the client has everything of its conversations
+up to there. "since" is the newest msg_id the client has per
+conversation, which is further on for conversations that got messages
+while it was online. The server answers with the matching messages from its
+history, at most SYNC_LIMIT per response; with "more" set the client
+asks again. "last_id" is where the client's next sync continues.
+
+A msg_id is only unique within one history: a server restarted without
+a state file counts from 1 again, and every worker or cluster node
+counts on its own. The server names its history with a random
+history_id (kept in the state file) and sends it in login_response,
+message_sent and sync_response; messages routed from another node carry
+that node's history_id. The cache stores messages by (history_id,
+msg_id), and a sync for another history_id than the server's gets all of
+its messages.
+
+Conversations are named from the user's point of view:
+    all          - messages to everybody
+    user:<name>  - private messages with <name> (either direction)
+    group:<name> - messages in group <name>
+
+Starting the client shows the cached transcript right away; only the
+messages sent while it was offline travel over the network.
+
+OSI Model Mapping:
+- Application Layer: History synchronization
+- Session Layer: Resuming a conversation across connections
+"""
+
+import json
+import os
+import sqlite3
+import threading
+
+# Messages per sync_response
+SYNC_LIMIT = 500
+
+# Schema version of the cache database (PRAGMA user_version)
+CACHE_VERSION = 2
+
+# Where clients keep their caches
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.chat_cache')
+
+
+def conversation_of(message, username):
+    """Conversation a chat message belongs to for username, or None if it is not theirs"""
+    msg_type = message.get('type')
+    if msg_type == 'group_message':
+        return f"group:{message.get('group_name')}"
+    if msg_type != 'message':
+        return None
+    recipient = message.get('recipient')
+    if recipient == 'all':
+        return 'all'
+    sender = message.get('sender')
+    if sender == username:
+        return f"user:{recipient}"
+    if recipient == username:
+        return f"user:{sender}"
+    return None
+
+
+class MessageCache:
+    """
+    Client-side store of received and sent messages, in SQLite
+
+    Used from the GUI thread and the receiving thread, so one connection
+    is shared under a lock.
+    """
+
+    def __init__(self, path):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.db:
+            if self.db.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+                # Only a copy: a cache of an older version is filled again by the next sync
+                self.db.execute("DROP TABLE IF EXISTS messages")
+                self.db.execute("DROP TABLE IF EXISTS state")
+                self.db.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+            self.db.execute("CREATE TABLE IF NOT EXISTS messages ("
+                            "history_id TEXT NOT NULL, msg_id INTEGER NOT NULL, "
+                            "conversation TEXT NOT NULL, timestamp REAL, message TEXT NOT NULL, "
+                            "PRIMARY KEY (history_id, msg_id))")
+            self.db.execute("CREATE INDEX IF NOT EXISTS by_history "
+                            "ON messages (history_id, conversation, msg_id)")
+            self.db.execute("CREATE INDEX IF NOT EXISTS by_conversation "
+                            "ON messages (conversation, timestamp)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value)")
+
+    @staticmethod
+    def path_for(host, port, username):
+        """Default cache file of one user on one server"""
+        safe = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in f"{host}_{port}_{username}")
+        return os.path.join(CACHE_DIR, f"{safe}.sqlite3")
+
+    def insert(self, history_id, conversation, message):
+        cursor = self.db.execute(
+            "INSERT OR IGNORE INTO messages (history_id, msg_id, conversation, timestamp, message) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (history_id, message['msg_id'], conversation, message.get('timestamp'), json.dumps(message)))
+        return cursor.rowcount == 1
+
+    def add(self, history_id, conversation, message):
+        """Store a message; returns False if it was already cached"""
+        with self.lock, self.db:
+            return self.insert(history_id, conversation, message)
+
+    def add_many(self, history_id, items):
+        """Store (conversation, message) pairs; returns the messages that were new"""
+        with self.lock, self.db:
+            return [message for conversation, message in items
+                    if self.insert(history_id, conversation, message)]
+
+    def last_seen(self, history_id):
+        """{conversation: newest msg_id} of one history"""
+        with self.lock:
+            return dict(self.db.execute(
+                "SELECT conversation, MAX(msg_id) FROM messages WHERE history_id = ? "
+                "GROUP BY conversation", (history_id,)))
+
+    def recent(self, count, conversation=None):
+        """The newest count messages (of one conversation), oldest first"""
+        query = "SELECT message FROM messages"
+        args = ()
+        if conversation is not None:
+            query += " WHERE conversation = ?"
+            args = (conversation,)
+        with self.lock:
+            rows = self.db.execute(query + " ORDER BY timestamp DESC, msg_id DESC LIMIT ?",
+                                   args + (count,)).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def synced_through(self, history_id):
+        """msg_id the last sync of a history reached (0 before the first sync)"""
+        with self.lock:
+            row = self.db.execute("SELECT value FROM state WHERE key = ?",
+                                  (f"synced_through:{history_id}",)).fetchone()
+        return row[0] if row else 0
+
+    def set_synced_through(self, history_id, msg_id):
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)",
+                            (f"synced_through:{history_id}", msg_id))
+
+    def sync_request(self, history_id):
+        """The sync message to send to a server with this history_id"""
+        return {'type': 'sync', 'history_id': history_id, 'since': self.last_seen(history_id),
+                'after': self.synced_through(history_id)}
+
+    def close(self):
+        with self.lock:
+            self.db.close()
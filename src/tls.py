@@ -0,0 +1,99 @@
+"""
+TLS Transport
+Computer Networks Semester Project
+
+Optional encryption of the chat protocol with the standard library ssl
+module. The newline-delimited JSON frames are unchanged; they are just
+carried inside a TLS session instead of directly over TCP.
+
+    python src/tls.py --cert certs/server.crt --key certs/server.key
+    python src/server.py --tls-cert certs/server.crt --tls-key certs/server.key
+    python src/client.py --tls --ca-file certs/server.crt
+
+Session resumption: after a full handshake the server issues session
+tickets (TLS 1.3) and the client keeps the session. When the client
+reconnects it offers that session and both sides skip the certificate
+exchange and the expensive public key operations, so a reconnect storm
+after a server restart or network blip costs far less CPU.
+
+Handshakes never run on the accept loop: the threaded engine performs
+them in the new client's handler thread, the event engines drive
+non-blocking handshakes from the event loop.
+
+OSI Model Mapping:
+- Presentation Layer: Encryption and decryption of the message stream
+- Session Layer: TLS sessions and session resumption
+"""
+
+import argparse
+import os
+import ssl
+import subprocess
+
+# Seconds a client gets to complete the TLS handshake
+HANDSHAKE_TIMEOUT = 10.0
+
+# Session tickets sent to a client after a full handshake (one per reconnect)
+SESSION_TICKETS = 2
+
+
+def server_context(certfile, keyfile, resumption=True):
+    """TLS context for ChatServer"""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    context.load_cert_chain(certfile, keyfile)
+    if resumption:
+        context.num_tickets = SESSION_TICKETS
+    else:
+        context.num_tickets = 0
+        context.options |= ssl.OP_NO_TICKET
+    return context
+
+
+def client_context(cafile=None, verify=True):
+    """
+    TLS context for clients
+
+    cafile trusts a specific (e.g. self-signed) certificate in addition
+    to the system store; verify=False disables certificate checks.
+    """
+    context = ssl.create_default_context(cafile=cafile)
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    if not verify:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def generate_self_signed(certfile, keyfile, hostname='localhost', days=365):
+    """
+    Create a self-signed certificate for tests and benchmarks
+
+    Uses the openssl command line tool (the ssl module cannot create
+    certificates). The certificate is valid for hostname and 127.0.0.1.
+    """
+    for path in (certfile, keyfile):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+    subprocess.run([
+        'openssl', 'req', '-x509', '-newkey', 'ec', '-pkeyopt', 'ec_paramgen_curve:prime256v1',
+        '-nodes', '-keyout', keyfile, '-out', certfile, '-days', str(days),
+        '-subj', f'/CN={hostname}',
+        '-addext', f'subjectAltName=DNS:{hostname},IP:127.0.0.1',
+    ], check=True, capture_output=True)
+    return certfile, keyfile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create a self-signed certificate for the chat server")
+    parser.add_argument('--cert', default='certs/server.crt', help="Certificate output path")
+    parser.add_argument('--key', default='certs/server.key', help="Private key output path")
+    parser.add_argument('--hostname', default='localhost', help="Name the certificate is valid for")
+    parser.add_argument('--days', type=int, default=365, help="Validity in days")
+    args = parser.parse_args()
+    generate_self_signed(args.cert, args.key, args.hostname, args.days)
+    print(f"Wrote {args.cert} and {args.key}")
+
+
+if __name__ == "__main__":
+    main()
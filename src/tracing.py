@@ -0,0 +1,166 @@
+"""
+Message Tracing
+Computer Networks Semester Project
+
+Optional per-message latency tracing in Chrome trace format.
+
+For a sampled message the server records a timestamp at every stage of
+its journey through the server:
+
+    receive  - recv() returned the bytes containing the message
+    decode   - the frame was split off the stream and parsed as JSON
+    route    - the message was built and its recipients are being looked up
+    enqueue  - a frame is about to be written to a recipient's socket
+    write    - sendall() returned for that recipient
+
+Each stage becomes a span ending at its timestamp, so the trace shows how
+long parsing, routing (including waiting for the routing lock) and socket
+writes took. The resulting file can be opened in chrome://tracing or
+https://ui.perfetto.dev.
+
+Timestamps come from time.perf_counter_ns(), which on Linux is the
+system-wide monotonic clock, so traces written by the benchmark clients
+and by the server on the same machine line up and can be merged:
+
+    python src/tracing.py merge server_trace.json client_trace.json -o trace.json
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+
+STAGES = ('receive', 'decode', 'route', 'enqueue', 'write')
+
+
+def now():
+    """Current trace timestamp in nanoseconds"""
+    return time.perf_counter_ns()
+
+
+class Tracer:
+    """
+    Collects sampled per-message stage timestamps
+
+    With a sample rate of 0 and follow_clients off, tracing is disabled and
+    the server only pays for one attribute check per message. With
+    follow_clients on, messages carrying ``'trace': True`` (set by a tracing
+    client) are always traced so both sides of the trace cover the same
+    messages.
+    """
+
+    def __init__(self, sample_rate=0.0, follow_clients=False, max_events=500000,
+                 process_name='chat-server'):
+        self.sample_rate = sample_rate
+        self.follow_clients = follow_clients
+        self.enabled = sample_rate > 0 or follow_clients
+        self.max_events = max_events
+        self.process_name = process_name
+        self.pid = os.getpid()
+        self.events = []
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def begin(self, message, received_at):
+        """Start tracing a decoded message if it is sampled"""
+        if (self.follow_clients and message.get('trace')) or random.random() < self.sample_rate:
+            trace = {
+                'type': message.get('type'),
+                'stages': [('receive', received_at, None), ('decode', now(), None)],
+            }
+        else:
+            trace = None
+        self.local.trace = trace
+        return trace
+
+    def mark(self, stage, **args):
+        """Record a stage of the message being processed by this thread"""
+        trace = getattr(self.local, 'trace', None)
+        if trace is not None:
+            trace['stages'].append((stage, now(), args or None))
+
+    def end(self, trace):
+        """Finish a trace and convert it to Chrome trace events"""
+        self.local.trace = None
+        stages = trace['stages']
+        tid = threading.get_ident()
+        msg_id = None
+        for _, _, args in stages:
+            if args and 'msg_id' in args:
+                msg_id = args['msg_id']
+                break
+
+        name = f"{trace['type']} {msg_id}" if msg_id is not None else str(trace['type'])
+        events = [span(name, stages[0][1], stages[-1][1], self.pid, tid,
+                       {'msg_id': msg_id, 'type': trace['type']})]
+        for (_, start, _), (stage, end, args) in zip(stages, stages[1:]):
+            events.append(span(stage, start, end, self.pid, tid, args))
+        self.add_events(events)
+
+    def add_events(self, events):
+        with self.lock:
+            if len(self.events) + len(events) > self.max_events:
+                self.dropped += len(events)
+                return
+            self.events.extend(events)
+
+    def dump(self, path):
+        """Write all collected events as a Chrome trace JSON file"""
+        with self.lock:
+            events = list(self.events)
+        write_trace(path, events, self.pid, self.process_name)
+        return len(events)
+
+
+def span(name, start_ns, end_ns, pid, tid, args=None):
+    """Chrome trace 'complete' event (timestamps in microseconds)"""
+    event = {
+        'name': name,
+        'ph': 'X',
+        'ts': start_ns / 1000,
+        'dur': max(0, end_ns - start_ns) / 1000,
+        'pid': pid,
+        'tid': tid,
+    }
+    if args:
+        event['args'] = args
+    return event
+
+
+def write_trace(path, events, pid, process_name):
+    """Write events plus a process name record to a trace file"""
+    metadata = {'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': process_name}}
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': [metadata] + events, 'displayTimeUnit': 'ms'}, f)
+
+
+def merge_trace_files(paths, output):
+    """Combine several trace files into one"""
+    events = []
+    for path in paths:
+        with open(path) as f:
+            data = json.load(f)
+        events.extend(data['traceEvents'] if isinstance(data, dict) else data)
+    with open(output, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    return len(events)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trace file utilities")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    merge = subparsers.add_parser('merge', help="Merge server and client trace files")
+    merge.add_argument('inputs', nargs='+', help="Trace files to merge")
+    merge.add_argument('-o', '--output', required=True, help="Merged trace file")
+    args = parser.parse_args()
+
+    if args.command == 'merge':
+        count = merge_trace_files(args.inputs, args.output)
+        print(f"Wrote {count} events to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Admin Socket Tests for Computer Networks Chat Application
+Tests thread dumps and runtime profiling through the admin socket
+"""
+
+import sys
+import os
+import pstats
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from admin import AdminServer, send_command
+from test_server import ProtocolClient, start_server
+
+
+def test_thread_dump():
+    """Test that the thread dump shows the client handler threads"""
+    print("Testing thread dump...")
+    
+    server = start_server()
+    path = os.path.join(tempfile.mkdtemp(), 'admin.sock')
+    admin = AdminServer(server, path)
+    admin.start()
+    alice = ProtocolClient(server.port, 'alice')
+    
+    dump = send_command(path, 'threads')
+    assert 'client-alice@' in dump
+    assert 'handle_client' in dump
+    
+    alice.close()
+    admin.close()
+    print("✓ Thread dump working correctly")
+
+
+def test_cprofile_session():
+    """Test that a cProfile session covers the handler threads"""
+    print("\nTesting runtime profiling...")
+    
+    server = start_server()
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'admin.sock')
+    output = os.path.join(directory, 'server.prof')
+    admin = AdminServer(server, path)
+    admin.start()
+    alice = ProtocolClient(server.port, 'alice')
+    bob = ProtocolClient(server.port, 'bob')
+    
+    assert server.profiler is None
+    assert 'Started cprofile' in send_command(path, f'profile start 60 cprofile {output}')
+    for i in range(10):
+        alice.send({'type': 'message', 'recipient': 'bob', 'content': str(i)})
+        bob.wait_for('message')
+    assert 'written to' in send_command(path, 'profile stop')
+    assert server.profiler is None
+    
+    functions = {name for _, _, name in pstats.Stats(output).stats}
+    assert 'process_message' in functions
+    
+    alice.close()
+    bob.close()
+    admin.close()
+    print("✓ Runtime profiling working correctly")
+
+
+if __name__ == "__main__":
+    test_thread_dump()
+    test_cprofile_session()
@@ -0,0 +1,119 @@
+"""
+Admission Control Tests for Computer Networks Chat Application
+Tests token buckets, load shedding and 'throttled' replies
+"""
+
+import sys
+import os
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from admission import AdmissionController, RateLimiter, TokenBucket, parse_limits, DEFAULT_LIMITS
+from test_server import ProtocolClient, start_server
+
+
+def test_token_bucket():
+    """Test burst, refill and retry time of a token bucket"""
+    print("Testing token bucket...")
+
+    bucket = TokenBucket(rate=10.0, burst=3, now=0.0)
+    assert [bucket.take(now=0.0) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert abs(bucket.take(now=0.0) - 0.1) < 1e-9  # Next token in 1/rate seconds
+    assert bucket.take(now=0.1) == 0.0
+    assert bucket.take(now=10.0) == 0.0  # Refill is capped at the burst size
+    assert bucket.tokens == 2.0
+    print("✓ Token bucket works")
+
+
+def test_idle_buckets_expire():
+    """Test that buckets are only dropped once they have refilled"""
+    print("\nTesting idle bucket expiry...")
+
+    limiter = RateLimiter({'message': (1.0, 2)}, sweep_interval=10.0)
+    limiter.next_sweep = 10.0
+    assert [limiter.check('bot', 'message', now=0.0) for _ in range(2)] == [0.0, 0.0]
+    assert limiter.check('bot', 'message', now=0.0) > 0  # Reconnecting does not help
+    limiter.check('alice', 'message', now=9.5)
+    limiter.check('alice', 'message', now=10.0)  # Sweeps: bot's bucket is full again
+    assert list(limiter.buckets) == [('alice', 'message')]
+    print("✓ Idle buckets expire")
+
+
+def test_parse_limits():
+    """Test the --rate-limits syntax"""
+    print("\nTesting rate limit parsing...")
+
+    assert parse_limits('default') == DEFAULT_LIMITS
+    assert parse_limits('message=20/40,file_transfer=2') == {'message': (20.0, 40), 'file_transfer': (2.0, 2)}
+    print("✓ Rate limits parsed")
+
+
+def test_rate_limited_client():
+    """Test that a client over its quota gets 'throttled' replies and others do not"""
+    print("\nTesting per-user rate limits...")
+
+    server = start_server()
+    AdmissionController(limits={'message': (5.0, 3)}).attach(server)
+    alice = ProtocolClient(server.port, 'alice')
+    bob = ProtocolClient(server.port, 'bob')
+
+    for i in range(5):
+        alice.send({'type': 'message', 'recipient': 'bob', 'content': str(i), 'sent_at': i})
+    throttled = alice.wait_for('throttled')
+    assert throttled['request'] == 'message'
+    assert throttled['reason'] == 'rate_limit'
+    assert 0 < throttled['retry_after'] <= 0.2
+    assert throttled['sent_at'] == 3
+    assert [bob.wait_for('message')['content'] for _ in range(3)] == ['0', '1', '2']
+
+    # Bob has his own bucket
+    bob.send({'type': 'message', 'recipient': 'alice', 'content': 'hi'})
+    assert alice.wait_for('message')['content'] == 'hi'
+
+    # After waiting, alice may send again
+    time.sleep(0.5)
+    alice.send({'type': 'message', 'recipient': 'bob', 'content': 'later'})
+    assert bob.wait_for('message')['content'] == 'later'
+
+    alice.close()
+    bob.close()
+    print("✓ Over-quota requests throttled")
+
+
+def test_load_shedding():
+    """Test that fan-out requests are refused while queued output is too large"""
+    print("\nTesting load shedding...")
+
+    server = start_server()
+    controller = AdmissionController(max_queued_bytes=1000)
+    controller.attach(server)
+    alice = ProtocolClient(server.port, 'alice')
+
+    server.sending_bytes = 5000  # Pretend a lot of output is stuck
+    alice.send({'type': 'message', 'recipient': 'all', 'content': 'x'})
+    throttled = alice.wait_for('throttled')
+    assert throttled['reason'] == 'overload'
+    assert controller.shedding == 'queued_output'
+
+    # Control requests are never shed
+    alice.send({'type': 'get_users'})
+    assert alice.wait_for('users_list')['users'] == ['alice']
+
+    server.sending_bytes = 0
+    time.sleep(throttled['retry_after'])
+    alice.send({'type': 'message', 'recipient': 'all', 'content': 'x'})
+    assert alice.wait_for('message_sent')['status'] == 'success'
+    assert controller.shedding is None
+
+    alice.close()
+    print("✓ Load shed while overloaded")
+
+
+if __name__ == "__main__":
+    test_token_bucket()
+    test_idle_buckets_expire()
+    test_parse_limits()
+    test_rate_limited_client()
+    test_load_shedding()
@@ -0,0 +1,139 @@
+"""
+Event Engine Tests for Computer Networks Chat Application
+Runs an EventChatServer on localhost and talks to it over TCP
+"""
+
+import base64
+import socket
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from event_server import EventChatServer
+from test_server import ProtocolClient
+
+
+def start_event_server(**kwargs):
+    """Start an EventChatServer on a free localhost port"""
+    server = EventChatServer(host='127.0.0.1', port=0, **kwargs)
+    threading.Thread(target=server.start, daemon=True).start()
+    assert server.ready.wait(5)
+    return server
+
+
+def test_event_private_message():
+    """Test login and private message delivery through the event loop"""
+    print("Testing event engine private message...")
+
+    server = start_event_server()
+    alice = ProtocolClient(server.port, 'alice')
+    bob = ProtocolClient(server.port, 'bob')
+
+    alice.send({'type': 'message', 'recipient': 'bob', 'content': 'hi bob'})
+    message = bob.wait_for('message')
+    assert message['sender'] == 'alice'
+    assert alice.wait_for('message_sent')['status'] == 'success'
+
+    alice.close()
+    bob.close()
+    print("✓ Private message delivered")
+
+
+def test_event_partial_writes():
+    """Test a file far larger than the socket buffers reaching a slow reader"""
+    print("\nTesting partial writes to a slow reader...")
+
+    server = start_event_server()
+    alice = ProtocolClient(server.port, 'alice')
+    bob = ProtocolClient(server.port, 'bob')
+
+    filedata = base64.b64encode(os.urandom(6 * 1024 * 1024)).decode('utf-8')
+    alice.send({'type': 'file_transfer', 'recipient': 'bob', 'filename': 'big.bin', 'filedata': filedata})
+    alice.send({'type': 'message', 'recipient': 'bob', 'content': 'after the file'})
+
+    # While bob is not reading the server must keep serving others
+    time.sleep(0.2)
+    carol = ProtocolClient(server.port, 'carol')
+    carol.send({'type': 'message', 'recipient': 'alice', 'content': 'still there?'})
+    assert alice.wait_for('message')['content'] == 'still there?'
+
+    assert bob.wait_for('file_transfer')['filedata'] == filedata
+    assert bob.wait_for('message')['content'] == 'after the file'
+
+    for client in (alice, bob, carol):
+        client.close()
+    print("✓ Large file delivered intact while other clients were served")
+
+
+def test_event_output_limit():
+    """Test that a client that never reads is disconnected at the buffer limit"""
+    print("\nTesting output buffer limit...")
+
+    server = start_event_server(max_output_buffer=256 * 1024)
+    alice = ProtocolClient(server.port, 'alice')
+    bob = ProtocolClient(server.port, 'bob')
+    bob.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+
+    filedata = base64.b64encode(os.urandom(200000)).decode('utf-8')
+    for _ in range(20):
+        alice.send({'type': 'file_transfer', 'recipient': 'bob', 'filename': 'a.bin', 'filedata': filedata})
+
+    left = alice.wait_for('user_left')
+    assert left['username'] == 'bob'
+    assert 'bob' not in left['online_users']
+
+    alice.close()
+    bob.close()
+    print("✓ Stalled client disconnected")
+
+
+def test_event_file_beyond_output_limit():
+    """Test that one file larger than the output buffer limit still gets through"""
+    print("\nTesting a file beyond the buffer limit...")
+
+    server = start_event_server(max_output_buffer=1024 * 1024)
+    alice = ProtocolClient(server.port, 'alice')
+    bob = ProtocolClient(server.port, 'bob')
+    bob.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 64 * 1024)
+
+    filedata = base64.b64encode(os.urandom(3 * 1024 * 1024)).decode('utf-8')
+    alice.send({'type': 'file_transfer', 'recipient': 'bob', 'filename': 'big.bin', 'filedata': filedata})
+    assert alice.wait_for('file_progress')['status'] == 'sent'
+    time.sleep(0.2)  # Bob reads only now
+
+    assert bob.wait_for('file_transfer')['filedata'] == filedata
+    assert 'bob' in server.online_users()
+
+    alice.close()
+    bob.close()
+    print("✓ Large file delivered without a disconnect")
+
+
+def test_event_many_connections():
+    """Test a broadcast reaching a few hundred connections on one thread"""
+    print("\nTesting many connections...")
+
+    server = start_event_server()
+    clients = [ProtocolClient(server.port, f'user{i}') for i in range(200)]
+
+    clients[0].send({'type': 'message', 'recipient': 'all', 'content': 'hello everyone'})
+    for client in clients[1:]:
+        assert client.wait_for('message')['content'] == 'hello everyone'
+    assert server.loop_thread is not None
+    assert len(server.connections) == 200
+
+    for client in clients:
+        client.close()
+    print("✓ Broadcast delivered to 199 connections")
+
+
+if __name__ == "__main__":
+    test_event_private_message()
+    test_event_partial_writes()
+    test_event_output_limit()
+    test_event_file_beyond_output_limit()
+    test_event_many_connections()
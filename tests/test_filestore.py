@@ -0,0 +1,155 @@
+"""
+File Store Tests for Computer Networks Chat Application
+Tests the content-addressed file store and deduplicated file transfers
+"""
+
+import base64
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from filestore import FileStore, file_hash
+from test_event_server import start_event_server
+from test_server import ProtocolClient, start_server
+
+
+def encoded(data):
+    return base64.b64encode(data).decode('utf-8')
+
+
+def test_file_store_lru():
+    """Test hash verification and least recently used eviction"""
+    print("Testing file store...")
+
+    files = [os.urandom(300) for _ in range(3)]  # 400 bytes each once encoded
+    store = FileStore(max_bytes=1000)
+    for data in files[:2]:
+        assert store.put(file_hash(data), encoded(data))
+    assert store.get(file_hash(files[0])) == encoded(files[0])
+
+    # The third file evicts the least recently used one (files[1])
+    assert store.put(file_hash(files[2]), encoded(files[2]))
+    assert file_hash(files[1]) not in store
+    assert file_hash(files[0]) in store
+    assert store.size == 800 and store.evicted == 1
+
+    # Data that does not match its hash, bad base64 and oversized files are refused
+    assert not store.put(file_hash(files[0]), encoded(files[1]))
+    assert not store.put(file_hash(b'x'), 'not base64!')
+    big = os.urandom(1000)
+    assert not store.put(file_hash(big), encoded(big))
+    assert store.get(['not', 'a', 'hash']) is None
+    assert len(store) == 2
+
+    # Files are only handed to the users who uploaded them, if asked
+    assert store.put(file_hash(files[0]), encoded(files[0]), 'alice')
+    assert store.get(file_hash(files[0]), 'alice') == encoded(files[0])
+    assert store.get(file_hash(files[0]), 'eve') is None
+    print("✓ File store verifies hashes and evicts LRU files")
+
+
+def test_deduplicated_transfer():
+    """Test that a file is uploaded once and then forwarded from the store"""
+    print("\nTesting deduplicated file transfer...")
+
+    server = start_server()
+    alice = ProtocolClient(server.port, 'alice')
+    bob = ProtocolClient(server.port, 'bob')
+    carol = ProtocolClient(server.port, 'carol')
+
+    data = os.urandom(50000)
+    digest = file_hash(data)
+    offer = {'type': 'file_offer', 'recipient': 'bob', 'filename': 'build.zip', 'sha256': digest}
+
+    # First offer: the server asks for the upload
+    alice.send(offer)
+    assert alice.wait_for('file_offer_response')['status'] == 'upload'
+    alice.send({'type': 'file_transfer', 'recipient': 'bob', 'filename': 'build.zip',
+                'filedata': encoded(data), 'sha256': digest})
+    received = bob.wait_for('file_transfer')
+    assert base64.b64decode(received['filedata']) == data
+    assert received['sha256'] == digest
+
+    # Second recipient: no upload, the server forwards its copy
+    alice.send(dict(offer, recipient='carol'))
+    response = alice.wait_for('file_offer_response')
+    assert response['status'] == 'stored' and response['recipient'] == 'carol'
+    received = carol.wait_for('file_transfer')
+    assert base64.b64decode(received['filedata']) == data
+    assert received['sender'] == 'alice' and received['filename'] == 'build.zip'
+    assert server.file_store.hits == 1
+
+    # Knowing the hash is not enough to get the file
+    eve = ProtocolClient(server.port, 'eve')
+    eve.send(dict(offer, recipient='carol'))
+    assert eve.wait_for('file_offer_response')['status'] == 'upload'
+    eve.send(dict(offer, recipient='eve'))
+    assert eve.wait_for('error')['request'] == 'file_offer'
+    eve.send({'type': 'get_users'})
+    eve.wait_for('users_list')  # Answered after anything the offers sent
+    assert all(message['type'] != 'file_transfer' for message in eve.pending)
+    eve.close()
+
+    # Without a store every offer needs an upload
+    server.file_store = None
+    alice.send(offer)
+    assert alice.wait_for('file_offer_response')['status'] == 'upload'
+
+    for client in (alice, bob, carol):
+        client.close()
+    print("✓ Repeated file forwarded without a second upload")
+
+
+def check_group_transfer(server):
+    alice = ProtocolClient(server.port, 'alice')
+    members = [ProtocolClient(server.port, name) for name in ('bob', 'carol', 'dave')]
+    alice.send({'type': 'group_create', 'group_name': 'team', 'members': ['alice', 'bob', 'carol', 'dave']})
+
+    # One upload addressed to the group reaches every other member
+    data = os.urandom(200000)
+    alice.send({'type': 'file_transfer', 'group_name': 'team', 'filename': 'slides.pdf',
+                'filedata': encoded(data), 'sha256': file_hash(data)})
+    for member in members:
+        received = member.wait_for('file_transfer')
+        assert base64.b64decode(received['filedata']) == data
+        assert received['group_name'] == 'team'
+    progress = [alice.wait_for('file_progress') for _ in members]
+    assert sorted(p['recipient'] for p in progress) == ['bob', 'carol', 'dave']
+    assert [p['done'] for p in progress] == [1, 2, 3]
+    assert all(p['status'] == 'sent' and p['total'] == 3 for p in progress)
+    assert len({p['transfer_id'] for p in progress}) == 1
+
+    # A list of users, including one who is not online, offered by hash only
+    alice.send({'type': 'file_offer', 'recipients': ['bob', 'erin', 'carol'],
+                'filename': 'slides.pdf', 'sha256': file_hash(data)})
+    response = alice.wait_for('file_offer_response')
+    assert response['status'] == 'stored' and response['recipients'] == ['bob', 'erin', 'carol']
+    for member in members[:2]:
+        assert base64.b64decode(member.wait_for('file_transfer')['filedata']) == data
+    statuses = {}
+    for _ in range(3):
+        update = alice.wait_for('file_progress')
+        statuses[update['recipient']] = update['status']
+    assert statuses == {'bob': 'sent', 'carol': 'sent', 'erin': 'offline'}
+
+    alice.close()
+    for member in members:
+        member.close()
+
+
+def test_group_file_transfer():
+    """Test a file sent once to a group and to a list of users"""
+    print("\nTesting group file transfer...")
+
+    check_group_transfer(start_server())
+    print("✓ Threaded engine fanned out one upload")
+    check_group_transfer(start_event_server())
+    print("✓ Event engine fanned out one upload")
+
+
+if __name__ == "__main__":
+    test_file_store_lru()
+    test_deduplicated_transfer()
+    test_group_file_transfer()
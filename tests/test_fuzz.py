@@ -0,0 +1,89 @@
+"""
+Malformed Input Tests for Computer Networks Chat Application
+Checks that invalid messages are refused and that a short protocol fuzz
+run (bench/fuzz.py) leaves every engine working and without leftovers
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'bench'))
+
+from event_server import EventChatServer
+from fuzz import KINDS, healthy, run_fuzz
+from pool_server import PooledChatServer
+from server import ChatServer, invalid_field
+from test_server import ProtocolClient, start_server
+
+
+def test_invalid_fields():
+    """Test that messages with missing or mistyped fields get an error reply"""
+    print("Testing invalid fields...")
+
+    assert invalid_field('message', {'recipient': 'bob', 'content': 'hi'}) is None
+    assert invalid_field('message', {'content': 'hi'}) == 'recipient'
+    assert invalid_field('login', {'username': ''}) == 'username'
+    assert invalid_field('group_create', {'group_name': 'team', 'members': ['a', 1]}) == 'members'
+    assert invalid_field('file_offer', {'sha256': None, 'recipient': 'bob'}) is None
+    assert invalid_field('ping', {'anything': []}) is None
+
+    server = start_server()
+    alice = ProtocolClient(server.port, 'alice')
+    bob = ProtocolClient(server.port, 'bob')
+
+    # A login with an unusable name is refused; the session stays as it was
+    alice.send({'type': 'login', 'username': ['x']})
+    reply = alice.wait_for('login_response')
+    assert reply['status'] == 'error' and 'username' in reply['message']
+    assert sorted(server.online_users()) == ['alice', 'bob']
+
+    alice.send({'type': 'message', 'recipient': 7, 'content': 'hi'})
+    reply = alice.wait_for('error')
+    assert reply['request'] == 'message' and 'recipient' in reply['message']
+    alice.send({'type': 'group_create', 'group_name': 'team', 'members': 'alice'})
+    assert alice.wait_for('error')['request'] == 'group_create'
+    alice.send({'type': ['message'], 'recipient': 'bob'})  # Ignored
+
+    # The connection keeps working
+    alice.send({'type': 'message', 'recipient': 'bob', 'content': 'still here'})
+    assert bob.wait_for('message')['content'] == 'still here'
+    alice.close()
+    bob.close()
+    print("✓ Invalid messages are refused")
+
+
+def check_fuzz(server):
+    """Fuzz a running server briefly, then check that nothing is left over"""
+    server.max_frame_size = 64 * 1024
+    threading.Thread(target=server.start, daemon=True).start()
+    assert server.ready.wait(5)
+
+    outcomes, failures = run_fuzz('127.0.0.1', server.port, 10 * len(KINDS), seed=3,
+                                  max_frame_size=server.max_frame_size)
+    assert not failures, sorted(set(failures))
+    assert outcomes['oversized'] == {'closed': 10}
+
+    deadline = time.time() + 5
+    while (len(server.sessions) or server.connection_count) and time.time() < deadline:
+        time.sleep(0.05)
+    assert len(server.sessions) == 0 and server.connection_count == 0
+    assert healthy('127.0.0.1', server.port)
+
+
+def test_fuzz_engines():
+    """Test that malformed input neither breaks nor leaks in any engine"""
+    print("\nTesting malformed input on every engine...")
+
+    for cls in (ChatServer, EventChatServer, PooledChatServer):
+        check_fuzz(cls(host='127.0.0.1', port=0))
+        print(f"  {cls.__name__} ok")
+    print("✓ Every engine survives the fuzz run")
+
+
+if __name__ == "__main__":
+    test_invalid_fields()
+    test_fuzz_engines()
@@ -0,0 +1,92 @@
+"""
+Heartbeat Tests for Computer Networks Chat Application
+Tests the timer wheel and reaping of silent connections
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from event_server import EventChatServer
+from heartbeat import HeartbeatMonitor, TimerWheel
+from server import ChatServer
+from test_server import ProtocolClient
+
+
+def test_timer_wheel():
+    """Test expiry, cancellation and delays longer than one turn"""
+    print("Testing timer wheel...")
+
+    wheel = TimerWheel(tick=1.0, slots=8, now=0.0)
+    wheel.schedule('a', 2.0)
+    wheel.schedule('b', 3.5)
+    wheel.schedule('c', 20.0)  # More than two turns of the wheel
+    wheel.schedule('d', 2.0)
+    wheel.cancel('d')
+
+    assert wheel.advance(now=1.0) == []
+    assert wheel.advance(now=2.0) == ['a']
+    assert wheel.advance(now=4.0) == ['b']
+    wheel.schedule('a', 1.0)  # Rescheduling after expiry
+    assert wheel.advance(now=5.0) == ['a']
+    assert wheel.advance(now=19.0) == []
+    assert wheel.advance(now=20.0) == ['c']
+    assert len(wheel) == 0
+    print("✓ Timer wheel works")
+
+
+def check_reaping(server):
+    """A client answering pings stays, a silent one is reaped"""
+    HeartbeatMonitor(interval=0.3, timeout=0.3, tick=0.05).attach(server)
+    threading.Thread(target=server.start, daemon=True).start()
+    assert server.ready.wait(5)
+
+    alice = ProtocolClient(server.port, 'alice')
+    ghost = ProtocolClient(server.port, 'ghost')  # Never reads or answers
+
+    pongs = 0
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        message = alice.wait_for_any()
+        if message['type'] == 'ping':
+            alice.send({'type': 'pong'})
+            pongs += 1
+        elif message['type'] == 'user_left':
+            assert message['username'] == 'ghost'
+            assert message['online_users'] == ['alice']
+            break
+    else:
+        raise AssertionError("ghost was not reaped")
+
+    assert pongs >= 1
+    assert server.heartbeat.reaped == 1
+    alice.send({'type': 'get_users'})
+    assert alice.wait_for('users_list')['users'] == ['alice']
+    alice.close()
+    ghost.close()
+
+
+def test_threaded_engine_reaping():
+    """Test reaping with the thread-per-client engine"""
+    print("\nTesting heartbeat reaping (threads)...")
+
+    check_reaping(ChatServer(host='127.0.0.1', port=0))
+    print("✓ Silent connection reaped")
+
+
+def test_event_engine_reaping():
+    """Test reaping with the event loop engine"""
+    print("\nTesting heartbeat reaping (event loop)...")
+
+    check_reaping(EventChatServer(host='127.0.0.1', port=0))
+    print("✓ Silent connection reaped")
+
+
+if __name__ == "__main__":
+    test_timer_wheel()
+    test_threaded_engine_reaping()
+    test_event_engine_reaping()
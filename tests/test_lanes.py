@@ -0,0 +1,145 @@
+"""
+Priority Lane Tests for Computer Networks Chat Application
+Tests file chunking, the lane scheduler and that chat messages overtake
+a large file on the same connection in every engine
+"""
+
+import base64
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from event_server import EventChatServer
+from lanes import BULK, CHAT, CONTROL, FileAssembler, FrameStream, LaneQueue, file_frames, lane_of
+from messages import FileMessage
+from pool_server import PooledChatServer
+from server import ChatServer
+from test_server import ProtocolClient
+
+
+def test_file_chunks():
+    """Test that large files are split into chunks and joined again"""
+    print("Testing file chunks...")
+
+    assert lane_of({'type': 'user_joined'}) == CONTROL
+    assert lane_of({'type': 'group_message'}) == CHAT
+    assert lane_of(FileMessage(1, 'alice', 'a.bin', 'x')) == BULK
+
+    filedata = base64.b64encode(os.urandom(3000)).decode('ascii')
+    upload = FileMessage(5, 'alice', 'a.bin', filedata, sha256='abc')
+    upload.sent_at = 42
+    frames = [json.loads(frame) for frame in file_frames(upload, chunk_size=1000)]
+    assert [frame['type'] for frame in frames] == ['file_chunk'] * 3 + ['file_transfer']
+    assert all(len(frame['filedata']) == 1000 for frame in frames[:3])
+    assert frames[-1]['chunks'] == 3 and frames[-1]['sent_at'] == 42
+
+    files = FileAssembler()
+    assert [files.add(frame) for frame in frames[:3]] == [None] * 3
+    joined = files.add(frames[-1])
+    assert joined == dict(upload.to_dict(), filedata=filedata) and not files.chunks
+    try:
+        files.add(frames[-1])  # Its chunks were not received
+        assert False, "incomplete file accepted"
+    except ValueError:
+        pass
+
+    # Files from two nodes may share a msg_id; their chunks are told apart by history_id
+    routed = dict(upload.to_dict(), filedata=filedata[::-1], history_id='node1')
+    other = [json.loads(frame) for frame in file_frames(routed, chunk_size=1000)]
+    assert all(frame['history_id'] == 'node1' for frame in other)
+    for mine, theirs in zip(frames[:3], other[:3]):
+        assert files.add(mine) is None and files.add(theirs) is None
+    assert files.add(other[-1])['filedata'] == filedata[::-1]
+    assert files.add(frames[-1])['filedata'] == filedata
+
+    # Small files stay one frame
+    assert len(file_frames(FileMessage(6, 'alice', 'b.bin', 'aGk='))) == 1
+    print("✓ Files are sent in chunks")
+
+
+def test_lane_queue():
+    """Test that the scheduler interleaves lanes by their weights"""
+    print("\nTesting lane scheduling...")
+
+    queue = LaneQueue()
+    chunk = b'b' * 16 * 1024
+    for _ in range(20):
+        queue.push(BULK, chunk)
+    assert queue.pop() == chunk  # Only bulk frames: no waiting for turns
+    queue.push(CHAT, b'chat')
+    queue.push(CONTROL, b'ping')
+    order = [queue.pop() for _ in range(4)]
+    assert b'chat' in order and b'ping' in order
+    while queue.pop() is not None:
+        pass
+    assert not queue and queue.bytes == 0
+
+    # With every lane busy the bytes are shared 4:2:1
+    sent = {CONTROL: 0, CHAT: 0, BULK: 0}
+    for lane in sent:
+        for _ in range(200):
+            queue.push(lane, bytes([lane]) * 1024)
+    for _ in range(140):
+        sent[queue.pop()[0]] += 1
+    assert sent[CONTROL] > sent[CHAT] > sent[BULK] > 0, sent
+    queue.clear()
+
+    # A file's frames are taken from its stream only when they are next
+    frames = [b'1' * 1000, b'2' * 1000, b'3' * 10]
+    queue.push_stream(BULK, FrameStream(frames))
+    assert queue and queue.bytes == 0 and queue.streamed == 2010 and queue.largest_stream() == 2010
+    assert queue.pop() == frames[0] and queue.streamed == 1010
+    queue.push(CHAT, b'chat')
+    rest = list(iter(queue.pop, None))
+    assert sorted(rest) == sorted([b'chat', frames[1], frames[2]]) and rest.index(frames[1]) < rest.index(frames[2])
+    assert not queue and queue.bytes == 0 and queue.streamed == 0
+    print("✓ Lanes are interleaved")
+
+
+def check_chat_overtakes_file(server):
+    """A message sent while a large file is stuck on its way to bob arrives first"""
+    threading.Thread(target=server.start, daemon=True).start()
+    assert server.ready.wait(5)
+    alice = ProtocolClient(server.port, 'alice')
+    carol = ProtocolClient(server.port, 'carol')
+    bob = ProtocolClient(server.port, 'bob')
+    bob.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 64 * 1024)
+
+    # Bob does not read for now, so most of the file stays queued in the server
+    filedata = base64.b64encode(os.urandom(6 * 1024 * 1024)).decode('ascii')
+    alice.send({'type': 'file_transfer', 'recipient': 'bob', 'filename': 'big.bin', 'filedata': filedata})
+    time.sleep(0.5)
+    carol.send({'type': 'message', 'recipient': 'bob', 'content': 'quick question'})
+    time.sleep(0.5)  # The threaded engine holds carol's handler until bob has the message
+
+    arrived = []
+    while 'file_transfer' not in arrived:
+        arrived.append(bob.wait_for_any()['type'])
+    assert 'message' in arrived, arrived
+    bob.pending.clear()
+    alice.send({'type': 'message', 'recipient': 'bob', 'content': 'done'})
+    assert bob.wait_for('message')['content'] == 'done'
+    for client in (alice, bob, carol):
+        client.close()
+
+
+def test_chat_overtakes_file():
+    """Test that chat messages do not wait for a large file in any engine"""
+    print("\nTesting chat during a file transfer...")
+
+    for cls in (ChatServer, EventChatServer, PooledChatServer):
+        check_chat_overtakes_file(cls(host='127.0.0.1', port=0))
+        print(f"  {cls.__name__} ok")
+    print("✓ Chat messages overtake files")
+
+
+if __name__ == "__main__":
+    test_file_chunks()
+    test_lane_queue()
+    test_chat_overtakes_file()
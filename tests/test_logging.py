@@ -0,0 +1,51 @@
+"""
+Logging Tests for Computer Networks Chat Application
+Tests the queue-based, sampled server logging
+"""
+
+import io
+import logging
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import server_logging
+
+
+def test_sampling_filter():
+    """Test that the sampling filter keeps the configured fraction"""
+    print("Testing sampling filter...")
+    
+    record = logging.LogRecord('test', logging.INFO, __file__, 1, 'msg', None, None)
+    
+    assert all(server_logging.SamplingFilter(1.0).filter(record) for _ in range(100))
+    assert not any(server_logging.SamplingFilter(0.0).filter(record) for _ in range(100))
+    
+    kept = sum(server_logging.SamplingFilter(0.5).filter(record) for _ in range(10000))
+    assert 4000 < kept < 6000
+    print("✓ Sampling filter working correctly")
+
+
+def test_queue_logging():
+    """Test that records are written by the background listener"""
+    print("\nTesting queue logging...")
+    
+    stream = io.StringIO()
+    listener = server_logging.setup_logging(level='INFO', message_level='WARNING', stream=stream)
+    try:
+        server_logging.get_logger().info("alice logged in", extra={'fields': {'user': 'alice'}})
+        server_logging.get_message_logger().info("dropped per-message event")
+    finally:
+        listener.stop()
+    
+    output = stream.getvalue()
+    assert "[SERVER] INFO alice logged in user=alice" in output
+    assert "dropped per-message event" not in output
+    print("✓ Queue logging working correctly")
+
+
+if __name__ == "__main__":
+    test_sampling_filter()
+    test_queue_logging()
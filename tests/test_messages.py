@@ -0,0 +1,107 @@
+"""
+Message Model Tests for Computer Networks Chat Application
+Tests the message objects, their wire form and the message dispatch
+"""
+
+import sys
+import os
+import json
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from messages import ChatMessage, FileMessage, GroupMessage, format_time, from_dict, parse_time
+from protocol import encode_message
+from snapshot import StateSnapshots
+from server import ChatServer
+from sync import conversation_of
+from test_server import ProtocolClient, start_server
+
+
+def test_message_objects():
+    """Test the wire form, dict-style reads and decoding of messages"""
+    print("Testing message objects...")
+
+    message = ChatMessage(7, 'alice', 'bob', 'hi', timestamp=1700000000.5)
+    assert not hasattr(message, '__dict__')
+    assert message.to_dict() == {'type': 'message', 'msg_id': 7, 'sender': 'alice', 'recipient': 'bob',
+                                 'content': 'hi', 'timestamp': 1700000000.5}
+    assert message['msg_id'] == 7 and message.get('type') == 'message'
+    assert message.get('sent_at') is None and message.get('filedata', 'none') == 'none'
+    try:
+        message['sent_at']
+        assert False, "unset optional field returned"
+    except KeyError:
+        pass
+    assert conversation_of(message, 'bob') == 'user:alice'
+
+    message.sent_at = 123.0
+    message.trace = True
+    decoded = json.loads(encode_message({'type': 'sync_response', 'messages': [message]}))
+    assert decoded['messages'][0] == dict(message.to_dict(), sent_at=123.0, trace=True)
+
+    group = from_dict({'type': 'group_message', 'msg_id': 3, 'sender': 'bob', 'group_name': 'team',
+                       'content': 'old', 'timestamp': '2024-01-01 12:00:00'})
+    assert isinstance(group, GroupMessage) and group.timestamp == parse_time('2024-01-01 12:00:00')
+    assert format_time(group.timestamp) == '2024-01-01 12:00:00'
+    assert format_time('2024-01-01 12:00:00') == '2024-01-01 12:00:00'
+    assert from_dict({'type': 'pong'}) == {'type': 'pong'}
+
+    upload = FileMessage(9, 'alice', 'a.txt', 'aGk=')
+    assert 'sha256' not in upload.to_dict() and upload.to_dict()['filedata'] == 'aGk='
+    print("✓ Message objects work")
+
+
+def test_dispatch():
+    """Test that messages reach their handler, and only after login"""
+    print("\nTesting message dispatch...")
+
+    server = start_server()
+    alice = ProtocolClient(server.port, 'alice')
+    bob = ProtocolClient(server.port, 'bob')
+
+    # Unknown types are ignored; the connection keeps working
+    alice.send({'type': 'no_such_type'})
+    before = time.time()
+    alice.send({'type': 'message', 'recipient': 'bob', 'content': 'hello'})
+    received = bob.wait_for('message')
+    assert received['content'] == 'hello' and before - 1 <= received['timestamp'] <= time.time() + 1
+    assert isinstance(server.chat_history.recent(1)[0], ChatMessage)
+
+    # Before login only login, ping and pong are handled
+    assert server.process_message(None, None, None, {'type': 'get_users'}) is None
+    assert server.process_message(None, None, None, {'type': 'message', 'content': 'x'}) is None
+    assert len(server.chat_history) == 1
+
+    alice.close()
+    bob.close()
+    print("✓ Messages are dispatched by type")
+
+
+def test_restored_history_objects():
+    """Test that history restored from a snapshot holds message objects"""
+    print("\nTesting restored history...")
+
+    path = os.path.join(tempfile.mkdtemp(prefix='chat-state-'), 'chat.state')
+    server = ChatServer(host='127.0.0.1', port=0)
+    server.server_socket.close()
+    server.store_message(ChatMessage(next(server.message_ids), 'alice', 'all', 'kept'))
+    StateSnapshots(path).attach(server)
+    server.snapshots.save()
+    assert isinstance(server.chat_history.recent(1)[0], ChatMessage)
+
+    restarted = ChatServer(host='127.0.0.1', port=0)
+    restarted.server_socket.close()
+    StateSnapshots(path).attach(restarted)
+    assert restarted.snapshots.restore()
+    restored = restarted.chat_history.recent(1)[0]
+    assert isinstance(restored, ChatMessage) and restored.content == 'kept'
+    print("✓ Restored history holds message objects")
+
+
+if __name__ == "__main__":
+    test_message_objects()
+    test_dispatch()
+    test_restored_history_objects()
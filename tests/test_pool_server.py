@@ -0,0 +1,95 @@
+"""
+Worker Pool Engine Tests for Computer Networks Chat Application
+Runs a PooledChatServer on localhost and talks to it over TCP
+"""
+
+import socket
+import sys
+import os
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pool_server import PooledChatServer
+from protocol import FrameReader, RECV_SIZE, encode_message
+from test_server import ProtocolClient
+
+
+def start_pool_server(**kwargs):
+    """Start a PooledChatServer on a free localhost port"""
+    server = PooledChatServer(host='127.0.0.1', port=0, **kwargs)
+    threading.Thread(target=server.start, daemon=True).start()
+    assert server.ready.wait(5)
+    return server
+
+
+def test_pool_message_order():
+    """Test that pipelined messages of one client keep their order"""
+    print("Testing message order on the worker pool...")
+
+    server = start_pool_server(workers=4, max_inbox=8)
+    alice = ProtocolClient(server.port, 'alice')
+    bob = ProtocolClient(server.port, 'bob')
+
+    # More messages than max_inbox in one write, so reading pauses and resumes
+    burst = b''.join(encode_message({'type': 'message', 'recipient': 'bob', 'content': str(i)})
+                     for i in range(300))
+    alice.socket.sendall(burst)
+    contents = [bob.wait_for('message')['content'] for _ in range(300)]
+    assert contents == [str(i) for i in range(300)]
+
+    alice.close()
+    bob.close()
+    print("✓ 300 pipelined messages delivered in order")
+
+
+def test_pool_fixed_threads():
+    """Test that the thread count does not grow with the number of users"""
+    print("\nTesting fixed thread count...")
+
+    server = start_pool_server(workers=3)
+    first = ProtocolClient(server.port, 'user0')
+    first.send({'type': 'get_users'})
+    first.wait_for('users_list')
+    threads_before = threading.active_count()
+
+    clients = [first] + [ProtocolClient(server.port, f'user{i}') for i in range(1, 150)]
+    clients[-1].send({'type': 'message', 'recipient': 'all', 'content': 'hello'})
+    for client in clients[:-1]:
+        assert client.wait_for('message')['content'] == 'hello'
+    assert threading.active_count() <= threads_before + 2  # pool threads start on demand
+
+    for client in clients:
+        client.close()
+    print(f"✓ 150 users served by {threading.active_count()} threads in total")
+
+
+def test_pool_max_connections():
+    """Test that connections beyond max_connections are refused with a reply"""
+    print("\nTesting max connections...")
+
+    server = start_pool_server(max_connections=2)
+    alice = ProtocolClient(server.port, 'alice')
+    bob = ProtocolClient(server.port, 'bob')
+
+    sock = socket.create_connection(('127.0.0.1', server.port), timeout=5)
+    reply = FrameReader().feed(sock.recv(RECV_SIZE))[0]
+    assert reply['type'] == 'login_response' and reply['status'] == 'error'
+    assert sock.recv(RECV_SIZE) == b''
+    sock.close()
+
+    # A slot frees up when a client leaves
+    bob.close()
+    alice.wait_for('user_left')
+    carol = ProtocolClient(server.port, 'carol')
+
+    alice.close()
+    carol.close()
+    print("✓ Connection refused while full and accepted after a client left")
+
+
+if __name__ == "__main__":
+    test_pool_message_order()
+    test_pool_fixed_threads()
+    test_pool_max_connections()
@@ -0,0 +1,56 @@
+"""
+Protocol Tests for Computer Networks Chat Application
+Tests newline-delimited JSON framing
+"""
+
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from protocol import FrameReader, encode_message
+
+
+def test_coalesced_frames():
+    """Test that several frames in one recv() are all decoded"""
+    print("Testing coalesced frames...")
+    
+    data = encode_message({'type': 'a'}) + encode_message({'type': 'b'})
+    messages = FrameReader().feed(data)
+    
+    assert [m['type'] for m in messages] == ['a', 'b']
+    print("✓ Coalesced frames decoded correctly")
+
+
+def test_split_frames():
+    """Test that a frame split over many recv() calls is reassembled"""
+    print("\nTesting split frames...")
+    
+    message = {'type': 'file_transfer', 'filedata': 'A' * 100000}
+    data = encode_message(message)
+    reader = FrameReader()
+    
+    received = []
+    for i in range(0, len(data), 4096):
+        received.extend(reader.feed(data[i:i + 4096]))
+    
+    assert received == [message]
+    print("✓ Split frame reassembled correctly")
+
+
+def test_malformed_frames_skipped():
+    """Test that invalid frames are skipped without losing valid ones"""
+    print("\nTesting malformed frames...")
+    
+    data = b'not json\n[1, 2]\n' + encode_message({'type': 'ok'})
+    messages = FrameReader().feed(data)
+    
+    assert messages == [{'type': 'ok'}]
+    print("✓ Malformed frames skipped correctly")
+
+
+if __name__ == "__main__":
+    test_coalesced_frames()
+    test_split_frames()
+    test_malformed_frames_skipped()
@@ -0,0 +1,205 @@
+"""
+Routing Tests for Computer Networks Chat Application
+Tests message routing between server nodes over the message bus
+"""
+
+import sys
+import os
+import base64
+import socket
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bus import BrokerBus, BusBroker, LocalBroker, LocalBus
+from routing import ClusterRouter
+from test_server import ProtocolClient, start_server
+
+
+def start_nodes(buses):
+    """Start one server per bus and join them into a cluster"""
+    servers = []
+    for node_id, bus in enumerate(buses):
+        server = start_server()
+        ClusterRouter(bus, f"node{node_id}").attach(server)
+        servers.append(server)
+    return servers
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_local_bus_routing():
+    """Test private, group and broadcast messages between two nodes"""
+    print("Testing routing over the local bus...")
+    
+    broker = LocalBroker()
+    first, second = start_nodes([LocalBus(broker), LocalBus(broker)])
+    alice = ProtocolClient(first.port, 'alice')
+    bob = ProtocolClient(second.port, 'bob')
+    wait_until(lambda: 'bob' in first.online_users() and 'alice' in second.online_users())
+    
+    alice.send({'type': 'message', 'recipient': 'bob', 'content': 'across nodes'})
+    received = bob.wait_for('message')
+    assert received['content'] == 'across nodes'
+    # The msg_id was assigned by the first node, not the one bob syncs with
+    assert received['history_id'] == first.history_id != bob.login_response['history_id']
+    
+    alice.send({'type': 'group_create', 'group_name': 'team', 'members': ['alice', 'bob']})
+    bob.wait_for('group_created')
+    wait_until(lambda: 'team' in second.groups)
+    bob.send({'type': 'group_message', 'group_name': 'team', 'content': 'group hello'})
+    assert alice.wait_for('group_message')['content'] == 'group hello'
+    
+    bob.send({'type': 'message', 'recipient': 'all', 'content': 'everyone'})
+    received = alice.wait_for('message')
+    assert received['content'] == 'everyone' and received['history_id'] == second.history_id
+    
+    bob.close()
+    wait_until(lambda: 'bob' not in first.online_users())
+    alice.close()
+    print("✓ Local bus routing working correctly")
+
+
+def test_three_node_cluster():
+    """Test a group spanning nodes over a TCP broker, and node failure"""
+    print("\nTesting three node cluster...")
+    
+    broker = BusBroker('127.0.0.1:0')
+    address = broker.start()
+    buses = [BrokerBus(address) for _ in range(3)]
+    nodes = start_nodes(buses)
+    alice = ProtocolClient(nodes[0].port, 'alice')
+    bob = ProtocolClient(nodes[1].port, 'bob')
+    carol = ProtocolClient(nodes[2].port, 'carol')
+    wait_until(lambda: sorted(nodes[0].online_users()) == ['alice', 'bob', 'carol'])
+    
+    # A user on node A messages a group spanning nodes B and C
+    alice.send({'type': 'group_create', 'group_name': 'bc', 'members': ['bob', 'carol']})
+    bob.wait_for('group_created')
+    carol.wait_for('group_created')
+    wait_until(lambda: 'bc' in nodes[0].groups)
+    
+    alice.send({'type': 'group_message', 'group_name': 'bc', 'content': 'hi B and C'})
+    assert bob.wait_for('group_message')['content'] == 'hi B and C'
+    assert carol.wait_for('group_message')['content'] == 'hi B and C'
+    
+    # When a node leaves the bus its users disappear from the directory
+    buses[2].close()
+    wait_until(lambda: 'carol' not in nodes[0].online_users())
+    
+    for client in (alice, bob, carol):
+        client.close()
+    broker.close()
+    print("✓ Three node cluster working correctly")
+
+
+def test_slow_client_does_not_stall_bus():
+    """Test that one slow recipient does not hold up other bus traffic"""
+    print("\nTesting a slow client behind the bus...")
+    
+    broker = LocalBroker()
+    buses = [LocalBus(broker), LocalBus(broker)]
+    first, second = start_nodes(buses)
+    alice = ProtocolClient(first.port, 'alice')
+    bob = ProtocolClient(second.port, 'bob')
+    carol = ProtocolClient(second.port, 'carol')
+    bob.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 64 * 1024)
+    wait_until(lambda: 'bob' in first.online_users() and 'carol' in first.online_users())
+    
+    # Bob does not read, so sends to him block on the second node
+    for _ in range(8):
+        alice.send({'type': 'message', 'recipient': 'bob', 'content': 'x' * 1024 * 1024})
+    # A payload that fails is skipped without stopping the bus
+    buses[1].inbox.put(('message', 'node0', {'kind': 'deliver'}))
+    
+    alice.send({'type': 'message', 'recipient': 'carol', 'content': 'not stuck'})
+    assert carol.wait_for('message')['content'] == 'not stuck'
+    
+    for client in (alice, bob, carol):
+        client.close()
+    print("✓ Slow clients do not stall the bus")
+
+
+def delivery_threads(*usernames):
+    names = {f"deliver-{username}" for username in usernames}
+    return {thread.name: thread.ident for thread in threading.enumerate() if thread.name in names}
+
+
+def test_broadcasts_reuse_delivery_threads():
+    """Test that bus broadcasts do not start a thread per message and user"""
+    print("\nTesting delivery threads under broadcasts...")
+    
+    broker = LocalBroker()
+    first, second = start_nodes([LocalBus(broker), LocalBus(broker)])
+    alice = ProtocolClient(first.port, 'alice')
+    bob = ProtocolClient(second.port, 'bob')
+    carol = ProtocolClient(second.port, 'carol')
+    wait_until(lambda: 'bob' in first.online_users() and 'carol' in first.online_users())
+    
+    alice.send({'type': 'message', 'recipient': 'all', 'content': 'first'})
+    for client in (bob, carol):
+        assert client.wait_for('message')['content'] == 'first'
+    threads = delivery_threads('bob', 'carol')
+    assert set(threads) == {'deliver-bob', 'deliver-carol'}
+    for i in range(50):
+        alice.send({'type': 'message', 'recipient': 'all', 'content': str(i)})
+    for client in (bob, carol):
+        assert [client.wait_for('message')['content'] for _ in range(50)] == [str(i) for i in range(50)]
+    assert delivery_threads('bob', 'carol') == threads
+    
+    # The thread of a user ends when they log out
+    bob.close()
+    wait_until(lambda: not delivery_threads('bob'))
+    for client in (alice, carol):
+        client.close()
+    print("✓ Delivery threads live as long as their user")
+
+
+def test_files_from_two_nodes():
+    """Test that files with the same msg_id from two nodes both arrive whole"""
+    print("\nTesting files from two nodes at once...")
+    
+    broker = LocalBroker()
+    first, second = start_nodes([LocalBus(broker), LocalBus(broker)])
+    alice = ProtocolClient(first.port, 'alice')
+    carol = ProtocolClient(second.port, 'carol')
+    bob = ProtocolClient(second.port, 'bob')
+    bob.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 64 * 1024)
+    wait_until(lambda: 'bob' in first.online_users())
+    
+    # Both are the first message of their node (msg_id 1); their chunks go to bob
+    # from the handler thread of carol and the bus delivery thread at once
+    files = {sender: base64.b64encode(os.urandom(3 * 1024 * 1024)).decode('ascii')
+             for sender in ('alice', 'carol')}
+    senders = [threading.Thread(target=client.send, args=({
+        'type': 'file_transfer', 'recipient': 'bob', 'filename': sender, 'filedata': files[sender]},))
+        for sender, client in (('alice', alice), ('carol', carol))]
+    for thread in senders:
+        thread.start()
+    received = {}
+    for _ in range(2):
+        message = bob.wait_for('file_transfer')
+        assert message['msg_id'] == 1
+        received[message['filename']] = message['filedata']
+    assert received == files
+    for thread in senders:
+        thread.join()
+    
+    for client in (alice, bob, carol):
+        client.close()
+    print("✓ Files from two nodes are told apart")
+
+
+if __name__ == "__main__":
+    test_local_bus_routing()
+    test_three_node_cluster()
+    test_slow_client_does_not_stall_bus()
+    test_broadcasts_reuse_delivery_threads()
+    test_files_from_two_nodes()
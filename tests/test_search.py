@@ -0,0 +1,145 @@
+"""
+Search Tests for Computer Networks Chat Application
+Tests the word index over the chat history and the search request
+"""
+
+import sys
+import os
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from protocol import encode_message
+from search import SearchIndex, conversation_key, tokenize
+from sessions import MessageHistory
+from snapshot import load_snapshot, write_snapshot
+from test_server import ProtocolClient, start_server
+
+
+def chat_message(msg_id, content, sender='alice', recipient='all'):
+    return {'type': 'message', 'msg_id': msg_id, 'sender': sender, 'recipient': recipient,
+            'content': content, 'timestamp': '2024-01-01 12:00:00'}
+
+
+def everyone(key):
+    return True
+
+
+def test_search_index():
+    """Test matching, visibility, conversation and time filters and paging"""
+    print("Testing search index...")
+
+    assert tokenize("Hello, hello WORLD!") == {'hello', 'world'}
+    assert tokenize(None) == set()
+    assert conversation_key(chat_message(1, '', 'bob', 'alice')) == 'pair:alice\0bob'
+
+    index = SearchIndex()
+    for i in range(1, 101):
+        index.add(chat_message(i, f"status report {i} {'urgent' if i % 10 == 0 else ''}"), arrived=1000 + i)
+    index.add(chat_message(102, 'urgent secret', 'bob', 'carol'), arrived=1102)
+    index.add(chat_message(101, 'urgent team', 'bob'), arrived=1101)  # Out of order
+    assert len(index) == 102 and list(index.ids) == sorted(index.ids)
+
+    assert index.search('URGENT report', everyone)[0] == [100, 90, 80, 70, 60, 50, 40, 30, 20, 10]
+    assert index.search('missing', everyone) == ([], False)
+    assert index.search('', everyone) == ([], False)
+
+    # Private messages only for the two people involved
+    def alice_sees(key):
+        return not key.startswith('pair:') or 'alice' in key.split(':', 1)[1].split('\0')
+    assert index.search('urgent', alice_sees)[0][:2] == [101, 100]
+    assert index.search('urgent', everyone)[0][:2] == [102, 101]
+    assert index.search('urgent', everyone, conversation='pair:bob\0carol')[0] == [102]
+
+    # Time range and paging
+    assert index.search('report', everyone, start=1010, end=1012)[0] == [12, 11, 10]
+    page, more = index.search('report', everyone, limit=40)
+    assert len(page) == 40 and more and page[0] == 100
+    page, more = index.search('report', everyone, before=page[-1], limit=40)
+    assert page[0] == 60 and more
+    page, more = index.search('report', everyone, before=page[-1], limit=40)
+    assert page == list(range(20, 0, -1)) and not more
+
+    index.prune(51)
+    assert index.search('urgent report', everyone)[0] == [100, 90, 80, 70, 60]
+    assert '50' not in index.postings and index.search('51', everyone)[0] == [51]
+    print("✓ Search index works")
+
+
+def test_history_indexed_in_front():
+    """Test indexing restored history behind messages already indexed"""
+    print("\nTesting indexing of restored history...")
+
+    index = SearchIndex()
+    index.add({'type': 'group_message', 'msg_id': 50, 'sender': 'bob', 'group_name': 'team',
+               'content': 'new findings'})
+    index.add_history(chat_message(i, f'old findings {i}') for i in range(1, 11))
+    assert list(index.ids) == list(range(1, 11)) + [50]
+    assert index.search('findings', everyone, limit=3)[0] == [50, 10, 9]
+    assert index.search('findings', everyone, conversation='group:team')[0] == [50]
+    assert index.search('old', everyone, conversation='all', limit=100)[0] == list(range(10, 0, -1))
+
+    history = MessageHistory(size=15)
+    path = os.path.join(tempfile.mkdtemp(prefix='chat-state-'), 'chat.state')
+    old = [chat_message(i, f'old findings {i}') for i in range(1, 11)]
+    write_snapshot(path, {}, ((m['msg_id'], encode_message(m)) for m in old), 11)
+    history.restore(load_snapshot(path).history)
+    history.append(chat_message(50, 'new findings'))
+    assert history.get(3) == old[2] and history.get(50)['content'] == 'new findings'
+    assert history.get(11) is None and history.oldest_id() == 1
+    print("✓ Restored history is indexed in front of new messages")
+
+
+def test_search_request():
+    """Test the search request against a running server"""
+    print("\nTesting search request...")
+
+    server = start_server()
+    alice = ProtocolClient(server.port, 'alice')
+    bob = ProtocolClient(server.port, 'bob')
+    carol = ProtocolClient(server.port, 'carol')
+    alice.send({'type': 'group_create', 'group_name': 'team', 'members': ['alice', 'bob']})
+    bob.wait_for('group_created')
+    started = time.time()
+
+    bob.send({'type': 'message', 'recipient': 'all', 'content': 'Deploy on Friday'})
+    bob.send({'type': 'message', 'recipient': 'alice', 'content': 'deploy key is ready'})
+    bob.send({'type': 'group_message', 'group_name': 'team', 'content': 'team deploy done'})
+    bob.wait_for('message_sent')
+    bob.wait_for('message_sent')
+    alice.wait_for('group_message')
+    carol.send({'type': 'message', 'recipient': 'bob', 'content': 'secret deploy'})
+    carol.wait_for('message_sent')
+
+    alice.send({'type': 'search', 'query': 'deploy'})
+    response = alice.wait_for('search_results')
+    assert response['status'] == 'success' and response['next_before'] is None
+    assert [m['content'] for m in response['results']] == \
+        ['team deploy done', 'deploy key is ready', 'Deploy on Friday']
+
+    alice.send({'type': 'search', 'query': 'deploy', 'conversation': 'user:bob'})
+    assert [m['content'] for m in alice.wait_for('search_results')['results']] == ['deploy key is ready']
+    carol.send({'type': 'search', 'query': 'deploy', 'limit': 1})
+    page = carol.wait_for('search_results')
+    assert [m['content'] for m in page['results']] == ['secret deploy'] and page['next_before']
+    carol.send({'type': 'search', 'query': 'deploy', 'before': page['next_before']})
+    assert [m['content'] for m in carol.wait_for('search_results')['results']] == ['Deploy on Friday']
+
+    alice.send({'type': 'search', 'query': 'deploy', 'from': started - 60, 'to': started - 30})
+    assert alice.wait_for('search_results')['results'] == []
+
+    server.search_index = None
+    alice.send({'type': 'search', 'query': 'deploy'})
+    assert alice.wait_for('search_results')['status'] == 'error'
+
+    for client in (alice, bob, carol):
+        client.close()
+    print("✓ Search returns the user's matching messages")
+
+
+if __name__ == "__main__":
+    test_search_index()
+    test_history_indexed_in_front()
+    test_search_request()
@@ -0,0 +1,186 @@
+"""
+Server Tests for Computer Networks Chat Application
+Runs a real ChatServer on localhost and talks to it over TCP
+"""
+
+import base64
+import socket
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'bench'))
+
+from lanes import FileAssembler
+from protocol import FrameReader, RECV_SIZE, encode_message
+from server import ChatServer
+
+
+def start_server(**kwargs):
+    """Start a ChatServer on a free localhost port"""
+    server = ChatServer(host='127.0.0.1', port=0, **kwargs)
+    threading.Thread(target=server.start, daemon=True).start()
+    assert server.ready.wait(5)
+    return server
+
+
+class ProtocolClient:
+    """Minimal blocking protocol client"""
+    
+    def __init__(self, port, username):
+        self.socket = socket.create_connection(('127.0.0.1', port), timeout=5)
+        self.reader = FrameReader()
+        self.files = FileAssembler()
+        self.pending = []
+        self.send({'type': 'login', 'username': username})
+        self.login_response = self.wait_for('login_response')
+    
+    def send(self, message):
+        self.socket.sendall(encode_message(message))
+    
+    def wait_for(self, msg_type):
+        """Return the next message of the given type"""
+        while True:
+            for i, message in enumerate(self.pending):
+                if message.get('type') == msg_type:
+                    return self.pending.pop(i)
+            self.receive()
+    
+    def wait_for_any(self):
+        """Return the next message of any type"""
+        while not self.pending:
+            self.receive()
+        return self.pending.pop(0)
+    
+    def receive(self):
+        """Read from the socket; files sent in chunks are joined again"""
+        data = self.socket.recv(RECV_SIZE)
+        assert data, "connection closed"
+        for message in self.reader.feed(data):
+            message = self.files.add(message)
+            if message is not None:
+                self.pending.append(message)
+    
+    def close(self):
+        self.socket.close()
+
+
+def test_private_message():
+    """Test login and private message delivery"""
+    print("Testing private message...")
+    
+    server = start_server()
+    alice = ProtocolClient(server.port, 'alice')
+    bob = ProtocolClient(server.port, 'bob')
+    
+    alice.send({'type': 'message', 'recipient': 'bob', 'content': 'hi bob'})
+    message = bob.wait_for('message')
+    assert message['sender'] == 'alice'
+    assert message['content'] == 'hi bob'
+    assert alice.wait_for('message_sent')['status'] == 'success'
+    
+    alice.close()
+    bob.close()
+    print("✓ Private message delivered")
+
+
+def test_back_to_back_and_large_messages():
+    """Test pipelined messages and a file larger than one recv() buffer"""
+    print("\nTesting pipelined and large messages...")
+    
+    server = start_server()
+    alice = ProtocolClient(server.port, 'alice')
+    bob = ProtocolClient(server.port, 'bob')
+    
+    # Many messages in a single TCP write
+    burst = b''.join(encode_message({'type': 'message', 'recipient': 'bob', 'content': str(i)})
+                     for i in range(50))
+    alice.socket.sendall(burst)
+    contents = [bob.wait_for('message')['content'] for _ in range(50)]
+    assert contents == [str(i) for i in range(50)]
+    
+    filedata = base64.b64encode(os.urandom(200000)).decode('utf-8')
+    alice.send({'type': 'file_transfer', 'recipient': 'bob', 'filename': 'a.bin', 'filedata': filedata})
+    assert bob.wait_for('file_transfer')['filedata'] == filedata
+    
+    alice.close()
+    bob.close()
+    print("✓ Pipelined and large messages delivered")
+
+
+def test_max_connections():
+    """Test that the threaded engine refuses connections beyond the limit"""
+    print("\nTesting max connections...")
+    
+    server = start_server(max_connections=1, backlog=16)
+    alice = ProtocolClient(server.port, 'alice')
+    
+    sock = socket.create_connection(('127.0.0.1', server.port), timeout=5)
+    reply = FrameReader().feed(sock.recv(RECV_SIZE))[0]
+    assert reply['type'] == 'login_response' and reply['status'] == 'error'
+    sock.close()
+    
+    alice.close()
+    print("✓ Connection beyond the limit refused")
+
+
+def test_message_tracing():
+    """Test that a traced message records every server stage"""
+    print("\nTesting message tracing...")
+    
+    from tracing import Tracer
+    
+    tracer = Tracer(follow_clients=True)
+    server = start_server(tracer=tracer)
+    alice = ProtocolClient(server.port, 'alice')
+    bob = ProtocolClient(server.port, 'bob')
+    
+    alice.send({'type': 'message', 'recipient': 'bob', 'content': 'hi', 'trace': True, 'sent_at': 123})
+    message = bob.wait_for('message')
+    assert message['trace'] is True and message['sent_at'] == 123
+    alice.wait_for('message_sent')
+    
+    # The trace is finished just after the acknowledgement is sent
+    deadline = time.time() + 5
+    while not tracer.events and time.time() < deadline:
+        time.sleep(0.01)
+    stages = [event['name'] for event in tracer.events]
+    for stage in ('decode', 'route', 'enqueue', 'write'):
+        assert stage in stages
+    assert any(event.get('args', {}).get('msg_id') == message['msg_id'] for event in tracer.events)
+    
+    # Without follow_clients the client's flag does not bypass sampling
+    assert Tracer(sample_rate=0.0).begin({'type': 'message', 'trace': True}, 0) is None
+    
+    alice.close()
+    bob.close()
+    print("✓ Message tracing recorded all stages")
+
+
+def test_load_generator_smoke():
+    """Test a short load generator run against an in-process server"""
+    print("\nTesting load generator...")
+    
+    from loadgen import LoadGenerator
+    
+    server = start_server()
+    generator = LoadGenerator('127.0.0.1', server.port, clients=6, rate=20, duration=1.0,
+                              group_size=3, file_size=1024)
+    results = generator.run()
+    
+    assert results['errors'] == 0
+    assert results['connections']['count'] == 6
+    assert results['throughput']['delivered'] == results['throughput']['expected']
+    assert results['latency_ms']['all']['count'] > 0
+    print("✓ Load generator run completed")
+
+
+if __name__ == "__main__":
+    test_private_message()
+    test_back_to_back_and_large_messages()
+    test_max_connections()
+    test_message_tracing()
+    test_load_generator_smoke()
@@ -0,0 +1,112 @@
+"""
+Server State Tests for Computer Networks Chat Application
+Tests the session registry, group table and message history
+"""
+
+import sys
+import os
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from sessions import GroupTable, MessageHistory, SessionRegistry
+
+
+def test_session_registry():
+    """Test login, lookup, name takeover and logout"""
+    print("Testing session registry...")
+
+    sessions = SessionRegistry(shards=4)
+    first, second = object(), object()
+    sessions.add(first, 'alice', ('127.0.0.1', 1))
+    assert sessions.socket_of('alice') is first
+    assert sessions.usernames() == ['alice']
+
+    # A snapshot taken before a change is never modified
+    snapshot = sessions.roster
+    sessions.add(second, 'alice', ('127.0.0.1', 2))
+    assert list(snapshot) == [first]
+    assert sessions.socket_of('alice') is second
+
+    # The old connection leaving does not log out the new one
+    assert sessions.remove(first) == 'alice'
+    assert sessions.socket_of('alice') is second
+    assert sessions.remove(second) == 'alice'
+    assert sessions.socket_of('alice') is None
+    assert sessions.remove(second) is None
+    assert len(sessions) == 0
+    print("✓ Session registry works")
+
+
+def test_concurrent_logins():
+    """Test logins and logouts from many threads while readers iterate the roster"""
+    print("\nTesting concurrent logins...")
+
+    sessions = SessionRegistry()
+    stop = threading.Event()
+    errors = []
+
+    def reader():
+        while not stop.is_set():
+            try:
+                for sock, username in sessions.roster.items():
+                    assert username.startswith('user')
+            except Exception as e:  # e.g. "dictionary changed size during iteration"
+                errors.append(e)
+
+    def churn(index):
+        for round_ in range(200):
+            sock = object()
+            sessions.add(sock, f'user{index}-{round_}', None)
+            sessions.remove(sock)
+        sessions.add(object(), f'user{index}', None)
+
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    writers = [threading.Thread(target=churn, args=(i,)) for i in range(8)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    assert not errors
+    assert sorted(sessions.usernames()) == sorted(f'user{i}' for i in range(8))
+    assert all(sessions.socket_of(f'user{i}') is not None for i in range(8))
+    print("✓ Roster stayed consistent under concurrent logins")
+
+
+def test_groups_and_history():
+    """Test the copy-on-write group table and the bounded history"""
+    print("\nTesting groups and history...")
+
+    groups = GroupTable()
+    groups.set('team', ['alice', 'bob'])
+    snapshot = groups.snapshot()
+    groups.set('team', ['alice'])
+    assert snapshot['team'] == ('alice', 'bob')
+    assert groups.get('team') == ('alice',)
+    assert 'team' in groups and groups.get('other') is None
+
+    history = MessageHistory(size=3)
+    for i in range(5):
+        history.append({'msg_id': i})
+    assert len(history) == 3
+    assert [m['msg_id'] for m in history.recent(2)] == [3, 4]
+
+    # Messages stored out of msg_id order are kept in order
+    history = MessageHistory(size=4)
+    for msg_id in (1, 2, 5, 3, 6, 4):
+        history.append({'msg_id': msg_id})
+    assert [m['msg_id'] for m in history.recent(4)] == [3, 4, 5, 6]
+    assert [m['msg_id'] for m in history.since(3)] == [4, 5, 6]
+    assert list(history.since(6)) == [] and history.get(2) is None
+    print("✓ Groups and history work")
+
+
+if __name__ == "__main__":
+    test_session_registry()
+    test_concurrent_logins()
+    test_groups_and_history()
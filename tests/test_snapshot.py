@@ -0,0 +1,134 @@
+"""
+Snapshot Tests for Computer Networks Chat Application
+Tests saving and restoring groups, history and message IDs
+"""
+
+import sys
+import os
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from protocol import encode_message
+from server import ChatServer
+from sessions import MessageHistory
+from snapshot import StateSnapshots, load_snapshot, write_snapshot
+from test_server import ProtocolClient, start_server
+
+
+def chat_message(msg_id):
+    return {'type': 'message', 'msg_id': msg_id, 'sender': 'alice', 'recipient': 'all',
+            'content': f'message {msg_id}', 'timestamp': '2024-01-01 12:00:00'}
+
+
+def test_snapshot_file():
+    """Test the file format: groups, lazily decoded history and the msg_id index"""
+    print("Testing snapshot file...")
+
+    path = os.path.join(tempfile.mkdtemp(prefix='chat-state-'), 'chat.state')
+    messages = [chat_message(i) for i in range(1, 1001)]
+    count = write_snapshot(path, {'team': ('alice', 'bob')},
+                           ((m['msg_id'], encode_message(m)) for m in messages), 1001)
+    assert count == 1000
+
+    snapshot = load_snapshot(path)
+    assert snapshot.groups == {'team': ['alice', 'bob']}
+    assert snapshot.next_msg_id == 1001
+    assert len(snapshot.history) == 1000
+    assert snapshot.history[0] == messages[0]
+    assert snapshot.history[-1] == messages[-1]
+    assert snapshot.history.position_after(500) == 500
+    assert snapshot.history.position_after(5000) == 1000
+
+    # Restored messages come before new ones and count towards the size
+    history = MessageHistory(size=1002)
+    history.restore(snapshot.history)
+    for i in range(1001, 1004):
+        history.append(chat_message(i))
+    assert len(history) == 1002
+    assert [m['msg_id'] for m in history.recent(5)] == [999, 1000, 1001, 1002, 1003]
+    base, start, live = history.snapshot_parts()
+    assert base[start]['msg_id'] == 2 and [m['msg_id'] for m in live] == [1001, 1002, 1003]
+
+    # Rewriting keeps the restored frames (trimmed to the size) before the new ones
+    again = path + '.again'
+    frames = ((m['msg_id'], encode_message(m)) for m in live)
+    assert write_snapshot(again, {}, frames, 1004, base, start) == 1002
+    rewritten = load_snapshot(again).history
+    assert rewritten[0] == messages[1] and rewritten[998] == messages[-1]
+    assert rewritten[-1] == chat_message(1003)
+    assert rewritten.position_after(1000) == 999
+
+    assert load_snapshot(path + '.missing') is None
+    with open(path, 'r+b') as f:
+        f.write(b'NOTSNAP!')
+    try:
+        load_snapshot(path)
+        assert False, "corrupt snapshot accepted"
+    except ValueError:
+        pass
+    print("✓ Snapshot file round trip works")
+
+
+def test_restart_restores_state():
+    """Test that a restarted server has the groups, history, message IDs and history ID"""
+    print("\nTesting restart from a snapshot...")
+
+    path = os.path.join(tempfile.mkdtemp(prefix='chat-state-'), 'chat.state')
+    server = start_server()
+    StateSnapshots(path).attach(server)
+    alice = ProtocolClient(server.port, 'alice')
+    alice.send({'type': 'group_create', 'group_name': 'team', 'members': ['alice', 'bob']})
+    alice.wait_for('group_created')
+    for i in range(3):
+        alice.send({'type': 'message', 'recipient': 'all', 'content': f'hello {i}'})
+        alice.wait_for('message_sent')
+    assert server.snapshots.save() == 3
+    alice.close()
+
+    restarted = ChatServer(host='127.0.0.1', port=0)
+    StateSnapshots(path).attach(restarted)
+    assert restarted.snapshots.restore()
+    assert restarted.groups.get('team') == ('alice', 'bob')
+    assert [m['content'] for m in restarted.chat_history.recent(10)] == ['hello 0', 'hello 1', 'hello 2']
+    last_id = restarted.chat_history.recent(1)[0]['msg_id']
+    assert next(restarted.message_ids) > last_id
+    assert restarted.history_id == server.history_id  # Clients keep syncing incrementally
+
+    # A snapshot of the restored server keeps the restored history
+    assert restarted.snapshots.save() == 3
+    restarted.server_socket.close()
+    print("✓ Groups, history and message IDs survive a restart")
+
+
+def test_out_of_order_messages():
+    """Test snapshots of messages stored out of msg_id order"""
+    print("\nTesting messages stored out of order...")
+
+    path = os.path.join(tempfile.mkdtemp(prefix='chat-state-'), 'chat.state')
+    server = ChatServer(host='127.0.0.1', port=0)
+    StateSnapshots(path).attach(server)
+    server.chat_history.append(chat_message(11))
+    assert server.snapshots.save() == 1
+    server.chat_history.append(chat_message(10))  # Its handler thread was slower
+    server.chat_history.append(chat_message(12))
+    assert server.snapshots.save() == 3
+    assert list(load_snapshot(path).history.ids) == [10, 11, 12]
+    assert [server.chat_history.get(msg_id)['msg_id'] for msg_id in (10, 11, 12)] == [10, 11, 12]
+
+    # A message stored while a save runs stays in memory for the next one
+    history = MessageHistory()
+    history.append(chat_message(14))
+    saved = {message['msg_id'] for message in history.snapshot_parts()[2]}
+    history.append(chat_message(13))
+    history.compact((), saved)
+    assert history.get(13) is not None and history.get(14) is None
+    server.server_socket.close()
+    print("✓ Out of order messages are saved in order")
+
+
+if __name__ == "__main__":
+    test_snapshot_file()
+    test_restart_restores_state()
+    test_out_of_order_messages()
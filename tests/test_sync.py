@@ -0,0 +1,168 @@
+"""
+History Sync Tests for Computer Networks Chat Application
+Tests the client message cache and incremental sync from the server
+"""
+
+import sys
+import os
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import server as server_module
+from protocol import encode_message
+from sessions import MessageHistory
+from snapshot import load_snapshot, write_snapshot
+from sync import MessageCache, conversation_of
+from test_server import ProtocolClient, start_server
+
+
+def test_message_cache():
+    """Test storing, deduplicating and querying cached messages"""
+    print("Testing message cache...")
+
+    path = MessageCache.path_for('127.0.0.1', 5555, 'alice')
+    assert path.endswith('127.0.0.1_5555_alice.sqlite3')
+    cache = MessageCache(os.path.join(tempfile.mkdtemp(prefix='chat-cache-'), 'alice.sqlite3'))
+    first = {'type': 'message', 'msg_id': 1, 'sender': 'bob', 'recipient': 'alice', 'content': 'hi',
+             'timestamp': 100.0}
+    second = {'type': 'message', 'msg_id': 4, 'sender': 'alice', 'recipient': 'all', 'content': 'hello',
+              'timestamp': 101.0}
+    assert conversation_of(first, 'alice') == 'user:bob'
+    assert conversation_of(second, 'alice') == 'all'
+    assert conversation_of(first, 'carol') is None
+
+    assert cache.add('h1', 'user:bob', first)
+    assert not cache.add('h1', 'user:bob', first)
+    assert cache.add_many('h1', [('all', second), ('user:bob', first)]) == [second]
+    assert cache.last_seen('h1') == {'user:bob': 1, 'all': 4}
+    assert [m['msg_id'] for m in cache.recent(10)] == [1, 4]
+    assert cache.recent(10, 'user:bob') == [first]
+
+    # The same msg_id in another history (restarted server, other node) is another message
+    other = dict(first, content='after a restart')
+    assert cache.add('h2', 'user:bob', other)
+    assert cache.recent(10, 'user:bob') == [first, other]
+    assert cache.last_seen('h2') == {'user:bob': 1}
+
+    assert cache.synced_through('h1') == 0
+    cache.set_synced_through('h1', 4)
+    assert cache.sync_request('h1') == {'type': 'sync', 'history_id': 'h1',
+                                        'since': {'user:bob': 1, 'all': 4}, 'after': 4}
+    assert cache.sync_request('h2') == {'type': 'sync', 'history_id': 'h2',
+                                        'since': {'user:bob': 1}, 'after': 0}
+    cache.close()
+    print("✓ Message cache works")
+
+
+def test_incremental_sync():
+    """Test that sync returns only the user's messages newer than the client has"""
+    print("\nTesting incremental sync...")
+
+    server = start_server()
+    alice = ProtocolClient(server.port, 'alice')
+    bob = ProtocolClient(server.port, 'bob')
+    carol = ProtocolClient(server.port, 'carol')
+    alice.send({'type': 'group_create', 'group_name': 'team', 'members': ['alice', 'bob']})
+    bob.wait_for('group_created')
+
+    bob.send({'type': 'message', 'recipient': 'all', 'content': 'hello all'})
+    bob.send({'type': 'message', 'recipient': 'alice', 'content': 'hi alice'})
+    bob.send({'type': 'message', 'recipient': 'carol', 'content': 'only for carol'})
+    bob.send({'type': 'group_message', 'group_name': 'team', 'content': 'team news'})
+    for _ in range(3):
+        assert 'msg_id' in bob.wait_for('message_sent')
+    alice.wait_for('group_message')
+
+    # A fresh client gets everything that concerns alice
+    alice.send({'type': 'sync', 'since': {}, 'after': 0})
+    response = alice.wait_for('sync_response')
+    contents = [m['content'] for m in response['messages']]
+    assert contents == ['hello all', 'hi alice', 'team news']
+    assert not response['more']
+    last_id = response['last_id']
+
+    # A client that has everything gets nothing; later messages only
+    since = {conversation_of(m, 'alice'): m['msg_id'] for m in response['messages']}
+    alice.send({'type': 'sync', 'since': since, 'after': last_id})
+    assert alice.wait_for('sync_response')['messages'] == []
+    # Everything up to 'after' was delivered, however old a conversation's newest message is
+    alice.send({'type': 'sync', 'since': {'user:bob': 0}, 'after': last_id})
+    assert alice.wait_for('sync_response')['messages'] == []
+    carol.send({'type': 'message', 'recipient': 'alice', 'content': 'new'})
+    carol.wait_for('message_sent')
+    alice.send({'type': 'sync', 'since': since, 'after': last_id})
+    assert [m['content'] for m in alice.wait_for('sync_response')['messages']] == ['new']
+
+    # Paging: at most SYNC_LIMIT messages per response
+    limit = server_module.SYNC_LIMIT
+    server_module.SYNC_LIMIT = 2
+    try:
+        page = server.sync_response('alice', {'type': 'sync', 'since': {}, 'after': 0})
+        assert len(page['messages']) == 2 and page['more']
+        page = server.sync_response('alice', {'type': 'sync', 'after': page['last_id']})
+        assert [m['content'] for m in page['messages']] == ['team news', 'new'] and not page['more']
+    finally:
+        server_module.SYNC_LIMIT = limit
+
+    for client in (alice, bob, carol):
+        client.close()
+    print("✓ Sync returns only new messages of the user's conversations")
+
+
+def test_sync_across_histories():
+    """Test that msg_ids of another server history do not hide messages"""
+    print("\nTesting sync after a restart without state...")
+
+    server = start_server()
+    alice = ProtocolClient(server.port, 'alice')
+    bob = ProtocolClient(server.port, 'bob')
+    history_id = alice.login_response['history_id']
+    assert history_id == server.history_id
+
+    bob.send({'type': 'message', 'recipient': 'alice', 'content': 'fresh'})
+    sent = bob.wait_for('message_sent')
+    assert sent['msg_id'] == 1 and sent['history_id'] == history_id
+    alice.wait_for('message')
+
+    # IDs the client has from before the restart are far ahead of the new ones
+    alice.send({'type': 'sync', 'history_id': 'before-restart', 'since': {'user:bob': 50}, 'after': 60})
+    response = alice.wait_for('sync_response')
+    assert response['history_id'] == history_id
+    assert [m['content'] for m in response['messages']] == ['fresh']
+    alice.send({'type': 'sync', 'history_id': history_id, 'since': {'user:bob': 1}, 'after': 1})
+    assert alice.wait_for('sync_response')['messages'] == []
+
+    # A rejected message gets an error reply instead of message_sent
+    bob.send({'type': 'message', 'recipient': 'alice', 'content': ['not', 'text']})
+    assert bob.wait_for('error')['request'] == 'message'
+
+    for client in (alice, bob):
+        client.close()
+    print("✓ Sync with another history_id returns the whole history")
+
+
+def test_sync_from_snapshot():
+    """Test reading messages after an ID across restored and new history"""
+    print("\nTesting sync over restored history...")
+
+    path = os.path.join(tempfile.mkdtemp(prefix='chat-state-'), 'chat.state')
+    restored = [{'type': 'message', 'msg_id': i, 'sender': 'bob', 'recipient': 'all', 'content': str(i)}
+                for i in range(1, 101)]
+    write_snapshot(path, {}, ((m['msg_id'], encode_message(m)) for m in restored), 101)
+    history = MessageHistory()
+    history.restore(load_snapshot(path).history)
+    history.append({'type': 'message', 'msg_id': 102, 'sender': 'bob', 'recipient': 'all', 'content': '102'})
+
+    assert [m['msg_id'] for m in history.since(97)] == [98, 99, 100, 102]
+    assert len(list(history.since(0))) == 101
+    assert list(history.since(102)) == []
+    print("✓ Restored history is searched by msg_id")
+
+
+if __name__ == "__main__":
+    test_message_cache()
+    test_incremental_sync()
+    test_sync_across_histories()
+    test_sync_from_snapshot()
@@ -0,0 +1,138 @@
+"""
+TLS Tests for Computer Networks Chat Application
+Runs servers with a self-signed certificate and talks to them over TLS
+"""
+
+import shutil
+import socket
+import sys
+import os
+import tempfile
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from event_server import EventChatServer
+from lanes import FileAssembler
+from pool_server import PooledChatServer
+from protocol import FrameReader
+from server import ChatServer
+from test_server import ProtocolClient
+from tls import client_context, generate_self_signed, server_context
+
+CERT_DIR = tempfile.mkdtemp(prefix='chat-tls-')
+CERTFILE = os.path.join(CERT_DIR, 'server.crt')
+KEYFILE = os.path.join(CERT_DIR, 'server.key')
+
+
+def have_certificate():
+    """Create the test certificate once; False without the openssl tool"""
+    if os.path.exists(CERTFILE):
+        return True
+    if shutil.which('openssl') is None:
+        print("openssl not found, skipping")
+        return False
+    generate_self_signed(CERTFILE, KEYFILE)
+    return True
+
+
+class TLSClient(ProtocolClient):
+    """ProtocolClient over TLS, optionally resuming a previous session"""
+
+    def __init__(self, port, username, context, session=None):
+        sock = socket.create_connection(('127.0.0.1', port), timeout=5)
+        self.socket = context.wrap_socket(sock, server_hostname='localhost', session=session)
+        self.reader = FrameReader()
+        self.files = FileAssembler()
+        self.pending = []
+        self.send({'type': 'login', 'username': username})
+        self.wait_for('login_response')
+
+
+def start_tls_server(server_class):
+    server = server_class(host='127.0.0.1', port=0, ssl_context=server_context(CERTFILE, KEYFILE))
+    threading.Thread(target=server.start, daemon=True).start()
+    assert server.ready.wait(5)
+    return server
+
+
+def check_private_message(server_class):
+    server = start_tls_server(server_class)
+    context = client_context(CERTFILE)
+    alice = TLSClient(server.port, 'alice', context)
+    bob = TLSClient(server.port, 'bob', context)
+
+    alice.send({'type': 'message', 'recipient': 'bob', 'content': 'hi bob'})
+    message = bob.wait_for('message')
+    assert message['sender'] == 'alice'
+    assert message['content'] == 'hi bob'
+    assert alice.socket.version() in ('TLSv1.2', 'TLSv1.3')
+
+    alice.close()
+    bob.close()
+
+
+def test_tls_private_message():
+    """Test a private message over TLS on every engine"""
+    print("Testing TLS private message...")
+    if not have_certificate():
+        return
+
+    for server_class in (ChatServer, EventChatServer, PooledChatServer):
+        check_private_message(server_class)
+        print(f"✓ {server_class.__name__} delivered over TLS")
+
+
+def test_tls_session_resumption():
+    """Test that a reconnecting client resumes its TLS session"""
+    print("\nTesting TLS session resumption...")
+    if not have_certificate():
+        return
+
+    for server_class in (ChatServer, EventChatServer):
+        server = start_tls_server(server_class)
+        context = client_context(CERTFILE)
+        first = TLSClient(server.port, 'alice', context)
+        assert not first.socket.session_reused
+        session = first.socket.session
+        first.close()
+
+        again = TLSClient(server.port, 'alice', context, session=session)
+        assert again.socket.session_reused
+        again.send({'type': 'get_users'})
+        assert 'alice' in again.wait_for('users_list')['users']
+        again.close()
+        print(f"✓ {server_class.__name__} resumed the session")
+
+
+def test_tls_rejects_plaintext():
+    """Test that a plaintext client cannot use a TLS server"""
+    print("\nTesting plaintext client against TLS server...")
+    if not have_certificate():
+        return
+
+    server = start_tls_server(EventChatServer)
+    sock = socket.create_connection(('127.0.0.1', server.port), timeout=5)
+    sock.sendall(b'{"type": "login", "username": "mallory"}\n')
+    # The handshake fails and the server closes the connection
+    while True:
+        try:
+            data = sock.recv(4096)
+        except ConnectionResetError:
+            break
+        if not data:
+            break
+        assert b'login_response' not in data
+    sock.close()
+
+    # The server keeps serving TLS clients
+    client = TLSClient(server.port, 'alice', client_context(CERTFILE))
+    client.close()
+    print("✓ Plaintext connection refused")
+
+
+if __name__ == "__main__":
+    test_tls_private_message()
+    test_tls_session_resumption()
+    test_tls_rejects_plaintext()